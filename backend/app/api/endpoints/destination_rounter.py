@@ -24,9 +24,12 @@ async def get_destination_recommendations(
 ):
     logger.info(common_utils.get_logging_message_request(request))
     try:
-        response = service.get_recommendations(request)
+        response = await service.get_recommendations(request)
         logger.info(common_utils.get_logging_message_response(response))
         return response
+    except APIException:
+        # already carries its status (e.g. 503 from a full bulkhead)
+        raise
     except Exception as e:
         logger.error(
             common_utils.get_error_message(
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Literal
 import logging
 from app.utils import common_utils
+from app.models.custom_exception import CustomException
 from app.models.errors import ErrorItem
 from app.models.itinerary_questionnaire_request import ItineraryQuestionnaireRequest
 from app.models.itinerary_questionnaire_response import ItineraryQuestionnaireResponse
 from app.models.itinerary_generate_request import ItineraryGenerateRequest
 from app.models.itinerary_generate_response import ItineraryGenerateResponse
+from app.models.itinerary_job_response import ItineraryJobResponse
 from app.services.itinerary_service import ItineraryService
+from app.services.itinerary_job_service import itinerary_jobs
 from app.utils.auth_utils import validate_api_key
+from app.utils.response_utils import format_sse
 from exceptions import APIException
 
 logger = logging.getLogger(__name__)
@@ -29,10 +36,13 @@ async def get_itinerary_activities(
     logger.info(common_utils.get_logging_message_request(request))
     try:
         # return {"status": "ok", "message": "Itinerary service is running"}
-        response = service.get_activities(request)
+        response = await service.get_activities(request)
         logger.info(common_utils.get_logging_message_response(response))
         return response
 
+    except APIException:
+        # already carries its status (e.g. 503 from a full bulkhead)
+        raise
     except Exception as e:
         logger.error(
             common_utils.get_error_message(get_itinerary_activities.__name__, str(e))
@@ -47,13 +57,26 @@ async def get_itinerary_activities(
 async def get_optimized_itinerary(
     _: None = Depends(validate_api_key),
     request: ItineraryGenerateRequest = Body(...),
+    mode: Literal["sync", "async"] = Query("sync"),
     service: ItineraryService = Depends(get_itinerary_service),
 ):
     logger.info(common_utils.get_logging_message_request(request))
     try:
-        response = service.get_itinerary(request)
+        if mode == "async":
+            # return right away, the client polls the job or waits for its webhook
+            job = itinerary_jobs.submit(request)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=jsonable_encoder(job, exclude_none=True),
+                headers={"Location": job.status_url},
+            )
+
+        response = await service.get_itinerary(request)
         logger.info(common_utils.get_logging_message_response(response))
         return response
+    except APIException:
+        # already carries its status (e.g. 503 from a full bulkhead)
+        raise
     except Exception as e:
         logger.error(
             common_utils.get_error_message(get_optimized_itinerary.__name__, str(e))
@@ -64,6 +87,55 @@ async def get_optimized_itinerary(
         )
 
 
+@router.post("/generate/stream")
+async def stream_itinerary(
+    _: None = Depends(validate_api_key),
+    request: ItineraryGenerateRequest = Body(...),
+    service: ItineraryService = Depends(get_itinerary_service),
+):
+    logger.info(common_utils.get_logging_message_request(request))
+    try:
+        events = service.stream_itinerary(request)
+    except CustomException as e:
+        # the request itself cannot be served (unknown questionnaire, invalid
+        # trip); answered with its status since no stream has started yet
+        logger.warning(common_utils.get_error_message(stream_itinerary.__name__, str(e)))
+        if e.status_code >= 500:
+            raise APIException(status_code=e.status_code, detail="Internal server error")
+        raise APIException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.error(common_utils.get_error_message(stream_itinerary.__name__, str(e)))
+        raise APIException(
+            status_code=500,
+            detail="Internal server error",
+        )
+
+    async def event_stream():
+        async for event, data in events:
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=ItineraryJobResponse)
+async def get_itinerary_job(
+    job_id: str,
+    _: None = Depends(validate_api_key),
+):
+    logger.info(common_utils.get_logging_message(get_itinerary_job.__name__, job_id))
+    job = itinerary_jobs.get_job(job_id)
+    if job is None:
+        raise APIException(
+            status_code=404,
+            detail="Itinerary job not found",
+        )
+    return job
+
+
 @router.get("/health", response_model=dict)
 async def health_check(service: ItineraryService = Depends(get_itinerary_service)):
     logger.info(common_utils.get_logging_message(health_check.__name__))
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+import logging
+from app.core.metrics import get_metrics_snapshot
+from app.utils import common_utils
+from app.utils.auth_utils import validate_api_key
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("", response_model=dict)
+async def get_metrics(_: None = Depends(validate_api_key)):
+    logger.debug(common_utils.get_logging_message(get_metrics.__name__))
+    return get_metrics_snapshot()
@@ -1,6 +1,15 @@
 DEFAULT_MODEL = "gpt-3.5-turbo"
 DEFAULT_TEMPERATURE = 0.7
-MAX_TOKENS = 800
+# output limit of each task; itinerary and continuation budgets are sized to the trip
+TASK_MAX_TOKENS = {
+    "destinations": 500,
+    "activities": 1000,
+    "itinerary_plan": 600,
+    "itinerary_day": 800,
+    "itinerary_annotations": 600,
+}
+# single-call itinerary budget when not estimated from the trip size
+ITINERARY_FIXED_TOKENS = 3000
 
 DEFAULT_DESTINATION_SYSTEM_PROMPT = (
     "You are a travel recommendation assistant. "
@@ -50,14 +59,60 @@ DEFAULT_ITINERARY_OPTIMIZING_SYSTEM_PROMPT = (
     "            - start_time (HH:MM)\n"
     "            - end_time (HH:MM)\n"
     "            - activity: object with:\n"
+    "                - id (str, the selected activity's id; null for added activities)\n"
     "                - name (str)\n"
     "                - type (str, e.g., 'cultural', 'dining', 'outdoor', 'historical', 'nightlife')\n"
     "                - notes (str)\n"
-    "        - daily_cost (float)\n"
     "        - walking_distance (str, e.g., '3.2 km')\n"
-    "- summary: object with:\n"
-    "    - total_cost (float)\n"
-    "    - total_activities (int)\n"
-    "    - optimization_score (float between 0 and 1)\n"
+    "Return only the JSON object, with no explanation or additional text."
+)
+
+DEFAULT_ITINERARY_PLAN_SYSTEM_PROMPT = (
+    "You are an itinerary planner. "
+    "Split the trip into days and assign the user's selected activities to them. "
+    "Every selected activity id must be assigned to exactly one day; balance the days "
+    "by duration and respect max_per_day. Give each day a short, distinct theme.\n"
+    "Respond in **valid JSON format only** using the following structure:\n"
+    "- days: list of objects, one per trip day, each with:\n"
+    "    - day_number (int, starting at 1)\n"
+    "    - theme (str)\n"
+    "    - activity_ids (list of str, ids from selected)\n"
+    "Return only the JSON object, with no explanation or additional text."
+)
+
+DEFAULT_ITINERARY_DAY_SYSTEM_PROMPT = (
+    "You are an itinerary optimizer assistant. "
+    "Create the schedule for ONE day of a trip. "
+    "\n**IMPORTANT INSTRUCTIONS:**\n"
+    "- Include every activity listed in assigned\n"
+    "- Add complementary activities (meals, walks, rest) that fit the theme and the daily time window\n"
+    "- Do not repeat activities planned for the other days (see other_themes)\n"
+    "- Ensure the day has 2-4 activities depending on duration and user preferences\n"
+    "\nRespond in **valid JSON format only** using the following structure:\n"
+    "- date (YYYY-MM-DD)\n"
+    "- day_number (int)\n"
+    "- theme (str)\n"
+    "- activities: list of objects with:\n"
+    "    - start_time (HH:MM)\n"
+    "    - end_time (HH:MM)\n"
+    "    - activity: object with:\n"
+    "        - id (str, the assigned activity's id; null for added activities)\n"
+    "        - name (str)\n"
+    "        - type (str, e.g., 'cultural', 'dining', 'outdoor', 'historical', 'nightlife')\n"
+    "        - notes (str)\n"
+    "- walking_distance (str, e.g., '3.2 km')\n"
+    "Return only the JSON object, with no explanation or additional text."
+)
+
+DEFAULT_ITINERARY_ANNOTATION_SYSTEM_PROMPT = (
+    "You are a travel writer. "
+    "The schedule of the trip is already fixed; do not add, remove or move activities. "
+    "For every day, write a short, distinct theme and one practical tip per activity "
+    "(booking, what to bring, how to get there).\n"
+    "Respond in **valid JSON format only** using the following structure:\n"
+    "- days: list of objects, one per trip day, each with:\n"
+    "    - day_number (int)\n"
+    "    - theme (str)\n"
+    "    - notes: object mapping each activity name to its tip (str)\n"
     "Return only the JSON object, with no explanation or additional text."
 )
@@ -1,4 +1,5 @@
 # App configuration settings
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -7,9 +8,152 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     API_KEY: str
     API_KEY_NAME: str = "x-api-key"
+    # further accepted keys, e.g. per partner; JSON list in the environment
+    ADDITIONAL_API_KEYS: List[str] = []
     REQUEST_PER_MINUTE: int
     REQUEST_PER_HOUR: int
     CLEANUP_INTERVAL_HOUR: int
+    # rate limiter storage: "memory" (per process), "shared" (memory-mapped file
+    # shared by the workers on one host), "redis" or "sql" (rate_limit_buckets table)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SHARED_PATH: str = "/tmp/travel_planner_rate_limits.bin"
+    RATE_LIMIT_SHARED_SLOTS: int = 65536
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    # sql backend: buckets older than CLEANUP_INTERVAL_HOUR are swept this often
+    RATE_LIMIT_SWEEP_INTERVAL_SECONDS: float = 300
+    # cost-weighted budgets (units per minute, see rate_limit_policies.py),
+    # kept per process: off with other backends, 0 disables them;
+    # JSON in the environment, e.g. RATE_LIMIT_API_KEY_QUOTAS='{"partner-key": 3000}'
+    RATE_LIMIT_BUDGET_PER_MINUTE: float = 600
+    RATE_LIMIT_ROUTE_COSTS: Dict[str, float] = {}
+    RATE_LIMIT_API_KEY_QUOTAS: Dict[str, float] = {}
+
+    # shared HTTP client for the LLM provider
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_READ_TIMEOUT: float = 60.0
+    OPENAI_ITINERARY_READ_TIMEOUT: float = 120.0
+    OPENAI_HTTP2: bool = False  # requires the h2 package (httpx[http2])
+    # retries are done by LLM_RETRY_* so the circuit breaker sees every attempt
+    OPENAI_MAX_RETRIES: int = 0
+
+    # model tiers as "provider:model" routes; a tier's routes share its traffic
+    # by recent latency and error rate (the HTTP pool settings above apply to
+    # every provider). Routes of providers without an API key are skipped.
+    ANTHROPIC_API_KEY: Optional[str] = None
+    LLM_TIER_ROUTES: Dict[str, List[str]] = {
+        "small": ["openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"],
+        "large": ["openai:gpt-4o", "anthropic:claude-3-5-sonnet-latest"],
+    }
+    # tier per task; output failing schema validation is repaired locally if
+    # possible, otherwise asked again one tier up
+    LLM_DEFAULT_TIER: str = "small"
+    LLM_TASK_TIERS: Dict[str, str] = {
+        "destinations": "small",
+        "activities": "small",
+        "itinerary": "large",
+        "itinerary_continuation": "large",
+        "itinerary_plan": "large",
+        "itinerary_day": "small",
+        "itinerary_annotations": "small",
+    }
+    LLM_ESCALATION_TIERS: Dict[str, str] = {"small": "large"}
+    # overrides of openai_constants.DEFAULT_TEMPERATURE per task
+    LLM_TASK_TEMPERATURES: Dict[str, float] = {}
+    # overrides of openai_constants.TASK_MAX_TOKENS per task
+    LLM_TASK_MAX_TOKENS: Dict[str, int] = {}
+    LLM_ROUTE_MIN_SHARE: float = 0.05
+    # "json_schema": schemas from the response models where a task has one,
+    # JSON mode otherwise; "json_object": JSON mode only; "text": unconstrained
+    LLM_OUTPUT_FORMAT: str = "json_schema"
+    # OpenAI model name prefixes that accept json_schema; other models (e.g.
+    # the gpt-3.5-turbo default route) are sent JSON mode instead
+    LLM_STRUCTURED_OUTPUT_MODELS: List[str] = ["gpt-4o", "gpt-4.1", "gpt-5", "o3", "o4"]
+
+    # itinerary max_tokens from the expected output size: a linear model of trip
+    # days, activity slots and selected activities (intercept first), refined
+    # from observed usage; scripts/calibrate_token_budget.py fits it from logs
+    ITINERARY_TOKEN_BUDGET_ENABLED: bool = True
+    ITINERARY_TOKEN_PRIOR: List[float] = [200.0, 60.0, 90.0, 0.0]
+    ITINERARY_TOKEN_PERCENTILE: float = 95
+    ITINERARY_MIN_TOKENS: int = 800
+    # upper bound of the estimate; openai_constants.ITINERARY_FIXED_TOKENS is
+    # the budget used when estimation is disabled
+    ITINERARY_MAX_TOKENS: int = 8000
+    # an itinerary cut off before its last day keeps its complete days; the
+    # missing ones are requested in up to this many continuation calls
+    ITINERARY_CONTINUATION_MAX_ROUNDS: int = 2
+
+    # trip length caps; parallel and locally scheduled generation scale to longer trips
+    MAX_TRIP_DAYS: int = 10
+    MAX_TRIP_DAYS_PARALLEL: int = 21
+    ITINERARY_DAY_CONCURRENCY: int = 7
+
+    # background workers for async itinerary generation jobs
+    ITINERARY_JOB_WORKERS: int = 4
+    ITINERARY_JOB_WEBHOOK_TIMEOUT: float = 10.0
+    # jobs waiting for a worker; submissions beyond it get 503
+    ITINERARY_JOB_QUEUE_SIZE: int = 100
+    # webhook hosts allowed as callback_url; when empty any host that resolves
+    # only to public addresses is allowed
+    ITINERARY_JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = []
+    # a running job's lease is renewed while its worker lives; jobs whose lease
+    # expired are run again by the next worker that starts
+    ITINERARY_JOB_LEASE_SECONDS: float = 120.0
+
+    # share one in-flight LLM call between identical concurrent requests
+    LLM_COALESCING_ENABLED: bool = True
+
+    # bulkheads around LLM calls: max concurrent calls per task, then a bounded
+    # wait queue with a deadline; beyond that requests get 503 + Retry-After
+    BULKHEAD_MAX_IN_FLIGHT: Dict[str, int] = {
+        "destinations": 20,
+        "activities": 20,
+        "itinerary": 10,
+        "itinerary_plan": 10,
+        "itinerary_day": 40,
+        "itinerary_annotations": 10,
+    }
+    BULKHEAD_MAX_QUEUE: int = 50
+    BULKHEAD_QUEUE_TIMEOUT_SECONDS: float = 10.0
+
+    # adaptive (AIMD) limit on concurrent calls per model, driven by latency and errors
+    ADAPTIVE_CONCURRENCY_ENABLED: bool = True
+    ADAPTIVE_CONCURRENCY_INITIAL_LIMIT: int = 20
+    ADAPTIVE_CONCURRENCY_MIN_LIMIT: int = 2
+    ADAPTIVE_CONCURRENCY_MAX_LIMIT: int = 100
+    ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE: float = 1.5
+
+    # retries of transient provider errors, with jittered exponential backoff
+    LLM_RETRY_ATTEMPTS: int = 2
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 4.0
+    # consecutive failures that open the circuit, and how long it stays open
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # hedged requests: when a call is slower than this percentile of recent
+    # latency, send a second one (to LLM_HEDGE_ROUTE, a "provider:model" route
+    # like those of LLM_TIER_ROUTES, or else preferably another route of the
+    # tier) and keep the first answer; at most LLM_HEDGE_BUDGET_RATIO extra calls
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_TASKS: List[str] = ["destinations", "activities"]
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_BUDGET_RATIO: float = 0.05
+    LLM_HEDGE_ROUTE: Optional[str] = None
+
+    # destination recommendation cache: "memory", "sqlite" or "none"
+    DESTINATION_CACHE_BACKEND: str = "memory"
+    DESTINATION_CACHE_TTL_SECONDS: int = 6 * 3600
+    DESTINATION_CACHE_MAX_ENTRIES: int = 1000
+    ACTIVITY_CACHE_BACKEND: str = "memory"
+    ACTIVITY_CACHE_TTL_SECONDS: int = 6 * 3600
+    ACTIVITY_CACHE_MAX_ENTRIES: int = 1000
+
+    # how preferences are folded before hashing: exact, sorted, default or coarse
+    PREFERENCE_BUCKETING_POLICY: str = "default"
 
     class Config:
         env_file = ".env"
@@ -42,6 +42,7 @@ async def api_exception_handler(request: Request, exc: APIException):
         403: "access_forbidden",
         404: "resource_not_found",
         500: "internal_error",
+        503: "service_unavailable",
     }
 
     error_code = error_code_mapping.get(exc.status_code, "api_error")
@@ -51,7 +52,9 @@ async def api_exception_handler(request: Request, exc: APIException):
     error_response = common_utils.create_error_response(request, [error_item])
 
     return JSONResponse(
-        status_code=exc.status_code, content=error_response.dict(exclude_none=True)
+        status_code=exc.status_code,
+        content=error_response.dict(exclude_none=True),
+        headers=exc.headers,
     )
 
 
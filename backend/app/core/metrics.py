@@ -0,0 +1,53 @@
+# In-process metrics registry
+from collections import deque
+from typing import Callable, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# name -> zero-argument callable returning a dict of counters
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, collector: Callable[[], dict]) -> None:
+    """Register a collector whose output is exposed under `name` on /metrics"""
+    _collectors[name] = collector
+
+
+def get_metrics_snapshot() -> dict:
+    """Collect the current value of every registered metric group"""
+    snapshot = {}
+    for name, collector in _collectors.items():
+        try:
+            snapshot[name] = collector()
+        except Exception as e:
+            logger.error(f"Metrics collector {name} failed: {str(e)}")
+            snapshot[name] = {"error": "collector failed"}
+    return snapshot
+
+
+class LatencyHistogram:
+    """Rolling window of recent latencies (seconds) with percentile lookups"""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, percentile: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = min(int(len(ordered) * percentile / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p95_ms": round(self.percentile(95) * 1000, 1),
+            "p99_ms": round(self.percentile(99) * 1000, 1),
+        }
@@ -54,18 +54,47 @@ class Activity(Base):
     questionnaire = relationship("Questionnaire", back_populates="activities")
 
 
-class RateLimitEntry(Base):
-    __tablename__ = "rate_limits"
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
 
-    id = Column(Integer, primary_key=True, index=True)
-    ip_address = Column(String, nullable=False)
-    request_count = Column(Integer, default=1)
-    window_start = Column(
+    # one row per client and minute, incremented in place with an upsert
+    ip_address = Column(String, primary_key=True)
+    bucket_start = Column(Integer, primary_key=True)  # epoch minute (epoch seconds // 60)
+    request_count = Column(Integer, nullable=False, default=1)
+
+    # the primary key serves the per-client range query; this one the retention sweep
+    __table_args__ = (Index("idx_rate_limit_buckets_start", "bucket_start"),)
+
+
+class ResponseCacheEntry(Base):
+    __tablename__ = "response_cache"
+
+    namespace = Column(String, primary_key=True)  # destinations, activities, ...
+    cache_key = Column(String, primary_key=True)  # sha256 of the canonical request
+    value = Column(Text, nullable=False)
+    created_at = Column(REAL, nullable=False)  # epoch seconds, used for TTL
+    last_access = Column(REAL, nullable=False)  # epoch seconds, used for LRU eviction
+
+    __table_args__ = (Index("idx_response_cache_lru", "namespace", "last_access"),)
+
+
+class ItineraryJob(Base):
+    __tablename__ = "itinerary_jobs"
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    request = Column(Text, nullable=False)  # ItineraryGenerateRequest as JSON
+    result = Column(Text, nullable=True)  # ItineraryGenerateResponse as JSON
+    error = Column(Text, nullable=True)
+    callback_url = Column(String, nullable=True)
+    # worker running the job and until when; an expired lease means the worker died
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
-    last_request = Column(
+    updated_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
 
-    # Create composite index for faster lookups
-    __table_args__ = (Index("idx_ip_endpoint_window", "ip_address", "window_start"),)
+    __table_args__ = (Index("idx_itinerary_jobs_status", "status", "created_at"),)
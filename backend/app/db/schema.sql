@@ -22,11 +22,38 @@ CREATE TABLE activities (
     FOREIGN KEY (questionnaire_id) REFERENCES questionnaires(id) ON DELETE CASCADE
 );
 
--- Rate Limits table for API rate limiting
-CREATE TABLE rate_limits (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+-- Rate limit counters (sql limiter backend): one row per client and minute,
+-- so the table size follows the number of active clients, not traffic
+CREATE TABLE rate_limit_buckets (
     ip_address TEXT NOT NULL,
-    request_count INTEGER DEFAULT 1,
-    window_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    last_request TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+    bucket_start INTEGER NOT NULL,  -- epoch minute
+    request_count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (ip_address, bucket_start)
+);
+CREATE INDEX idx_rate_limit_buckets_start ON rate_limit_buckets (bucket_start);
+
+-- Response cache for LLM answers keyed by a hash of the canonical request
+CREATE TABLE response_cache (
+    namespace TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, cache_key)
+);
+CREATE INDEX idx_response_cache_lru ON response_cache (namespace, last_access);
+
+-- Itinerary generation jobs (async mode of /itinerary/generate)
+CREATE TABLE itinerary_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'queued',
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    callback_url TEXT,
+    owner TEXT,  -- worker running the job
+    lease_until TIMESTAMP,  -- an expired lease means the worker died
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_itinerary_jobs_status ON itinerary_jobs (status, created_at);
@@ -0,0 +1,491 @@
+# Storage backends for the rate limiter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.db.models import RateLimitBucket
+from app.core.config import settings
+from app.utils.resp_client import RespClient
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit_type: Optional[str] = None  # "minute" or "hour" when rejected
+    count: int = 0  # requests seen in the window that was exceeded
+
+
+def _roll(counter: List[int], offset: int, bucket: int) -> None:
+    if counter[offset] == bucket:
+        return
+    # the old current bucket becomes the previous one only if adjacent
+    counter[offset + 2] = counter[offset + 1] if counter[offset] == bucket - 1 else 0
+    counter[offset + 1] = 0
+    counter[offset] = bucket
+
+
+def _sliding_window_hit(
+    counter: List[int], now: float, requests_per_minute: int, requests_per_hour: int
+) -> RateLimitDecision:
+    """
+    Sliding-window counter check on a per-client counter laid out as
+    [minute bucket, minute count, previous minute count,
+     hour bucket, hour count, previous hour count].
+
+    The estimate weights the previous bucket by how much of it still
+    overlaps the sliding window. The counter is only incremented when the
+    request is allowed.
+    """
+    minute_bucket, minute_elapsed = divmod(now, MINUTE)
+    hour_bucket, hour_elapsed = divmod(now, HOUR)
+    _roll(counter, 0, int(minute_bucket))
+    _roll(counter, 3, int(hour_bucket))
+
+    minute_count = counter[2] * (1 - minute_elapsed / MINUTE) + counter[1]
+    if minute_count >= requests_per_minute:
+        return RateLimitDecision(False, "minute", int(minute_count))
+    hour_count = counter[5] * (1 - hour_elapsed / HOUR) + counter[4]
+    if hour_count >= requests_per_hour:
+        return RateLimitDecision(False, "hour", int(hour_count))
+
+    counter[1] += 1
+    counter[4] += 1
+    return RateLimitDecision(True)
+
+
+class RateLimitBackend:
+    """
+    Counts requests per client over a one-minute and a one-hour window.
+    `hit` records the request only when both windows still have room.
+    """
+
+    name = "base"
+
+    def __init__(self, requests_per_minute: int, requests_per_hour: int):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_hour = requests_per_hour
+
+    async def hit(self, client_id: str) -> RateLimitDecision:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Start background maintenance, if the backend needs any"""
+
+    async def close(self) -> None:
+        """Release files, connections or tasks held by the backend"""
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window counter per client kept in a dict: O(1) memory per
+    client and a check is a handful of arithmetic operations.
+
+    Only correct within one process; with several workers each one would
+    grant the full quota, use the shared or redis backend instead.
+    """
+
+    name = "memory"
+
+    # drop clients idle for more than two hours every this many hits
+    SWEEP_EVERY = 4096
+
+    def __init__(self, requests_per_minute: int, requests_per_hour: int, clock=time.time):
+        super().__init__(requests_per_minute, requests_per_hour)
+        self._clock = clock
+        # client -> counter, see _sliding_window_hit
+        self._counters: Dict[str, List[int]] = {}
+        self._hits = 0
+
+    async def hit(self, client_id: str) -> RateLimitDecision:
+        now = self._clock()
+        counter = self._counters.get(client_id)
+        if counter is None:
+            counter = [0] * 6
+            self._counters[client_id] = counter
+        decision = _sliding_window_hit(
+            counter, now, self.requests_per_minute, self.requests_per_hour
+        )
+
+        self._hits += 1
+        if self._hits % self.SWEEP_EVERY == 0:
+            self._sweep(int(now // HOUR))
+        return decision
+
+    def _sweep(self, hour_bucket: int) -> None:
+        idle = [
+            client_id
+            for client_id, counter in self._counters.items()
+            if counter[3] < hour_bucket - 1
+        ]
+        for client_id in idle:
+            del self._counters[client_id]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "clients": len(self._counters)}
+
+
+class SharedMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window counters in a memory-mapped file shared by every worker
+    process on the host, so the quota is enforced exactly across workers
+    without a network or database round trip.
+
+    The file is an open-addressing table of fixed-size slots keyed by a
+    64-bit hash of the client id; each read-modify-write happens under an
+    exclusive flock on the file. When all probed slots are taken, the slot
+    idle for the longest is reused.
+
+    Each process opens and maps the file itself, in start() or on its first
+    hit: flock excludes open file descriptions, so a descriptor inherited
+    from a parent that forked the workers would not lock them out of each
+    other.
+    """
+
+    name = "shared"
+
+    # hash, minute bucket, minute count, previous minute count,
+    # hour bucket, hour count, previous hour count
+    SLOT = struct.Struct("<QIIIIII")
+    MAX_PROBES = 16
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        requests_per_hour: int,
+        path: str,
+        slots: int,
+        clock=time.time,
+    ):
+        import fcntl  # POSIX only
+
+        super().__init__(requests_per_minute, requests_per_hour)
+        self._fcntl = fcntl
+        self._clock = clock
+        self.path = path
+        self.slots = slots
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._pid: Optional[int] = None  # process that opened _fd
+
+    def _open(self) -> None:
+        fcntl = self._fcntl
+        size = self.SLOT.size * self.slots
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        # a forked child leaves the parent's descriptor and mapping alone
+        self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    async def start(self) -> None:
+        if self._pid != os.getpid():
+            self._open()
+
+    @staticmethod
+    def _hash(client_id: str) -> int:
+        digest = hashlib.blake2b(client_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1  # 0 marks an empty slot
+
+    def _find_slot(self, key: int) -> int:
+        start = key % self.slots
+        reusable, reusable_hour = None, None
+        for probe in range(self.MAX_PROBES):
+            index = (start + probe) % self.slots
+            slot_key, _, _, _, hour_bucket, _, _ = self.SLOT.unpack_from(
+                self._map, index * self.SLOT.size
+            )
+            if slot_key == key:
+                return index
+            if slot_key == 0:
+                self.SLOT.pack_into(self._map, index * self.SLOT.size, key, 0, 0, 0, 0, 0, 0)
+                return index
+            if reusable is None or hour_bucket < reusable_hour:
+                reusable, reusable_hour = index, hour_bucket
+        self.SLOT.pack_into(self._map, reusable * self.SLOT.size, key, 0, 0, 0, 0, 0, 0)
+        return reusable
+
+    async def hit(self, client_id: str) -> RateLimitDecision:
+        if self._pid != os.getpid():
+            self._open()
+        key = self._hash(client_id)
+        fcntl = self._fcntl
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            offset = self._find_slot(key) * self.SLOT.size
+            counter = list(self.SLOT.unpack_from(self._map, offset)[1:])
+            decision = _sliding_window_hit(
+                counter, self._clock(), self.requests_per_minute, self.requests_per_hour
+            )
+            self.SLOT.pack_into(self._map, offset, key, *counter)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return decision
+
+    async def close(self) -> None:
+        if self._pid != os.getpid():
+            return
+        self._map.close()
+        os.close(self._fd)
+        self._fd, self._map, self._pid = None, None, None
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "path": self.path, "slots": self.slots}
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window counters in Redis (or any server speaking its protocol),
+    for limits shared across hosts. One pipelined round trip per check:
+    INCR the current minute and hour buckets, read the previous ones, and
+    DECR again if the request turns out to be over the limit. INCR is
+    atomic, so concurrent workers never admit more than the quota.
+
+    If the server is unreachable the request is allowed (fail open).
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        requests_per_hour: int,
+        url: str,
+        prefix: str = "ratelimit",
+        client: Optional[RespClient] = None,
+        clock=time.time,
+    ):
+        super().__init__(requests_per_minute, requests_per_hour)
+        self.url = url
+        self.prefix = prefix
+        self._client = client or RespClient(url)
+        self._clock = clock
+        self.errors = 0
+
+    async def hit(self, client_id: str) -> RateLimitDecision:
+        now = self._clock()
+        minute_bucket, minute_elapsed = divmod(now, MINUTE)
+        hour_bucket, hour_elapsed = divmod(now, HOUR)
+        minute_key = f"{self.prefix}:{client_id}:m:{int(minute_bucket)}"
+        previous_minute_key = f"{self.prefix}:{client_id}:m:{int(minute_bucket) - 1}"
+        hour_key = f"{self.prefix}:{client_id}:h:{int(hour_bucket)}"
+        previous_hour_key = f"{self.prefix}:{client_id}:h:{int(hour_bucket) - 1}"
+
+        try:
+            minute, _, previous_minute, hour, _, previous_hour = await self._client.pipeline([
+                ["INCR", minute_key],
+                ["EXPIRE", minute_key, 2 * MINUTE],
+                ["GET", previous_minute_key],
+                ["INCR", hour_key],
+                ["EXPIRE", hour_key, 2 * HOUR],
+                ["GET", previous_hour_key],
+            ])
+
+            # counts include this request, so allowed means <= limit
+            minute_count = int(previous_minute or 0) * (1 - minute_elapsed / MINUTE) + minute
+            hour_count = int(previous_hour or 0) * (1 - hour_elapsed / HOUR) + hour
+            if minute_count <= self.requests_per_minute and hour_count <= self.requests_per_hour:
+                return RateLimitDecision(True)
+
+            await self._client.pipeline([["DECR", minute_key], ["DECR", hour_key]])
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Redis rate limit backend unavailable, allowing request: {str(e)}")
+            return RateLimitDecision(True)
+
+        if minute_count > self.requests_per_minute:
+            return RateLimitDecision(False, "minute", int(minute_count) - 1)
+        return RateLimitDecision(False, "hour", int(hour_count) - 1)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "errors": self.errors}
+
+
+class SQLRateLimitBackend(RateLimitBackend):
+    """
+    Per-minute buckets in the app database: one row per client and minute.
+    A hit is a single upsert that increments the current bucket and returns
+    its count, plus a range query on the primary key for the older buckets
+    of both windows; over the limit, the increment is taken back in the
+    same transaction. The upsert locks the client's current bucket until
+    commit, so concurrent workers never admit more than the quota.
+
+    Database calls run in the thread pool to keep the event loop free, and
+    expired buckets are removed by a background sweeper rather than on the
+    request path.
+    """
+
+    name = "sql"
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        requests_per_hour: int,
+        cleanup_interval_hours: int,
+        sweep_interval_seconds: float = 300,
+        clock=time.time,
+    ):
+        super().__init__(requests_per_minute, requests_per_hour)
+        # the hour window needs the last 61 buckets, never keep less
+        self.retention_minutes = max(cleanup_interval_hours * 60, 61)
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._clock = clock
+        self._sweeper: Optional[asyncio.Task] = None
+        self.swept_rows = 0
+
+    async def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_periodically())
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    @staticmethod
+    def _upsert(db: Session, client_id: str, bucket: int):
+        insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        statement = insert(RateLimitBucket).values(
+            ip_address=client_id, bucket_start=bucket, request_count=1
+        )
+        return statement.on_conflict_do_update(
+            index_elements=["ip_address", "bucket_start"],
+            set_={"request_count": RateLimitBucket.request_count + 1},
+        ).returning(RateLimitBucket.request_count)
+
+    async def hit(self, client_id: str) -> RateLimitDecision:
+        return await run_in_threadpool(self._hit, client_id, self._clock())
+
+    def _hit(self, client_id: str, now: float) -> RateLimitDecision:
+        bucket, elapsed = divmod(now, MINUTE)
+        bucket = int(bucket)
+        overlap = 1 - elapsed / MINUTE  # share of the oldest bucket still in the window
+
+        db: Session = next(get_db())
+        try:
+            current = db.execute(self._upsert(db, client_id, bucket)).scalar_one()
+            counts = dict(
+                db.query(RateLimitBucket.bucket_start, RateLimitBucket.request_count)
+                .filter(
+                    RateLimitBucket.ip_address == client_id,
+                    RateLimitBucket.bucket_start >= bucket - 60,
+                    RateLimitBucket.bucket_start < bucket,
+                )
+                .all()
+            )
+
+            # counts include this request, so allowed means <= limit
+            minute_count = current + counts.get(bucket - 1, 0) * overlap
+            hour_count = (
+                current
+                + sum(count for start, count in counts.items() if start > bucket - 60)
+                + counts.get(bucket - 60, 0) * overlap
+            )
+            if minute_count > self.requests_per_minute:
+                decision = RateLimitDecision(False, "minute", int(minute_count) - 1)
+            elif hour_count > self.requests_per_hour:
+                decision = RateLimitDecision(False, "hour", int(hour_count) - 1)
+            else:
+                decision = RateLimitDecision(True)
+
+            if not decision.allowed:
+                db.query(RateLimitBucket).filter(
+                    RateLimitBucket.ip_address == client_id,
+                    RateLimitBucket.bucket_start == bucket,
+                ).update(
+                    {"request_count": RateLimitBucket.request_count - 1},
+                    synchronize_session=False,
+                )
+            db.commit()
+            return decision
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def sweep(self) -> int:
+        """Delete buckets older than the retention period"""
+        cutoff = int(self._clock() // MINUTE) - self.retention_minutes
+        db: Session = next(get_db())
+        try:
+            deleted_count = (
+                db.query(RateLimitBucket)
+                .filter(RateLimitBucket.bucket_start < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        except Exception as e:
+            logger.error(f"Rate limit sweep failed: {str(e)}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+        self.swept_rows += deleted_count
+        logger.info(f"Cleaned up {deleted_count} old rate limit buckets")
+        return deleted_count
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            await run_in_threadpool(self.sweep)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "swept_rows": self.swept_rows}
+
+
+def build_rate_limit_backend(
+    backend: str,
+    requests_per_minute: int,
+    requests_per_hour: int,
+    cleanup_interval_hours: int,
+) -> RateLimitBackend:
+    """Create the limiter backend selected in settings ("memory", "shared", "redis" or "sql")"""
+    if backend == "shared":
+        return SharedMemoryRateLimitBackend(
+            requests_per_minute,
+            requests_per_hour,
+            settings.RATE_LIMIT_SHARED_PATH,
+            settings.RATE_LIMIT_SHARED_SLOTS,
+        )
+    if backend == "redis":
+        return RedisRateLimitBackend(
+            requests_per_minute, requests_per_hour, settings.RATE_LIMIT_REDIS_URL
+        )
+    if backend == "sql":
+        return SQLRateLimitBackend(
+            requests_per_minute,
+            requests_per_hour,
+            cleanup_interval_hours,
+            settings.RATE_LIMIT_SWEEP_INTERVAL_SECONDS,
+        )
+    if backend != "memory":
+        logger.warning(f"Unknown rate limit backend '{backend}', using in-memory")
+    return InMemoryRateLimitBackend(requests_per_minute, requests_per_hour)
@@ -1,83 +1,160 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from datetime import datetime, timezone
+from typing import Iterable, Optional
+from app.core.config import settings
 from app.middleware.rate_limiter import RateLimiter
-from app.db.database import get_db
+from app.middleware.rate_limit_policies import (
+    BudgetDecision,
+    RateLimitPolicy,
+    build_rate_limit_policy,
+)
+from app.core.metrics import register_metrics
 from app.utils import common_utils
 from exceptions import RateLimitExceededException
 import logging
 
 logger = logging.getLogger(__name__)
 
+# liveness probes and the landing route never count against the limit
+DEFAULT_EXEMPT_PATHS = ("/", "/destinations/health", "/itinerary/health")
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, rate_limiter: RateLimiter):
-        super().__init__(app)
+
+class RateLimitMiddleware:
+    """
+    Raw ASGI middleware: requests are passed straight to the app, without
+    the task and body-stream wrapping of BaseHTTPMiddleware, so streaming
+    responses are untouched and allowlisted paths cost a set lookup.
+
+    Two checks: the cost-weighted budget of the policy, whose remaining
+    balance is reported in X-RateLimit-* headers, and the per-IP request
+    windows of the rate limiter. A request rejected by either is recorded
+    by neither: the budget charge is refunded when the windows reject.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limiter: RateLimiter,
+        exempt_paths: Iterable[str] = DEFAULT_EXEMPT_PATHS,
+        policy: Optional[RateLimitPolicy] = None,
+    ):
+        self.app = app
         self.rate_limiter = rate_limiter
+        self.exempt_paths = frozenset(exempt_paths)
+        self.policy = policy if policy is not None else build_rate_limit_policy()
+        if self.policy is not None:
+            register_metrics("rate_limit_budgets", self.policy.stats)
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        logger.debug(common_utils.get_logging_message(self.dispatch.__name__))
-        # Get database session
-        db = next(get_db())
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
 
+        logger.debug(common_utils.get_logging_message(self.__call__.__name__))
+        request = Request(scope)
         try:
-            # Check rate limit
-            await self.rate_limiter.check_rate_limit(request, db)
+            budget = self._charge_budget(request)
+            try:
+                # Check rate limit
+                await self.rate_limiter.check_rate_limit(request)
+            except RateLimitExceededException:
+                self._refund_budget(request)
+                raise
+        except RateLimitExceededException as e:
+            response = self._rate_limited_response(request, e)
+            await response(scope, receive, send)
+            return
+        except Exception as e:
+            # Let other exceptions bubble up to be handled by FastAPI's exception handlers
+            logger.error(f"Unexpected error in rate limit middleware: {str(e)}")
+            raise e
 
-            # If rate limit check passes, continue to the actual endpoint
-            response = await call_next(request)
-            return response
+        # If rate limit check passes, continue to the actual endpoint
+        async def send_with_budget(message: Message) -> None:
+            if message["type"] == "http.response.start" and budget is not None:
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(int(budget.limit))
+                headers["X-RateLimit-Remaining"] = str(int(budget.remaining))
+            await send(message)
 
-        except RateLimitExceededException as e:
-            # Handle rate limit exception directly in middleware
-            logger.warning(
-                f"Rate limit exceeded - IP: {e.client_ip}, "
-                f"Limit: {e.limit_value} requests per {e.limit_type}, "
-                f"Path: {request.url.path}, "
-                f"Method: {request.method}, "
-                f"User-Agent: {request.headers.get('User-Agent', 'Unknown')}, "
-                f"Timestamp: {datetime.now(timezone.utc).isoformat()}"
-            )
+        await self.app(scope, receive, send_with_budget)
 
-            # Log internal details for debugging
-            logger.error(
-                common_utils.get_error_message(
-                    self.dispatch.__name__,
-                    f"Rate Limit Exception on {request.url.path}: {e.internal_detail}",
-                )
-            )
+    def _charge_budget(self, request: Request) -> Optional[BudgetDecision]:
+        """Charge the route cost to the caller's budget"""
+        if self.policy is None:
+            return None
+        client_ip = self.rate_limiter.get_client_ip(request)
+        identity, budget_per_minute = self.policy.identify(
+            request.headers.get(settings.API_KEY_NAME), client_ip
+        )
+        cost = self.policy.cost(request.method, request.url.path)
+        budget = self.policy.charge(identity, budget_per_minute, cost)
+        if budget.allowed:
+            return budget
+
+        raise RateLimitExceededException(
+            limit_type="minute",
+            limit_value=int(budget_per_minute),
+            client_ip=client_ip,
+            retry_after=budget.retry_after,
+            detail=f"Rate limit exceeded: request budget of {int(budget_per_minute)} units per minute",
+            internal_detail=f"Budget exceeded for {client_ip} on {request.method} {request.url.path}: cost {cost}, remaining {budget.remaining:.1f}/{budget_per_minute}",
+        )
+
+    def _refund_budget(self, request: Request) -> None:
+        if self.policy is None:
+            return
+        identity, budget_per_minute = self.policy.identify(
+            request.headers.get(settings.API_KEY_NAME),
+            self.rate_limiter.get_client_ip(request),
+        )
+        self.policy.refund(
+            identity, budget_per_minute, self.policy.cost(request.method, request.url.path)
+        )
+
+    def _rate_limited_response(
+        self, request: Request, e: RateLimitExceededException
+    ) -> JSONResponse:
+        # Handle rate limit exception directly in middleware
+        logger.warning(
+            f"Rate limit exceeded - IP: {e.client_ip}, "
+            f"Limit: {e.limit_value} requests per {e.limit_type}, "
+            f"Path: {request.url.path}, "
+            f"Method: {request.method}, "
+            f"User-Agent: {request.headers.get('User-Agent', 'Unknown')}, "
+            f"Timestamp: {datetime.now(timezone.utc).isoformat()}"
+        )
 
-            # Return the exact structure you want
-            response_content = {
-                "errors": [
-                    {
-                        "code": str(status.HTTP_429_TOO_MANY_REQUESTS),
-                        "message": e.detail,
-                    }
-                ]
-            }
-
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content=response_content,
-                headers={
-                    "Retry-After": str(e.retry_after),
-                    "X-RateLimit-Limit": str(e.limit_value),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(
-                        int(datetime.now(timezone.utc).timestamp()) + e.retry_after
-                    ),
-                },
+        # Log internal details for debugging
+        logger.error(
+            common_utils.get_error_message(
+                self.__call__.__name__,
+                f"Rate Limit Exception on {request.url.path}: {e.internal_detail}",
             )
+        )
 
-        except Exception as e:
-            # Handle any other unexpected exceptions
-            logger.error(f"Unexpected error in rate limit middleware: {str(e)}")
-            # Let other exceptions bubble up to be handled by FastAPI's exception handlers
-            raise e
+        # Return the exact structure you want
+        response_content = {
+            "errors": [
+                {
+                    "code": str(status.HTTP_429_TOO_MANY_REQUESTS),
+                    "message": e.detail,
+                }
+            ]
+        }
 
-        finally:
-            # Clean up database session
-            db.close()
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content=response_content,
+            headers={
+                "Retry-After": str(e.retry_after),
+                "X-RateLimit-Limit": str(e.limit_value),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(
+                    int(datetime.now(timezone.utc).timestamp()) + e.retry_after
+                ),
+            },
+        )
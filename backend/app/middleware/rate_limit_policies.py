@@ -0,0 +1,130 @@
+# Cost-weighted request budgets per client or API key
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# expected cost of a request, roughly its LLM output tokens / 100;
+# routes not listed cost 1
+DEFAULT_ROUTE_COSTS = {
+    "POST /destinations/recommendations": 5,
+    "POST /itinerary/questionnaire": 10,
+    "POST /itinerary/generate": 30,
+    "POST /itinerary/generate/stream": 30,
+}
+
+
+@dataclass
+class BudgetDecision:
+    allowed: bool
+    limit: float  # bucket capacity, units per minute
+    remaining: float
+    retry_after: int = 0
+
+
+class RateLimitPolicy:
+    """
+    Token bucket per client, charged by the cost weight of the route, so an
+    itinerary generation spends the budget of thirty health-sized calls.
+
+    API keys listed in `api_key_quotas` get their own bucket with that
+    budget (units per minute); everyone else is budgeted per client IP.
+    Buckets live in process memory, so the policy is only built together
+    with the in-memory limiter backend (see build_rate_limit_policy).
+    """
+
+    # drop full, idle buckets every this many charges
+    SWEEP_EVERY = 4096
+
+    def __init__(
+        self,
+        route_costs: Optional[Dict[str, float]] = None,
+        api_key_quotas: Optional[Dict[str, float]] = None,
+        default_budget_per_minute: float = 600,
+        clock=time.monotonic,
+    ):
+        self.route_costs = {**DEFAULT_ROUTE_COSTS, **(route_costs or {})}
+        self.api_key_quotas = dict(api_key_quotas or {})
+        self.default_budget_per_minute = default_budget_per_minute
+        self._clock = clock
+        # identity -> [tokens, last refill]
+        self._buckets: Dict[str, list] = {}
+        self._charges = 0
+
+    def cost(self, method: str, path: str) -> float:
+        return self.route_costs.get(f"{method} {path}", 1)
+
+    def identify(self, api_key: Optional[str], client_ip: str) -> Tuple[str, float]:
+        """Bucket identity and its budget per minute"""
+        if api_key and api_key in self.api_key_quotas:
+            return f"key:{api_key}", self.api_key_quotas[api_key]
+        return f"ip:{client_ip}", self.default_budget_per_minute
+
+    def charge(self, identity: str, budget_per_minute: float, cost: float) -> BudgetDecision:
+        now = self._clock()
+        rate = budget_per_minute / 60
+        # a full bucket always admits one request, however expensive
+        cost = min(cost, budget_per_minute)
+
+        bucket = self._buckets.get(identity)
+        if bucket is None:
+            bucket = [budget_per_minute, now]
+            self._buckets[identity] = bucket
+        else:
+            bucket[0] = min(budget_per_minute, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        self._charges += 1
+        if self._charges % self.SWEEP_EVERY == 0:
+            self._sweep(now)
+
+        if bucket[0] < cost:
+            return BudgetDecision(
+                allowed=False,
+                limit=budget_per_minute,
+                remaining=bucket[0],
+                retry_after=max(1, math.ceil((cost - bucket[0]) / rate)),
+            )
+        bucket[0] -= cost
+        return BudgetDecision(allowed=True, limit=budget_per_minute, remaining=bucket[0])
+
+    def refund(self, identity: str, budget_per_minute: float, cost: float) -> None:
+        """Give back a charge whose request was rejected by another check"""
+        bucket = self._buckets.get(identity)
+        if bucket is not None:
+            bucket[0] = min(budget_per_minute, bucket[0] + min(cost, budget_per_minute))
+
+    def _sweep(self, now: float) -> None:
+        # a bucket idle for a minute or more has refilled and can be recreated
+        idle = [identity for identity, bucket in self._buckets.items() if now - bucket[1] >= 60]
+        for identity in idle:
+            del self._buckets[identity]
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "charges": self._charges}
+
+
+def build_rate_limit_policy() -> Optional[RateLimitPolicy]:
+    """
+    The budget policy from settings, None when budgets are disabled
+    (RATE_LIMIT_BUDGET_PER_MINUTE=0) or the limiter backend is shared:
+    per-process buckets would grant every worker the full budget, so only
+    the request windows apply then.
+    """
+    if settings.RATE_LIMIT_BUDGET_PER_MINUTE <= 0:
+        return None
+    if settings.RATE_LIMIT_BACKEND != "memory":
+        logger.warning(
+            f"Rate limit budgets are kept per process and cannot be shared by the "
+            f"'{settings.RATE_LIMIT_BACKEND}' backend; budgets are disabled"
+        )
+        return None
+    return RateLimitPolicy(
+        route_costs=settings.RATE_LIMIT_ROUTE_COSTS,
+        api_key_quotas=settings.RATE_LIMIT_API_KEY_QUOTAS,
+        default_budget_per_minute=settings.RATE_LIMIT_BUDGET_PER_MINUTE,
+    )
@@ -1,3 +1,5 @@
 class CustomException(Exception):
-    def __init__(self, message):
+    def __init__(self, message, status_code: int = 500):
         super().__init__(message)
+        # status for endpoints that answer with the message itself
+        self.status_code = status_code
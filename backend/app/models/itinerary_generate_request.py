@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 
 class SelectedActivity(BaseModel):
@@ -18,6 +18,12 @@ class ItineraryGenerateRequest(BaseModel):
     questionnaire_id: str
     selected_activities: List[SelectedActivity]
     preferences: ItineraryPreferences
+    # "parallel" plans the days first, then generates every day concurrently;
+    # "scheduled" packs the time slots locally and asks the LLM only for themes
+    # and notes, "fast" skips the LLM entirely
+    generation_mode: Literal["single", "parallel", "scheduled", "fast"] = "single"
+    # async mode only: POSTed the job status once the job finishes
+    callback_url: Optional[str] = None
 
     class Config:
         schema_extra = {
@@ -4,6 +4,7 @@ from .errors import ErrorItem
 
 
 class ActivityDetails(BaseModel):
+    id: Optional[str] = None  # id of the selected activity, None for added ones
     name: str
     type: str
     notes: str
@@ -20,7 +21,7 @@ class DailySchedule(BaseModel):
     day_number: int
     theme: str
     activities: List[ScheduledActivity]
-    daily_cost: float
+    daily_cost: float = 0.0  # computed from the stored activity costs
     walking_distance: str
 
 
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from .errors import ErrorItem
+from .itinerary_generate_response import ItineraryGenerateResponse
+
+
+class ItineraryJobResponse(BaseModel):
+    errors: Optional[List[ErrorItem]] = None
+    job_id: Optional[str] = None
+    status: Optional[Literal["queued", "running", "succeeded", "failed"]] = None
+    status_url: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    result: Optional[ItineraryGenerateResponse] = None
+    error: Optional[str] = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "job_id": "4f1c2d8e9a7b4c3d8e2f1a0b9c8d7e6f",
+                "status": "succeeded",
+                "status_url": "/itinerary/jobs/4f1c2d8e9a7b4c3d8e2f1a0b9c8d7e6f",
+                "created_at": "2024-07-01T10:00:00+00:00",
+                "updated_at": "2024-07-01T10:00:21+00:00",
+                "result": {
+                    "itinerary": {
+                        "destination": "Barcelona, Spain",
+                        "total_days": 7,
+                        "daily_schedules": [],
+                    },
+                    "summary": {
+                        "total_cost": 1650,
+                        "total_activities": 18,
+                        "optimization_score": 0.91,
+                    },
+                },
+            }
+        }
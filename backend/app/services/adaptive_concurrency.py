@@ -0,0 +1,167 @@
+# Adaptive concurrency limit (AIMD) driven by observed provider latency and errors
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, List
+from app.core.metrics import LatencyHistogram
+from app.services.bulkhead import Bulkhead
+import logging
+import statistics
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Concurrent calls to one model, with a limit that follows the provider.
+
+    Calls are judged in windows of about `limit` calls started under the
+    same limit. A window whose median latency exceeds `latency_tolerance`
+    times the baseline (the lowest window median of the recent past), or
+    whose error rate exceeds `max_error_rate`, cuts the limit by `backoff`;
+    a healthy window in which the limit was actually reached raises it by
+    one. Calls over the limit
+    wait in a Bulkhead queue and are shed with 503 like the task bulkheads.
+
+    A limit that starts (or drifts) above capacity would only ever see
+    congested latency, so every PROBE_EVERY windows one window runs at half
+    the limit. If halving the load also cut latency by more than the
+    tolerance, calls were just queueing at the provider and the half limit
+    is kept; otherwise the previous limit is restored.
+    """
+
+    # windows remembered for the baseline, so it follows a lasting slowdown
+    BASELINE_WINDOWS = 10
+    PROBE_EVERY = 5
+    MIN_WINDOW = 5
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        latency_tolerance: float = 1.5,
+        max_error_rate: float = 0.1,
+        backoff: float = 0.75,
+        max_queue: int = 50,
+        queue_timeout: float = 10.0,
+        clock=time.perf_counter,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.backoff = backoff
+        self.bulkhead = Bulkhead(name, initial_limit, max_queue, queue_timeout)
+        self.latency = LatencyHistogram()
+        self._clock = clock
+        self._window: List[float] = []
+        self._window_errors = 0
+        self._window_peak = 0
+        self._baselines: Deque[float] = deque(maxlen=self.BASELINE_WINDOWS)
+        self._windows = 0
+        self._probe_restore = None
+        self._probe_reference = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.increases = 0
+        self.decreases = 0
+        self.probes = 0
+
+    @property
+    def limit(self) -> int:
+        return self.bulkhead.max_in_flight
+
+    @asynccontextmanager
+    async def call(self) -> AsyncIterator[None]:
+        """Hold a slot for one provider call and feed its outcome back"""
+        async with self.bulkhead.slot():
+            self._window_peak = max(self._window_peak, self.bulkhead.in_flight)
+            window = self._windows
+            started = self._clock()
+            try:
+                yield
+            except Exception:
+                self._record(window, self._clock() - started, error=True)
+                raise
+            self._record(window, self._clock() - started, error=False)
+
+    def _record(self, window: int, seconds: float, error: bool) -> None:
+        self.calls += 1
+        if error:
+            self.errors += 1
+        else:
+            self.latency.record(seconds)
+        # calls started under an earlier limit say nothing about the current one
+        if window != self._windows:
+            return
+        self._window.append(seconds)
+        if error:
+            self._window_errors += 1
+        if len(self._window) >= max(self.limit, self.MIN_WINDOW):
+            self._adjust()
+
+    def _adjust(self) -> None:
+        median = statistics.median(self._window)
+        baseline = min(self._baselines, default=median)
+        error_rate = self._window_errors / len(self._window)
+        self._baselines.append(median)
+        self._windows += 1
+
+        limit = self.limit
+        if self._probe_restore is not None:
+            if self._probe_reference > median * self.latency_tolerance:
+                new_limit = limit
+                self.decreases += 1
+                logger.info(
+                    f"Concurrency limit for {self.name} lowered to {new_limit}: "
+                    f"half the load took {median * 1000:.0f} ms instead of "
+                    f"{self._probe_reference * 1000:.0f} ms"
+                )
+            else:
+                new_limit = self._probe_restore
+            self._probe_restore = None
+        elif error_rate > self.max_error_rate or median > baseline * self.latency_tolerance:
+            new_limit = max(self.min_limit, int(limit * self.backoff))
+            if new_limit < limit:
+                self.decreases += 1
+                logger.info(
+                    f"Concurrency limit for {self.name} lowered to {new_limit}: "
+                    f"median {median * 1000:.0f} ms vs baseline {baseline * 1000:.0f} ms, "
+                    f"error rate {error_rate:.0%}"
+                )
+        elif self._window_peak >= limit:
+            new_limit = min(self.max_limit, limit + 1)
+            if new_limit > limit:
+                self.increases += 1
+        else:
+            # the limit was never reached, so the window says nothing about more room
+            new_limit = limit
+
+        if self._windows % self.PROBE_EVERY == 0 and new_limit > self.min_limit:
+            self.probes += 1
+            self._probe_restore = new_limit
+            self._probe_reference = median
+            new_limit = max(self.min_limit, new_limit // 2)
+
+        if new_limit != limit:
+            self.bulkhead.resize(new_limit)
+        self._window = []
+        self._window_errors = 0
+        self._window_peak = self.bulkhead.in_flight
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.bulkhead.in_flight,
+            "queued": self.bulkhead.stats()["queued"],
+            "calls": self.calls,
+            "errors": self.errors,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "probes": self.probes,
+            "baseline_ms": round(min(self._baselines, default=0.0) * 1000, 1),
+            "latency": self.latency.stats(),
+        }
@@ -0,0 +1,133 @@
+# Bulkhead: bounded concurrency with a bounded, deadline-limited wait queue
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, TypeVar
+from app.core.metrics import LatencyHistogram
+from exceptions import ServiceUnavailableError
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Bulkhead:
+    """
+    At most `max_in_flight` calls run at once; up to `max_queue` more wait
+    in FIFO order for at most `queue_timeout` seconds. Anything beyond that
+    is rejected right away with ServiceUnavailableError (503 + Retry-After),
+    so a spike fails fast instead of piling up slow calls on the provider.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_time = LatencyHistogram()
+        self.hold_time = LatencyHistogram()
+
+    def _retry_after(self) -> int:
+        # time for the queue ahead to drain at the recent call duration
+        rounds = (len(self._waiters) + 1) / self.max_in_flight
+        return max(1, math.ceil(self.hold_time.percentile(50) * rounds))
+
+    def _reject(self, reason: str) -> ServiceUnavailableError:
+        logger.warning(
+            f"Bulkhead {self.name} rejected a call ({reason}): "
+            f"{self._in_flight} in flight, {len(self._waiters)} queued"
+        )
+        return ServiceUnavailableError(
+            retry_after=self._retry_after(),
+            internal_detail=f"Bulkhead {self.name} {reason}",
+        )
+
+    async def _acquire(self) -> None:
+        started = time.perf_counter()
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise self._reject("queue full")
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                # a releasing call hands its slot over by resolving the future
+                await asyncio.wait_for(waiter, self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._discard(waiter)
+                self.rejected_timeout += 1
+                raise self._reject("queue timeout")
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()  # the slot was handed over as we were cancelled
+                else:
+                    self._discard(waiter)
+                raise
+        self.admitted += 1
+        self.wait_time.record(time.perf_counter() - started)
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        # after a resize below the current load, slots are retired instead of handed over
+        if self._in_flight <= self.max_in_flight:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._in_flight -= 1
+
+    def resize(self, max_in_flight: int) -> None:
+        """Change the limit; queued calls are admitted into any new room"""
+        self.max_in_flight = max_in_flight
+        while self._waiters and self._in_flight < self.max_in_flight:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.hold_time.record(time.perf_counter() - started)
+            self._release()
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        async with self.slot():
+            return await fn()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_time": self.wait_time.stats(),
+        }
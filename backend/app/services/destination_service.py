@@ -1,39 +1,81 @@
 # LLM destination discovery service
 from app.models.custom_exception import CustomException
 from app.models.destination_request import DestinationRequest
-from app.models.destination_response import DestinationResponse, Recommendation
+from app.models.destination_response import (
+    DestinationResponse,
+    ErrorItem,
+    Recommendation,
+)
 from app.services.openai_client import get_travel_ideas
+from app.services.response_cache import build_response_cache
+from app.services.preference_normalizer import (
+    get_policy,
+    normalize_destination_preferences,
+)
+from app.core.config import settings
+from app.core.metrics import register_metrics
 from app.utils import common_utils
+from exceptions import CircuitOpenError
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# shared across requests, the service itself is created per request
+destination_cache = build_response_cache(
+    namespace="destinations",
+    backend=settings.DESTINATION_CACHE_BACKEND,
+    ttl_seconds=settings.DESTINATION_CACHE_TTL_SECONDS,
+    max_entries=settings.DESTINATION_CACHE_MAX_ENTRIES,
+)
+register_metrics("destination_cache", destination_cache.stats)
+
 
 class DestinationService:
     def __init__(self):
         pass
 
-    def get_recommendations(self, request: DestinationRequest) -> DestinationResponse:
+    async def get_recommendations(
+        self, request: DestinationRequest
+    ) -> DestinationResponse:
         # Placeholder for actual recommendation logic
         logger.debug(
             common_utils.get_logging_message(self.get_recommendations.__name__)
         )
 
+        # equivalent preferences get the same answer without another LLM call
+        normalized = normalize_destination_preferences(
+            request.preferences, get_policy(settings.PREFERENCE_BUCKETING_POLICY)
+        )
+        cache_key = normalized.cache_key
+        cached_text = await destination_cache.get(cache_key)
+        if cached_text is not None:
+            logger.info(
+                common_utils.get_logging_message(
+                    self.get_recommendations.__name__,
+                    f"Serving cached recommendations: {cache_key[:12]}",
+                )
+            )
+            return DestinationResponse(**json.loads(cached_text))
+
         # call OpenAI client to get destination ideas
-        response_text = get_travel_ideas(request.preferences)
-        if response_text is None:
+        try:
+            completion = await get_travel_ideas(normalized.prompt_payload)
+        except CircuitOpenError as e:
+            # fallback picks are served but never cached
             logger.warning(
                 common_utils.get_error_message(
                     self.get_recommendations.__name__,
-                    "OpenAI API failed, returning mock data for testing.",
+                    f"{e.internal_detail} Returning fallback recommendations.",
                 )
             )
+            return self._get_mock_response()
+        if completion is None:
+            raise CustomException("Failed to fetch destination recommendations.")
 
         try:
-            response_json = json.loads(response_text)
-            return DestinationResponse(**response_json)
-
+            response_json = json.loads(completion.text)
+            response = DestinationResponse(**response_json)
         except Exception as e:
             logger.error(
                 common_utils.get_error_message(
@@ -42,8 +84,14 @@ class DestinationService:
             )
             raise CustomException("Invalid response format.")
 
+        # only complete answers without errors are worth reusing; salvaged
+        # output would be served to every equivalent request until it expires
+        if not (response.errors or completion.repaired or completion.truncated):
+            await destination_cache.set(cache_key, json.dumps(response_json))
+        return response
+
     def _get_mock_response(self) -> DestinationResponse:
-        """Returns mock destination data for testing when OpenAI API is unavailable"""
+        """Popular destinations for when the provider is unreachable, marked by an error entry"""
         mock_recommendations = [
             Recommendation(
                 id="dest_001",
@@ -92,7 +140,15 @@ class DestinationService:
             ),
         ]
 
-        return DestinationResponse(errors=None, recommendations=mock_recommendations)
+        return DestinationResponse(
+            errors=[
+                ErrorItem(
+                    code="503",
+                    message="Recommendations are unavailable, showing popular destinations",
+                )
+            ],
+            recommendations=mock_recommendations,
+        )
 
 
 # recommendations = [
@@ -0,0 +1,106 @@
+# Hedged requests: a second call when the first is slower than usual
+from typing import Awaitable, Callable, Optional, TypeVar
+from app.core.metrics import LatencyHistogram
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """
+    If a call has not answered after the `percentile` of recent latency, a
+    second one is started; the first to succeed wins and the other is
+    cancelled. Each call earns `budget_ratio` of a hedge, so hedges stay
+    within that share of extra calls (with up to `max_burst` saved up).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 95,
+        budget_ratio: float = 0.05,
+        max_burst: float = 5,
+        min_samples: int = 20,
+        clock=time.perf_counter,
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.max_burst = max_burst
+        self.min_samples = min_samples
+        self._clock = clock
+        self._budget = 0.0
+        # latency of single calls, and of what the caller saw with hedging
+        self.latency = LatencyHistogram()
+        self.effective_latency = LatencyHistogram()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def delay(self) -> Optional[float]:
+        if self.latency.count < self.min_samples:
+            return None
+        return self.latency.percentile(self.percentile)
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+    ) -> T:
+        self.calls += 1
+        self._budget = min(self.max_burst, self._budget + self.budget_ratio)
+        delay = self.delay()
+        started = self._clock()
+        primary_task = asyncio.ensure_future(primary())
+        hedge_task = None
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if not done:
+                if self._budget >= 1:
+                    self._budget -= 1
+                    self.hedges += 1
+                    hedge_task = asyncio.ensure_future(hedge())
+                else:
+                    self.budget_denied += 1
+
+            pending = {primary_task} if hedge_task is None else {primary_task, hedge_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # on a tie the primary wins
+                for task in sorted(done, key=lambda task: task is not primary_task):
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.hedge_wins += 1
+                        self.effective_latency.record(self._clock() - started)
+                        return task.result()
+            # both failed: the primary's error is the one to report
+            raise primary_task.exception()
+        finally:
+            primary_succeeded = (
+                primary_task.done()
+                and not primary_task.cancelled()
+                and primary_task.exception() is None
+            )
+            # a primary that lost still ran this long, which keeps the tail visible
+            if primary_succeeded or hedge_task is not None:
+                self.latency.record(self._clock() - started)
+            for task in (primary_task, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "win_rate": round(self.hedge_wins / self.hedges, 4) if self.hedges else 0.0,
+            "budget_denied": self.budget_denied,
+            "delay_ms": round((self.delay() or 0.0) * 1000, 1),
+            "latency": self.latency.stats(),
+            "effective_latency": self.effective_latency.stats(),
+        }
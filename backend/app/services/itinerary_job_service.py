@@ -0,0 +1,411 @@
+# Background itinerary generation jobs
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import LatencyHistogram, register_metrics
+from app.db.database import get_db
+from app.db.models import ItineraryJob
+from app.models.custom_exception import CustomException
+from app.models.itinerary_generate_request import ItineraryGenerateRequest
+from app.models.itinerary_job_response import ItineraryJobResponse
+from app.services.itinerary_service import ItineraryService
+from app.utils import common_utils
+from exceptions import ServiceUnavailableError
+import asyncio
+import httpx
+import ipaddress
+import json
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class ItineraryJobService:
+    """
+    Runs `ItineraryService.get_itinerary` on a bounded pool of workers.
+
+    Jobs are persisted in the app database. A worker claims a queued job with
+    a conditional update, so with several processes sharing the database each
+    job runs once, and holds a lease on it that is renewed while it runs. On
+    start, running jobs whose lease expired (their process died) are queued
+    again, and queued jobs are picked up; those still held by a live process
+    are skipped when their claim fails. While running, expired leases are
+    swept every lease period, and on stop the jobs this process holds are
+    released.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.ITINERARY_JOB_WORKERS,
+        lease_seconds: float = settings.ITINERARY_JOB_LEASE_SECONDS,
+        queue_size: int = settings.ITINERARY_JOB_QUEUE_SIZE,
+    ):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.queue_size = queue_size
+        self.job_time = LatencyHistogram()
+        # identifies this process in the owner column
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        pending = await run_in_threadpool(self._recover_pending_jobs)
+        self._enqueue(pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._sweep_periodically()))
+        logger.info(
+            common_utils.get_logging_message(
+                self.start.__name__,
+                f"Started {self.workers} itinerary job workers, {self._queue.qsize()} recovered jobs",
+            )
+        )
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        # hand interrupted jobs to the next process instead of waiting out their lease
+        await run_in_threadpool(self._release_owned_jobs)
+
+    def _enqueue(self, job_ids: list) -> None:
+        free = self.queue_size - self._queue.qsize()
+        for job_id in job_ids[:free]:
+            self._queue.put_nowait(job_id)
+        if len(job_ids) > free:
+            # they stay queued in the database for the next process that starts
+            logger.warning(f"{len(job_ids) - free} recovered jobs did not fit the queue")
+
+    def submit(self, request: ItineraryGenerateRequest) -> ItineraryJobResponse:
+        """Persist a new job and hand it to the worker pool"""
+        if self._queue is None:
+            raise CustomException("Itinerary job workers are not running")
+        if self._queue.full():
+            raise ServiceUnavailableError(
+                retry_after=self._retry_after(),
+                internal_detail=f"Itinerary job queue is full ({self.queue_size} jobs)",
+            )
+        job_id = uuid.uuid4().hex
+        db: Session = next(get_db())
+        try:
+            job = ItineraryJob(
+                id=job_id,
+                status="queued",
+                request=json.dumps(jsonable_encoder(request)),
+                callback_url=request.callback_url,
+            )
+            db.add(job)
+            db.commit()
+            response = self._to_response(job)
+        finally:
+            db.close()
+        self._queue.put_nowait(job_id)
+        logger.info(
+            common_utils.get_logging_message(self.submit.__name__, f"Queued job {job_id}")
+        )
+        return response
+
+    def _retry_after(self) -> int:
+        # time for the workers to get through the queue at the recent job duration
+        rounds = (self._queue.qsize() + 1) / self.workers
+        return max(1, math.ceil(self.job_time.percentile(50) * rounds))
+
+    def get_job(self, job_id: str) -> Optional[ItineraryJobResponse]:
+        db: Session = next(get_db())
+        try:
+            job = db.get(ItineraryJob, job_id)
+            return self._to_response(job) if job else None
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(
+                    common_utils.get_error_message(self._worker.__name__, f"job {job_id}: {str(e)}")
+                )
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        request_json = await run_in_threadpool(self._claim_job, job_id)
+        if request_json is None:
+            return
+
+        request = None
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._keep_lease(job_id))
+        try:
+            request = ItineraryGenerateRequest(**json.loads(request_json))
+            response = await ItineraryService().get_itinerary(request)
+            result = json.dumps(jsonable_encoder(response))
+            finished = await run_in_threadpool(
+                self._finish_job, job_id, status="succeeded", result=result
+            )
+            self.completed += 1
+        except Exception as e:
+            logger.error(common_utils.get_error_message(self._run_job.__name__, str(e)))
+            # CustomException messages are written for the end user
+            if isinstance(e, CustomException):
+                error = str(e)
+            elif isinstance(e, ServiceUnavailableError):
+                error = e.detail
+            else:
+                error = "Internal server error"
+            finished = await run_in_threadpool(
+                self._finish_job, job_id, status="failed", error=error
+            )
+            self.failed += 1
+        finally:
+            heartbeat.cancel()
+            self.job_time.record(time.perf_counter() - started)
+
+        if finished and request is not None and request.callback_url:
+            job = await run_in_threadpool(self.get_job, job_id)
+            if job:
+                await self._notify(request.callback_url, job)
+
+    def _lease_until(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    def _claim_job(self, job_id: str) -> Optional[str]:
+        """Take a queued job for this process; its request JSON, or None if it was not queued"""
+        db: Session = next(get_db())
+        try:
+            claimed = (
+                db.query(ItineraryJob)
+                .filter(ItineraryJob.id == job_id, ItineraryJob.status == "queued")
+                .update(
+                    {
+                        "status": "running",
+                        "owner": self.owner,
+                        "lease_until": self._lease_until(),
+                        "updated_at": datetime.now(timezone.utc),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                logger.info(f"Itinerary job {job_id} is no longer queued, skipping")
+                return None
+            return db.get(ItineraryJob, job_id).request
+        finally:
+            db.close()
+
+    def _owned_update(self, job_id: str, **fields) -> bool:
+        """Update a job this process still holds; False if its lease was lost"""
+        db: Session = next(get_db())
+        try:
+            updated = (
+                db.query(ItineraryJob)
+                .filter(
+                    ItineraryJob.id == job_id,
+                    ItineraryJob.owner == self.owner,
+                    ItineraryJob.status == "running",
+                )
+                .update(fields, synchronize_session=False)
+            )
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+
+    def _finish_job(self, job_id: str, **fields) -> bool:
+        finished = self._owned_update(
+            job_id, lease_until=None, updated_at=datetime.now(timezone.utc), **fields
+        )
+        if not finished:
+            logger.warning(f"Itinerary job {job_id} was taken over by another worker, result dropped")
+        return finished
+
+    async def _keep_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            renewed = await run_in_threadpool(
+                self._owned_update, job_id, lease_until=self._lease_until()
+            )
+            if not renewed:
+                return
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                requeued = await run_in_threadpool(self._requeue_expired_leases)
+            except Exception as e:
+                logger.error(
+                    common_utils.get_error_message(self._sweep_periodically.__name__, str(e))
+                )
+                continue
+            self._enqueue(requeued)
+
+    async def _webhook_target(self, callback_url: str) -> Optional[httpx.URL]:
+        """
+        The URL to post the webhook to, or None if it is not allowed.
+
+        Only http(s) URLs of allowlisted hosts, or without an allowlist of
+        hosts that resolve to public addresses, so a client cannot make the
+        server call loopback, private or link-local services (e.g. cloud
+        metadata). The host is replaced by the address that was checked, so
+        a second lookup by the client cannot be pointed somewhere else.
+        """
+        try:
+            url = httpx.URL(callback_url)
+        except Exception:
+            return None
+        if url.scheme not in ("http", "https") or not url.host:
+            return None
+        if settings.ITINERARY_JOB_WEBHOOK_ALLOWED_HOSTS:
+            return url if url.host in settings.ITINERARY_JOB_WEBHOOK_ALLOWED_HOSTS else None
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                url.host, url.port or (443 if url.scheme == "https" else 80),
+                type=socket.SOCK_STREAM,
+            )
+        except OSError:
+            return None
+        for info in infos:
+            address = ipaddress.ip_address(info[4][0].split("%")[0])
+            if not address.is_global or address.is_multicast:
+                return None
+        if not infos:
+            return None
+        return url.copy_with(host=infos[0][4][0].split("%")[0])
+
+    async def _notify(self, callback_url: str, job: ItineraryJobResponse) -> None:
+        target = await self._webhook_target(callback_url)
+        if target is None:
+            logger.warning(f"Skipping webhook to a disallowed URL: {callback_url}")
+            return
+        requested = httpx.URL(callback_url)
+        try:
+            async with httpx.AsyncClient(
+                timeout=settings.ITINERARY_JOB_WEBHOOK_TIMEOUT
+            ) as client:
+                await client.post(
+                    target,
+                    json=jsonable_encoder(job, exclude_none=True),
+                    headers={"Host": requested.netloc.decode("ascii")},
+                    # the certificate is still checked against the requested host
+                    extensions={"sni_hostname": requested.host},
+                )
+        except Exception as e:
+            logger.error(
+                common_utils.get_error_message(
+                    self._notify.__name__, f"webhook {callback_url} failed: {str(e)}"
+                )
+            )
+
+    def _requeue(self, db: Session, *conditions) -> list:
+        """Put running jobs matching the conditions back in the queue; their ids"""
+        now = datetime.now(timezone.utc)
+        filters = (ItineraryJob.status == "running", *conditions)
+        job_ids = [job.id for job in db.query(ItineraryJob.id).filter(*filters).all()]
+        if not job_ids:
+            return []
+        # the conditions are checked again, a job may have been finished meanwhile
+        (
+            db.query(ItineraryJob)
+            .filter(ItineraryJob.id.in_(job_ids), *filters)
+            .update(
+                {"status": "queued", "owner": None, "lease_until": None, "updated_at": now},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return job_ids
+
+    def _requeue_expired_leases(self) -> list:
+        """Requeue running jobs whose lease expired; their ids"""
+        db: Session = next(get_db())
+        try:
+            now = datetime.now(timezone.utc)
+            expired = self._requeue(
+                db,
+                (ItineraryJob.lease_until == None) | (ItineraryJob.lease_until < now),  # noqa: E711
+            )
+            if expired:
+                logger.info(f"Requeued {len(expired)} itinerary jobs with an expired lease")
+            return expired
+        finally:
+            db.close()
+
+    def _release_owned_jobs(self) -> None:
+        """Requeue the running jobs this process holds"""
+        db: Session = next(get_db())
+        try:
+            released = self._requeue(db, ItineraryJob.owner == self.owner)
+            if released:
+                logger.info(f"Released {len(released)} interrupted itinerary jobs")
+        except Exception as e:
+            logger.error(
+                common_utils.get_error_message(self._release_owned_jobs.__name__, str(e))
+            )
+            db.rollback()
+        finally:
+            db.close()
+
+    def _recover_pending_jobs(self) -> list:
+        """Requeue running jobs with an expired lease; ids of every queued job, oldest first"""
+        db: Session = next(get_db())
+        try:
+            self._requeue_expired_leases()
+            jobs = (
+                db.query(ItineraryJob.id)
+                .filter(ItineraryJob.status == "queued")
+                .order_by(ItineraryJob.created_at)
+                .all()
+            )
+            return [job.id for job in jobs]
+        except Exception as e:
+            logger.error(
+                common_utils.get_error_message(self._recover_pending_jobs.__name__, str(e))
+            )
+            db.rollback()
+            return []
+        finally:
+            db.close()
+
+    def _to_response(self, job: ItineraryJob) -> ItineraryJobResponse:
+        return ItineraryJobResponse(
+            job_id=job.id,
+            status=job.status,
+            status_url=f"/itinerary/jobs/{job.id}",
+            created_at=job.created_at.isoformat() if job.created_at else None,
+            updated_at=job.updated_at.isoformat() if job.updated_at else None,
+            result=json.loads(job.result) if job.result else None,
+            error=job.error,
+        )
+
+
+itinerary_jobs = ItineraryJobService()
+register_metrics("itinerary_jobs", itinerary_jobs.stats)
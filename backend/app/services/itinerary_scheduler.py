@@ -0,0 +1,263 @@
+# Local deterministic itinerary scheduler
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.models.itinerary_generate_response import (
+    ActivityDetails,
+    DailySchedule,
+    ScheduledActivity,
+)
+
+PRIORITY_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+
+# pace -> (share of the daily window that may be booked, buffer minutes between activities)
+PACE_SETTINGS = {
+    "relaxed": (0.7, 45),
+    "moderate": (0.85, 30),
+    "fast": (1.0, 15),
+    "intense": (1.0, 15),
+}
+
+DEFAULT_DURATION_MINUTES = 60
+DEFAULT_WINDOW = ("09:00", "21:00")
+MAX_SEARCH_ROUNDS = 50
+
+
+@dataclass
+class _Item:
+    activity: dict
+    minutes: int
+    weight: int
+
+
+@dataclass
+class ScheduleResult:
+    daily_schedules: List[DailySchedule]
+    unscheduled: List[dict] = field(default_factory=list)
+    # share of the selected priority weight that made it into the schedule
+    coverage: float = 1.0
+
+
+def _minutes(value: str) -> Optional[int]:
+    try:
+        parsed = datetime.strptime(value, "%H:%M")
+    except (TypeError, ValueError):
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+
+def _clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class ItineraryScheduler:
+    """
+    Packs the selected activities into days between daily_start_time and
+    daily_end_time, honoring max_activities_per_day and pace.
+
+    Greedy priority-weighted bin packing (heaviest, longest first into the
+    least loaded day) followed by a local search over insert, relocate and
+    swap moves that maximizes scheduled priority weight, balances day load
+    and avoids repeating a category within a day.
+    """
+
+    def __init__(self, optimization_request: dict):
+        preferences = optimization_request.get("preferences", {})
+        travel_dates = optimization_request.get("travel_dates", {})
+
+        self.start_date = datetime.strptime(travel_dates["start_date"], "%Y-%m-%d")
+        end_date = datetime.strptime(travel_dates["end_date"], "%Y-%m-%d")
+        self.total_days = max((end_date - self.start_date).days + 1, 1)
+
+        self.day_start = _minutes(preferences.get("daily_start_time"))
+        self.day_end = _minutes(preferences.get("daily_end_time"))
+        if self.day_start is None or self.day_end is None or self.day_end <= self.day_start:
+            self.day_start, self.day_end = (_minutes(value) for value in DEFAULT_WINDOW)
+        self.window = self.day_end - self.day_start
+
+        booked_share, self.buffer = PACE_SETTINGS.get(
+            preferences.get("pace"), PACE_SETTINGS["moderate"]
+        )
+        self.capacity = int(self.window * booked_share)
+        self.max_per_day = max(int(preferences.get("max_activities_per_day") or 1), 1)
+
+        self.items = [
+            _Item(
+                activity=activity,
+                minutes=int(round((activity.get("duration_hours") or 0) * 60))
+                or DEFAULT_DURATION_MINUTES,
+                weight=PRIORITY_WEIGHTS.get(activity.get("priority"), 1),
+            )
+            for activity in optimization_request.get("selected_activities", [])
+        ]
+
+    def schedule(self) -> ScheduleResult:
+        days: List[List[_Item]] = [[] for _ in range(self.total_days)]
+        unscheduled = self._pack(days)
+        unscheduled = self._improve(days, unscheduled)
+
+        total_weight = sum(item.weight for item in self.items)
+        scheduled_weight = total_weight - sum(item.weight for item in unscheduled)
+        return ScheduleResult(
+            daily_schedules=[self._to_daily_schedule(index, day) for index, day in enumerate(days)],
+            unscheduled=[item.activity for item in unscheduled],
+            coverage=round(scheduled_weight / total_weight, 4) if total_weight else 1.0,
+        )
+
+    # packing
+
+    def _load(self, day: List[_Item]) -> int:
+        return sum(item.minutes for item in day) + self.buffer * max(len(day) - 1, 0)
+
+    def _fits(self, day: List[_Item]) -> bool:
+        if len(day) > self.max_per_day:
+            return False
+        if len(day) == 1:
+            # a single long activity may use the whole window regardless of pace
+            return day[0].minutes <= self.window
+        if self._load(day) > self.capacity:
+            return False
+        # rounding the start times can push the last activity past day_end
+        _, _, last_end = self._timeline(day)[-1]
+        return last_end <= self.day_end
+
+    def _timeline(self, day: List[_Item]) -> List[tuple]:
+        """(item, start, end) minutes in schedule order, as they are written out"""
+        ordered = sorted(day, key=lambda item: (-item.weight, -item.minutes))
+        slots = []
+        clock = self.day_start
+        for item in ordered:
+            end = clock + item.minutes
+            slots.append((item, clock, end))
+            clock = end + self.buffer
+            # round to the next 5 minutes for readable start times
+            clock += -clock % 5
+        return slots
+
+    def _pack(self, days: List[List[_Item]]) -> List[_Item]:
+        unscheduled = []
+        ordered = sorted(
+            self.items,
+            key=lambda item: (-item.weight, -item.minutes, item.activity.get("id") or ""),
+        )
+        for item in ordered:
+            candidates = [day for day in days if self._fits(day + [item])]
+            if not candidates:
+                unscheduled.append(item)
+                continue
+            min(candidates, key=self._load).append(item)
+        return unscheduled
+
+    # local search
+
+    def _score(self, days: List[List[_Item]]) -> float:
+        scheduled_weight = sum(item.weight for day in days for item in day)
+        loads = [self._load(day) for day in days]
+        mean_load = sum(loads) / len(loads)
+        balance_penalty = sum((load - mean_load) ** 2 for load in loads) / (self.window ** 2)
+        repeated_categories = sum(
+            len(day) - len({item.activity.get("category") for item in day}) for day in days
+        )
+        return scheduled_weight * 100 - balance_penalty * 10 - repeated_categories * 5
+
+    def _improve(self, days: List[List[_Item]], unscheduled: List[_Item]) -> List[_Item]:
+        for _ in range(MAX_SEARCH_ROUNDS):
+            if not (
+                self._try_insert(days, unscheduled)
+                or self._try_relocate(days)
+                or self._try_swap(days)
+            ):
+                break
+        return unscheduled
+
+    def _try_insert(self, days: List[List[_Item]], unscheduled: List[_Item]) -> bool:
+        """Place an unscheduled item, evicting a lighter one if needed"""
+        for item in sorted(unscheduled, key=lambda item: -item.weight):
+            for day in days:
+                if self._fits(day + [item]):
+                    day.append(item)
+                    unscheduled.remove(item)
+                    return True
+            for day in days:
+                for index, resident in enumerate(day):
+                    if resident.weight >= item.weight:
+                        continue
+                    candidate = day[:index] + day[index + 1:] + [item]
+                    if self._fits(candidate):
+                        day[:] = candidate
+                        unscheduled.remove(item)
+                        unscheduled.append(resident)
+                        return True
+        return False
+
+    def _try_relocate(self, days: List[List[_Item]]) -> bool:
+        current = self._score(days)
+        for source in days:
+            for item in list(source):
+                for target in days:
+                    if target is source or not self._fits(target + [item]):
+                        continue
+                    source.remove(item)
+                    target.append(item)
+                    if self._score(days) > current + 1e-9:
+                        return True
+                    target.remove(item)
+                    source.append(item)
+        return False
+
+    def _try_swap(self, days: List[List[_Item]]) -> bool:
+        current = self._score(days)
+        for i, first_day in enumerate(days):
+            for second_day in days[i + 1:]:
+                for a_index, a in enumerate(first_day):
+                    for b_index, b in enumerate(second_day):
+                        first_day[a_index], second_day[b_index] = b, a
+                        if (
+                            self._fits(first_day)
+                            and self._fits(second_day)
+                            and self._score(days) > current + 1e-9
+                        ):
+                            return True
+                        first_day[a_index], second_day[b_index] = a, b
+        return False
+
+    # output
+
+    def _to_daily_schedule(self, index: int, day: List[_Item]) -> DailySchedule:
+        timeline = self._timeline(day)
+        activities = []
+        for item, start, end in timeline:
+            activities.append(
+                ScheduledActivity(
+                    start_time=_clock(start),
+                    end_time=_clock(min(end, self.day_end)),
+                    activity=ActivityDetails(
+                        id=item.activity.get("id"),
+                        name=item.activity.get("name", ""),
+                        type=item.activity.get("category") or "activity",
+                        notes=item.activity.get("description") or "",
+                    ),
+                )
+            )
+
+        return DailySchedule(
+            date=(self.start_date + timedelta(days=index)).strftime("%Y-%m-%d"),
+            day_number=index + 1,
+            theme=self._theme([item for item, _, _ in timeline]),
+            activities=activities,
+            daily_cost=round(sum(item.activity.get("cost") or 0 for item in day), 2),
+            walking_distance="n/a",
+        )
+
+    def _theme(self, day: List[_Item]) -> str:
+        if not day:
+            return "Free day to explore"
+        categories: Dict[str, None] = {}
+        for item in day:
+            categories[(item.activity.get("category") or "activity").replace("_", " ").title()] = None
+        return " & ".join(list(categories)[:2])
+
+
+def build_schedule(optimization_request: dict) -> ScheduleResult:
+    """Schedule the output of `ItineraryService._prepare_optimization_request`"""
+    return ItineraryScheduler(optimization_request).schedule()
@@ -7,15 +7,66 @@ from app.models.custom_exception import CustomException
 from app.models.itinerary_questionnaire_request import ItineraryQuestionnaireRequest
 from app.models.itinerary_questionnaire_response import ItineraryQuestionnaireResponse
 from app.models.itinerary_generate_request import ItineraryGenerateRequest
-from app.models.itinerary_generate_response import ItineraryGenerateResponse
-from app.services.openai_client import get_itinerary_activity, get_optimized_itinerary
+from app.models.itinerary_generate_response import (
+    DailySchedule,
+    Itinerary,
+    ItineraryGenerateResponse,
+)
+from app.services.openai_client import (
+    get_itinerary_activity,
+    get_itinerary_annotations,
+    get_itinerary_continuation,
+    get_itinerary_day,
+    get_itinerary_plan,
+    get_optimized_itinerary,
+    stream_optimized_itinerary,
+)
+from app.utils.llm_utils import JsonArrayStreamParser
+from app.services.itinerary_scheduler import build_schedule
+from app.services.itinerary_summary import price_daily_schedules, summarize_schedules
+from app.services.response_cache import build_response_cache
+from app.services.preference_normalizer import (
+    get_policy,
+    normalize_questionnaire_request,
+)
+from app.core.config import settings
+from app.core.metrics import LatencyHistogram, register_metrics
+from exceptions import CircuitOpenError, ServiceUnavailableError
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional, Tuple
+import asyncio
+import time
 from sqlalchemy.orm import Session
 from app.db.database import get_db
-from app.db.models import Questionnaire, Activity, RateLimitEntry
+from app.db.models import Questionnaire, Activity, RateLimitBucket
 
 
 logger = logging.getLogger(__name__)
 
+# suggested activities for equivalent questionnaires, shared across requests
+activity_cache = build_response_cache(
+    namespace="activities",
+    backend=settings.ACTIVITY_CACHE_BACKEND,
+    ttl_seconds=settings.ACTIVITY_CACHE_TTL_SECONDS,
+    max_entries=settings.ACTIVITY_CACHE_MAX_ENTRIES,
+)
+register_metrics("activity_cache", activity_cache.stats)
+
+# streaming latency: time to the first complete day vs. the whole document
+stream_latency = {
+    "time_to_first_day": LatencyHistogram(),
+    "time_to_last_token": LatencyHistogram(),
+}
+register_metrics(
+    "itinerary_stream",
+    lambda: {name: histogram.stats() for name, histogram in stream_latency.items()},
+)
+
+# itineraries cut off before their last day: days kept, days continued, gaps left
+salvage_counts = Counter()
+register_metrics("itinerary_salvage", lambda: dict(salvage_counts))
+
 # we can use a context manager to handle database sessions
 # to ensure proper cleanup and avoid session leaks
 # from contextlib import contextmanager
@@ -33,14 +84,24 @@ class ItineraryService:
     def __init__(self):
         self.questionnaire_repo = None
 
-    def get_activities(self, request: ItineraryQuestionnaireRequest) -> dict:
+    async def get_activities(self, request: ItineraryQuestionnaireRequest) -> dict:
         """
         Get itinerary activities based on user preferences and selected destination.
         """
 
         logger.debug(common_utils.get_logging_message(self.get_activities.__name__))
 
-        response_text = get_itinerary_activity(request)
+        normalized = normalize_questionnaire_request(
+            request, get_policy(settings.PREFERENCE_BUCKETING_POLICY)
+        )
+        response_text = await activity_cache.get(normalized.cache_key)
+        cacheable = False
+        if response_text is None:
+            completion = await get_itinerary_activity(normalized.prompt_payload)
+            if completion is not None:
+                response_text = completion.text
+                # salvaged output would be served to every equivalent request
+                cacheable = not (completion.repaired or completion.truncated)
         if response_text is None:
             logger.error(
                 common_utils.get_error_message(
@@ -53,6 +114,10 @@ class ItineraryService:
         try:
             response_json = json.loads(response_text)
             activities = response_json.get("suggested_activities", [])
+            # validate before caching so a malformed answer is never reused
+            ItineraryQuestionnaireResponse(suggested_activities=activities)
+            if cacheable and not response_json.get("errors"):
+                await activity_cache.set(normalized.cache_key, response_text)
 
             # Fix: Pass destination data to save method
             destination_data = None
@@ -92,7 +157,7 @@ class ItineraryService:
             )
             raise CustomException("Invalid response format.")
 
-    def get_itinerary(
+    async def get_itinerary(
         self, request: ItineraryGenerateRequest
     ) -> ItineraryGenerateResponse:
         """
@@ -100,7 +165,498 @@ class ItineraryService:
         """
         logger.debug(common_utils.get_logging_message(self.get_itinerary.__name__))
 
-        # optimization logic go here
+        optimization_request = self._build_optimization_request(request)
+        if request.generation_mode == "parallel":
+            try:
+                return await self._generate_days_in_parallel(optimization_request)
+            except CircuitOpenError as e:
+                return await self._generate_fallback(optimization_request, e.internal_detail)
+        if request.generation_mode in ("scheduled", "fast"):
+            return await self._generate_scheduled(
+                optimization_request, annotate=request.generation_mode == "scheduled"
+            )
+
+        # call openai client to get optimized itinerary
+        try:
+            response_text = await get_optimized_itinerary(optimization_request)
+        except CircuitOpenError as e:
+            return await self._generate_fallback(optimization_request, e.internal_detail)
+        if response_text is None:
+            return await self._generate_fallback(
+                optimization_request, "Failed to fetch itinerary from OpenAI."
+            )
+
+        try:
+            response_json = json.loads(response_text)
+            response = ItineraryGenerateResponse(**response_json)
+        except json.JSONDecodeError as e:
+            logger.warning(
+                common_utils.get_error_message(
+                    self.get_itinerary.__name__, 
+                    f"JSON parsing failed: {str(e)}. Response length: {len(response_text) if response_text else 0}"
+                )
+            )
+            # keep the complete days of the cut-off document
+            response = ItineraryGenerateResponse(
+                itinerary=Itinerary(
+                    destination=optimization_request["destination"]["name"],
+                    total_days=self._trip_days(optimization_request) or 0,
+                    daily_schedules=self._salvage_schedules(response_text),
+                )
+            )
+        except Exception as e:
+            logger.error(
+                common_utils.get_error_message(self.get_itinerary.__name__, str(e))
+            )
+            raise CustomException("Invalid response format.")
+
+        if response.itinerary:
+            schedules = response.itinerary.daily_schedules
+            schedules.extend(await self._continue_itinerary(optimization_request, schedules))
+            if not schedules:
+                raise CustomException("OpenAI response was truncated. Please try again.")
+            schedules.sort(key=lambda schedule: schedule.day_number)
+            # aggregates are computed locally, not generated
+            response.summary = summarize_schedules(
+                schedules, optimization_request["selected_activities"]
+            )
+        return response
+
+    @staticmethod
+    def _trip_days(optimization_request: dict) -> Optional[int]:
+        travel_dates = optimization_request.get("travel_dates") or {}
+        try:
+            start_dt = datetime.strptime(travel_dates["start_date"], "%Y-%m-%d")
+            end_dt = datetime.strptime(travel_dates["end_date"], "%Y-%m-%d")
+        except (KeyError, TypeError, ValueError):
+            return None
+        return (end_dt - start_dt).days + 1
+
+    def _salvage_schedules(self, response_text: str) -> list[DailySchedule]:
+        """Every complete, valid DailySchedule of an itinerary document, cut off or not"""
+        schedules = []
+        for element in JsonArrayStreamParser("daily_schedules").feed(response_text or ""):
+            try:
+                schedules.append(DailySchedule(**json.loads(element)))
+            except Exception as e:
+                logger.warning(
+                    common_utils.get_error_message(
+                        self._salvage_schedules.__name__,
+                        f"Skipping invalid daily schedule: {str(e)}",
+                    )
+                )
+        return schedules
+
+    async def _continue_itinerary(
+        self, optimization_request: dict, schedules: list[DailySchedule]
+    ) -> list[DailySchedule]:
+        """
+        The days missing from `schedules`, requested from the model without
+        regenerating the complete ones. Returns only the new days; gaps are
+        left if the continuation calls fail or come back short.
+        """
+        total_days = self._trip_days(optimization_request)
+        if total_days is None:
+            return []
+        planned = {schedule.day_number for schedule in schedules}
+        missing = [number for number in range(1, total_days + 1) if number not in planned]
+        if not missing:
+            return []
+        salvage_counts["cut_off"] += 1
+        salvage_counts["salvaged_days"] += len(planned)
+
+        continued = []
+        for _ in range(settings.ITINERARY_CONTINUATION_MAX_ROUNDS):
+            days = await self._request_days(optimization_request, schedules + continued, missing)
+            if not days:
+                break
+            continued.extend(days)
+            missing = [number for number in missing if number not in {day.day_number for day in days}]
+            if not missing:
+                break
+        salvage_counts["continued_days"] += len(continued)
+        if missing:
+            salvage_counts["incomplete"] += 1
+            logger.warning(
+                common_utils.get_error_message(
+                    self._continue_itinerary.__name__, f"Days still missing: {missing}"
+                )
+            )
+        return continued
+
+    async def _request_days(
+        self, optimization_request: dict, schedules: list[DailySchedule], day_numbers: list[int]
+    ) -> list[DailySchedule]:
+        """One continuation call for `day_numbers`, given the days already planned"""
+        start_dt = datetime.strptime(optimization_request["travel_dates"]["start_date"], "%Y-%m-%d")
+
+        def date_of(day_number: int) -> str:
+            return (start_dt + timedelta(days=day_number - 1)).strftime("%Y-%m-%d")
+
+        planned_names = {item.activity.name for schedule in schedules for item in schedule.activities}
+        continuation_request = {
+            **optimization_request,
+            "selected_activities": [
+                activity
+                for activity in optimization_request["selected_activities"]
+                if activity.get("name") not in planned_names
+            ],
+            # the missing days need not be consecutive
+            "day_numbers": day_numbers,
+            "day_dates": [date_of(day_number) for day_number in day_numbers],
+            "completed_days": [
+                {
+                    "day_number": schedule.day_number,
+                    "theme": schedule.theme,
+                    "activities": [item.activity.name for item in schedule.activities],
+                }
+                for schedule in sorted(schedules, key=lambda schedule: schedule.day_number)
+            ],
+        }
+        salvage_counts["continuations"] += 1
+        try:
+            response_text = await get_itinerary_continuation(continuation_request)
+        except ServiceUnavailableError as e:
+            logger.warning(
+                common_utils.get_error_message(self._request_days.__name__, e.internal_detail)
+            )
+            return []
+
+        days = {}
+        for schedule in self._salvage_schedules(response_text):
+            if schedule.day_number in day_numbers and schedule.day_number not in days:
+                # the trip's calendar is authoritative
+                schedule.date = date_of(schedule.day_number)
+                days[schedule.day_number] = schedule
+        return list(days.values())
+
+    async def _generate_days_in_parallel(
+        self, optimization_request: dict
+    ) -> ItineraryGenerateResponse:
+        """
+        Plan the days with one cheap call, then generate every day's schedule
+        concurrently, so wall-clock time is roughly one day's generation.
+        """
+        travel_dates = optimization_request["travel_dates"]
+        start_dt = datetime.strptime(travel_dates["start_date"], "%Y-%m-%d")
+        end_dt = datetime.strptime(travel_dates["end_date"], "%Y-%m-%d")
+        total_days = (end_dt - start_dt).days + 1
+        selected_activities = optimization_request["selected_activities"]
+        activities_by_id = {activity["id"]: activity for activity in selected_activities}
+
+        plan = await self._plan_days(optimization_request, total_days)
+        themes = {day["day_number"]: day["theme"] for day in plan}
+        semaphore = asyncio.Semaphore(settings.ITINERARY_DAY_CONCURRENCY)
+
+        async def generate_day(day: dict) -> DailySchedule:
+            day_number = day["day_number"]
+            date = (start_dt + timedelta(days=day_number - 1)).strftime("%Y-%m-%d")
+            day_request = {
+                "destination": optimization_request["destination"]["name"],
+                "date": date,
+                "day_number": day_number,
+                "theme": day["theme"],
+                "assigned_activities": [
+                    activities_by_id[activity_id] for activity_id in day["activity_ids"]
+                ],
+                "preferences": optimization_request["preferences"],
+                "other_day_themes": [
+                    theme for number, theme in themes.items() if number != day_number
+                ],
+            }
+            async with semaphore:
+                response_text = await get_itinerary_day(day_request)
+            if response_text is None:
+                raise CustomException("Failed to fetch activities from OpenAI.")
+            try:
+                schedule = DailySchedule(**json.loads(response_text))
+            except Exception as e:
+                logger.error(
+                    common_utils.get_error_message(
+                        self._generate_days_in_parallel.__name__,
+                        f"Day {day_number}: {str(e)}",
+                    )
+                )
+                raise CustomException("Invalid response format.")
+            # the plan is authoritative for the calendar
+            schedule.date = date
+            schedule.day_number = day_number
+            return schedule
+
+        tasks = [asyncio.create_task(generate_day(day)) for day in plan]
+        try:
+            schedules = await asyncio.gather(*tasks)
+        except BaseException:
+            # one failed day fails the itinerary: stop the calls still running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        itinerary = Itinerary(
+            destination=optimization_request["destination"]["name"],
+            total_days=total_days,
+            daily_schedules=sorted(schedules, key=lambda schedule: schedule.day_number),
+        )
+        return ItineraryGenerateResponse(
+            itinerary=itinerary,
+            summary=summarize_schedules(itinerary.daily_schedules, selected_activities),
+        )
+
+    async def _plan_days(self, optimization_request: dict, total_days: int) -> list[dict]:
+        """Day themes and activity assignment; falls back to round-robin"""
+        selected_ids = [activity["id"] for activity in optimization_request["selected_activities"]]
+        days = {
+            number: {"day_number": number, "theme": f"Day {number}", "activity_ids": []}
+            for number in range(1, total_days + 1)
+        }
+
+        try:
+            response_text = await get_itinerary_plan(
+                {**optimization_request, "total_days": total_days}
+            )
+        except ServiceUnavailableError:
+            logger.warning("Day plan bulkhead is full, using round-robin")
+            response_text = None
+        try:
+            for planned in json.loads(response_text or "{}").get("days", []):
+                day = days.get(int(planned.get("day_number", 0)))
+                if day is None:
+                    continue
+                day["theme"] = planned.get("theme") or day["theme"]
+                day["activity_ids"] = [
+                    activity_id
+                    for activity_id in planned.get("activity_ids", [])
+                    if activity_id in selected_ids
+                ]
+        except Exception as e:
+            logger.warning(
+                common_utils.get_error_message(
+                    self._plan_days.__name__, f"Unusable day plan, using round-robin: {str(e)}"
+                )
+            )
+
+        # every selected activity lands on exactly one day
+        assigned = set()
+        for day in days.values():
+            day["activity_ids"] = [
+                activity_id for activity_id in day["activity_ids"] if activity_id not in assigned
+            ]
+            assigned.update(day["activity_ids"])
+        for activity_id in selected_ids:
+            if activity_id not in assigned:
+                lightest = min(days.values(), key=lambda day: len(day["activity_ids"]))
+                lightest["activity_ids"].append(activity_id)
+                assigned.add(activity_id)
+        return list(days.values())
+
+    async def _generate_scheduled(
+        self, optimization_request: dict, annotate: bool
+    ) -> ItineraryGenerateResponse:
+        """
+        Pack the activities into time slots locally; the LLM is only asked
+        for day themes and activity notes, and skipped entirely in fast mode.
+        """
+        result = build_schedule(optimization_request)
+        if result.unscheduled:
+            logger.warning(
+                common_utils.get_logging_message(
+                    self._generate_scheduled.__name__,
+                    f"Activities that did not fit the schedule: "
+                    f"{[activity['id'] for activity in result.unscheduled]}",
+                )
+            )
+        if annotate:
+            await self._annotate_schedules(optimization_request, result.daily_schedules)
+
+        itinerary = Itinerary(
+            destination=optimization_request["destination"]["name"],
+            total_days=len(result.daily_schedules),
+            daily_schedules=result.daily_schedules,
+        )
+        return ItineraryGenerateResponse(
+            itinerary=itinerary,
+            summary=summarize_schedules(
+                itinerary.daily_schedules, optimization_request["selected_activities"]
+            ),
+        )
+
+    async def _generate_fallback(
+        self, optimization_request: dict, reason: str
+    ) -> ItineraryGenerateResponse:
+        """The local schedule, for when the provider cannot be reached"""
+        logger.warning(
+            common_utils.get_error_message(
+                self._generate_fallback.__name__,
+                f"{reason} Serving the local schedule instead.",
+            )
+        )
+        return await self._generate_scheduled(optimization_request, annotate=False)
+
+    async def _annotate_schedules(
+        self, optimization_request: dict, schedules: list[DailySchedule]
+    ) -> None:
+        """Fill in LLM themes and notes; the local ones stay if the call fails"""
+        annotation_request = {
+            "destination": optimization_request["destination"]["name"],
+            "days": [
+                {
+                    "day_number": schedule.day_number,
+                    "activities": [item.activity.name for item in schedule.activities],
+                }
+                for schedule in schedules
+            ],
+        }
+        try:
+            response_text = await get_itinerary_annotations(annotation_request)
+        except ServiceUnavailableError:
+            logger.warning("Annotation bulkhead is full, keeping local themes")
+            return
+        try:
+            annotations = {
+                int(day.get("day_number", 0)): day
+                for day in json.loads(response_text or "{}").get("days", [])
+            }
+        except Exception as e:
+            logger.warning(
+                common_utils.get_error_message(
+                    self._annotate_schedules.__name__,
+                    f"Unusable annotations, keeping local themes: {str(e)}",
+                )
+            )
+            return
+
+        for schedule in schedules:
+            day = annotations.get(schedule.day_number)
+            if not day:
+                continue
+            schedule.theme = day.get("theme") or schedule.theme
+            notes = day.get("notes") or {}
+            for item in schedule.activities:
+                note = notes.get(item.activity.name)
+                if isinstance(note, str) and note:
+                    item.activity.notes = note
+
+    def stream_itinerary(
+        self, request: ItineraryGenerateRequest
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Validate the request up front (so errors surface before the stream
+        starts), then return an iterator of (event, data) pairs that yields
+        each DailySchedule as soon as the model closes its JSON object.
+        """
+        logger.debug(common_utils.get_logging_message(self.stream_itinerary.__name__))
+        optimization_request = self._build_optimization_request(request)
+        return self._stream_daily_schedules(optimization_request)
+
+    async def _stream_daily_schedules(
+        self, optimization_request: dict
+    ) -> AsyncIterator[Tuple[str, object]]:
+        parser = JsonArrayStreamParser("daily_schedules")
+        selected_activities = optimization_request.get("selected_activities", [])
+        chunks = []
+        schedules = []
+        days_sent = 0
+        started = time.perf_counter()
+
+        try:
+            async for text in stream_optimized_itinerary(optimization_request):
+                chunks.append(text)
+                for element in parser.feed(text):
+                    try:
+                        schedule = DailySchedule(**json.loads(element))
+                    except Exception as e:
+                        logger.warning(
+                            common_utils.get_error_message(
+                                self._stream_daily_schedules.__name__,
+                                f"Skipping invalid daily schedule: {str(e)}",
+                            )
+                        )
+                        continue
+                    price_daily_schedules([schedule], selected_activities)
+                    schedules.append(schedule)
+                    if days_sent == 0:
+                        stream_latency["time_to_first_day"].record(
+                            time.perf_counter() - started
+                        )
+                    days_sent += 1
+                    yield "day", schedule
+        except ServiceUnavailableError as e:
+            logger.warning(
+                common_utils.get_error_message(
+                    self._stream_daily_schedules.__name__, e.internal_detail
+                )
+            )
+            if isinstance(e, CircuitOpenError) and days_sent == 0:
+                async for event in self._stream_fallback(optimization_request, e.internal_detail):
+                    yield event
+                return
+            yield "error", {"errors": [ErrorItem(code="503", message=e.detail)]}
+            return
+        except Exception as e:
+            logger.error(
+                common_utils.get_error_message(
+                    self._stream_daily_schedules.__name__, str(e)
+                )
+            )
+            if days_sent == 0:
+                async for event in self._stream_fallback(optimization_request, str(e)):
+                    yield event
+                return
+            yield "error", {"errors": [ErrorItem(code="500", message="Failed to fetch itinerary from OpenAI.")]}
+            return
+        stream_latency["time_to_last_token"].record(time.perf_counter() - started)
+
+        try:
+            response_json = json.loads("".join(chunks))
+            itinerary = response_json.get("itinerary") or {}
+        except Exception as e:
+            logger.warning(
+                common_utils.get_error_message(
+                    self._stream_daily_schedules.__name__,
+                    f"Stream ended with an unparsable document after {days_sent} days: {str(e)}",
+                )
+            )
+            itinerary = None
+
+        # the days the model did not get to are requested in a continuation
+        continued = await self._continue_itinerary(optimization_request, schedules)
+        for schedule in sorted(continued, key=lambda schedule: schedule.day_number):
+            price_daily_schedules([schedule], selected_activities)
+            schedules.append(schedule)
+            days_sent += 1
+            yield "day", schedule
+        if itinerary is None and not continued:
+            yield "error", {"errors": [ErrorItem(code="500", message="OpenAI response was truncated. Please try again.")]}
+            return
+        itinerary = itinerary or {}
+
+        yield "summary", {
+            "destination": itinerary.get("destination")
+            or (optimization_request.get("destination") or {}).get("name"),
+            "total_days": itinerary.get("total_days") or self._trip_days(optimization_request),
+            "summary": summarize_schedules(schedules, selected_activities),
+        }
+        yield "done", {"days": days_sent}
+
+    async def _stream_fallback(
+        self, optimization_request: dict, reason: str
+    ) -> AsyncIterator[Tuple[str, object]]:
+        response = await self._generate_fallback(optimization_request, reason)
+        for schedule in response.itinerary.daily_schedules:
+            yield "day", schedule
+        yield "summary", {
+            "destination": response.itinerary.destination,
+            "total_days": response.itinerary.total_days,
+            "summary": response.summary,
+        }
+        yield "done", {"days": len(response.itinerary.daily_schedules)}
+
+    def _build_optimization_request(self, request: ItineraryGenerateRequest) -> dict:
+        """
+        Validate the questionnaire, trip length and selected activities, and
+        build the optimization request sent to the LLM.
+        """
         # Step 1: Get questionnaire and destination info from database
         questionnaire_data = self._get_questionnaire_from_db(request.questionnaire_id)
         if not questionnaire_data:
@@ -110,7 +666,7 @@ class ItineraryService:
                     f"Questionnaire not found: {request.questionnaire_id}",
                 )
             )
-            raise CustomException("Questionnaire not found")
+            raise CustomException("Questionnaire not found", status_code=404)
 
         if not questionnaire_data.get("ready_for_optimization", False):
             logger.error(
@@ -119,7 +675,7 @@ class ItineraryService:
                     f"Questionnaire not ready for optimization: {request.questionnaire_id}",
                 )
             )
-            raise CustomException("Questionnaire not ready for optimization")
+            raise CustomException("Questionnaire not ready for optimization", status_code=400)
 
         # Step 1.5: Validate trip length (max 10 days)
         start_date = questionnaire_data.get("start_date")
@@ -132,14 +688,20 @@ class ItineraryService:
                 end_dt = datetime.strptime(end_date, "%Y-%m-%d")
                 trip_length = (end_dt - start_dt).days + 1
                 
-                if trip_length > 10:
+                # per-day and local scheduling keep latency flat, so they allow longer trips
+                max_trip_days = (
+                    settings.MAX_TRIP_DAYS
+                    if request.generation_mode == "single"
+                    else settings.MAX_TRIP_DAYS_PARALLEL
+                )
+                if trip_length > max_trip_days:
                     logger.error(
                         common_utils.get_error_message(
                             self.get_itinerary.__name__,
-                            f"Trip length ({trip_length} days) exceeds maximum allowed (10 days)",
+                            f"Trip length ({trip_length} days) exceeds maximum allowed ({max_trip_days} days)",
                         )
                     )
-                    raise CustomException(f"Trip length of {trip_length} days exceeds the maximum allowed length of 10 days. Please select a shorter trip for optimal recommendations.")
+                    raise CustomException(f"Trip length of {trip_length} days exceeds the maximum allowed length of {max_trip_days} days. Please select a shorter trip for optimal recommendations.", status_code=400)
                 
                 if trip_length < 1:
                     logger.error(
@@ -148,7 +710,7 @@ class ItineraryService:
                             f"Invalid trip length: {trip_length} days",
                         )
                     )
-                    raise CustomException("Trip length must be at least 1 day. Please check your travel dates.")
+                    raise CustomException("Trip length must be at least 1 day. Please check your travel dates.", status_code=400)
                     
                 logger.info(
                     common_utils.get_logging_message(
@@ -164,7 +726,7 @@ class ItineraryService:
                         f"Invalid date format in questionnaire: {start_date} to {end_date}",
                     )
                 )
-                raise CustomException("Invalid travel dates format. Please select valid dates.")
+                raise CustomException("Invalid travel dates format. Please select valid dates.", status_code=400)
         else:
             logger.error(
                 common_utils.get_error_message(
@@ -172,7 +734,7 @@ class ItineraryService:
                     "Missing travel dates in questionnaire data",
                 )
             )
-            raise CustomException("Travel dates are required for itinerary generation.")
+            raise CustomException("Travel dates are required for itinerary generation.", status_code=400)
 
         # Step 2: Get all activities from database and filter by selected ones
         all_activities = self._get_activities_from_db(request.questionnaire_id)
@@ -183,7 +745,7 @@ class ItineraryService:
                     f"No activities found for questionnaire: {request.questionnaire_id}",
                 )
             )
-            raise CustomException("No activities found for this questionnaire")
+            raise CustomException("No activities found for this questionnaire", status_code=404)
 
         # Step 3: Filter activities based on selected activities in request
         selected_activities = self._filter_selected_activities(
@@ -196,7 +758,7 @@ class ItineraryService:
                     "None of the selected activities were found in the database",
                 )
             )
-            raise CustomException("Selected activities not found")
+            raise CustomException("Selected activities not found", status_code=404)
 
         # Step 4: Prepare optimization request with selected activities + preferences
         optimization_request = self._prepare_optimization_request(
@@ -204,35 +766,7 @@ class ItineraryService:
             selected_activities=selected_activities,
             request=request,
         )
-
-        # call openai client to get optimized itinerary
-        response_text = get_optimized_itinerary(optimization_request)
-        if response_text is None:
-            logger.error(
-                common_utils.get_error_message(
-                    self.get_itinerary.__name__,
-                    "Failed to fetch activities from OpenAI.",
-                )
-            )
-            raise CustomException("Failed to fetch activities from OpenAI.")
-
-        try:
-            response_json = json.loads(response_text)
-            return ItineraryGenerateResponse(**response_json)
-
-        except json.JSONDecodeError as e:
-            logger.error(
-                common_utils.get_error_message(
-                    self.get_itinerary.__name__, 
-                    f"JSON parsing failed: {str(e)}. Response length: {len(response_text) if response_text else 0}"
-                )
-            )
-            raise CustomException("OpenAI response was truncated. Please try again.")
-        except Exception as e:
-            logger.error(
-                common_utils.get_error_message(self.get_itinerary.__name__, str(e))
-            )
-            raise CustomException("Invalid response format.")
+        return optimization_request
 
     def _get_activities_from_db(self, questionnaire_id: str) -> list[dict]:
         """Retrieve activities from the database for a given questionnaire ID"""
@@ -482,12 +1016,12 @@ class ItineraryService:
             for a in activities:
                 print(f"  {a.id} | {a.questionnaire_id} | {a.name} | {a.priority}")
 
-            rate_limits = db.query(RateLimitEntry).all()
-            print(f"\n⏱️ RATE LIMITS ({len(rate_limits)}):")
+            rate_limits = db.query(RateLimitBucket).all()
+            print(f"\n⏱️ RATE LIMIT BUCKETS ({len(rate_limits)}):")
             for r in rate_limits:
                 print(
-                    f"  {r.id} | {r.ip_address} | Count: {r.request_count} | "
-                    f"Window Start: {r.window_start} | Last Request: {r.last_request}"
+                    f"  {r.ip_address} | Count: {r.request_count} | "
+                    f"Minute: {datetime.fromtimestamp(r.bucket_start * 60, timezone.utc)}"
                 )
 
         except Exception as e:
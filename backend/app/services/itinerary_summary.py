@@ -0,0 +1,127 @@
+# Itinerary aggregates computed from the schedule and the stored activities
+from typing import Dict, List, Optional
+from app.models.itinerary_generate_response import (
+    ActivityDetails,
+    DailySchedule,
+    ItinerarySummary,
+)
+from app.services.itinerary_scheduler import PRIORITY_WEIGHTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# optimization_score = coverage of the selected activities (priority weighted)
+# blended with how closely their slots match the stored duration_hours
+COVERAGE_WEIGHT = 0.8
+DURATION_FIT_WEIGHT = 0.2
+
+
+def _key(name: str) -> str:
+    return " ".join((name or "").lower().split())
+
+
+def _slot_hours(start_time: str, end_time: str) -> float:
+    try:
+        start_hours, start_minutes = (int(part) for part in start_time.split(":"))
+        end_hours, end_minutes = (int(part) for part in end_time.split(":"))
+    except (AttributeError, ValueError):
+        return 0.0
+    minutes = (end_hours * 60 + end_minutes) - (start_hours * 60 + start_minutes)
+    if minutes < 0:
+        minutes += 24 * 60  # ends after midnight
+    return minutes / 60
+
+
+class _SelectedActivities:
+    """
+    Looks up scheduled activities among the selected ones by the id the
+    model carried through, or by name when the id is missing or unknown.
+    """
+
+    def __init__(self, selected_activities: List[dict]):
+        self._by_id = {
+            str(activity["id"]): index
+            for index, activity in enumerate(selected_activities)
+            if activity.get("id") is not None
+        }
+        self._by_name = {
+            _key(activity.get("name")): index for index, activity in enumerate(selected_activities)
+        }
+        self.name_matches = 0
+
+    def find(self, details: ActivityDetails) -> Optional[int]:
+        if details.id is not None and details.id in self._by_id:
+            return self._by_id[details.id]
+        index = self._by_name.get(_key(details.name))
+        if index is not None:
+            self.name_matches += 1
+        return index
+
+
+def price_daily_schedules(
+    schedules: List[DailySchedule], selected_activities: List[dict]
+) -> None:
+    """
+    Set each day's daily_cost from the stored cost of the selected activities
+    it contains. Complementary activities added by the LLM (meals, walks)
+    have no stored cost and count as 0.
+    """
+    selected = _SelectedActivities(selected_activities)
+    costs = [float(activity.get("cost") or 0) for activity in selected_activities]
+    for schedule in schedules:
+        indexes = [selected.find(item.activity) for item in schedule.activities]
+        schedule.daily_cost = round(
+            sum(costs[index] for index in indexes if index is not None), 2
+        )
+    if selected.name_matches:
+        logger.info(
+            f"{selected.name_matches} scheduled activities priced by name, without a known id"
+        )
+
+
+def summarize_schedules(
+    schedules: List[DailySchedule], selected_activities: List[dict]
+) -> ItinerarySummary:
+    """
+    Price the days and compute the summary in one column-wise pass over the
+    selected activities, instead of trusting numbers generated by the LLM.
+    """
+    price_daily_schedules(schedules, selected_activities)
+
+    # scheduled hours per selected activity
+    selected = _SelectedActivities(selected_activities)
+    scheduled_hours: Dict[int, float] = {}
+    for schedule in schedules:
+        for item in schedule.activities:
+            index = selected.find(item.activity)
+            if index is not None:
+                scheduled_hours[index] = scheduled_hours.get(index, 0.0) + _slot_hours(
+                    item.start_time, item.end_time
+                )
+
+    # columns of the selected activities
+    weights = [PRIORITY_WEIGHTS.get(activity.get("priority"), 1) for activity in selected_activities]
+    expected = [float(activity.get("duration_hours") or 0) for activity in selected_activities]
+    actual = [scheduled_hours.get(index, 0.0) for index in range(len(selected_activities))]
+    included = [index in scheduled_hours for index in range(len(selected_activities))]
+
+    total_weight = sum(weights)
+    coverage = (
+        sum(weight for weight, hit in zip(weights, included) if hit) / total_weight
+        if total_weight
+        else 0.0
+    )
+    fits = [
+        min(want, got) / max(want, got) if want > 0 and got > 0 else 1.0
+        for want, got, hit in zip(expected, actual, included)
+        if hit
+    ]
+    duration_fit = sum(fits) / len(fits) if fits else 0.0
+
+    return ItinerarySummary(
+        total_cost=round(sum(schedule.daily_cost for schedule in schedules), 2),
+        total_activities=sum(len(schedule.activities) for schedule in schedules),
+        optimization_score=round(
+            COVERAGE_WEIGHT * coverage + DURATION_FIT_WEIGHT * duration_fit, 2
+        ),
+    )
@@ -0,0 +1,195 @@
+# LLM provider backends behind one chat completion interface
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+# start of the answer when JSON output is requested from a provider without JSON mode
+JSON_PREFILL = "{"
+
+
+@dataclass
+class Completion:
+    text: str
+    output_tokens: Optional[int] = None
+    # stopped by max_tokens rather than finished
+    truncated: bool = False
+    # rewritten locally after failing the schema check
+    repaired: bool = False
+
+
+class LLMProvider:
+    """
+    Chat completion backend. Messages and `response_format` use the OpenAI
+    format and calls return text, so callers never see provider types.
+    """
+
+    name = "base"
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[dict],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[httpx.Timeout] = None,
+        response_format: Optional[dict] = None,
+    ) -> Completion:
+        raise NotImplementedError
+
+    async def open_stream(
+        self,
+        model: str,
+        messages: List[dict],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[httpx.Timeout] = None,
+        response_format: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """Start a streamed completion; the returned iterator yields text deltas"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(
+        self,
+        get_client: Callable[[], AsyncOpenAI],
+        structured_output_models: Sequence[str] = (),
+    ):
+        # the client itself is owned by openai_client (created at app startup)
+        self._get_client = get_client
+        # model name prefixes accepting json_schema; others get JSON mode
+        self.structured_output_models = tuple(structured_output_models)
+
+    def _request(self, model, messages, max_tokens, temperature, timeout, response_format) -> dict:
+        request = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if timeout is not None:
+            request["timeout"] = timeout
+        if response_format is not None:
+            if response_format["type"] == "json_schema" and not model.startswith(
+                self.structured_output_models
+            ):
+                response_format = {"type": "json_object"}
+            request["response_format"] = response_format
+        return request
+
+    async def complete(
+        self, model, messages, max_tokens, temperature, timeout=None, response_format=None
+    ) -> Completion:
+        response = await self._get_client().chat.completions.create(
+            **self._request(model, messages, max_tokens, temperature, timeout, response_format)
+        )
+        choice = response.choices[0]
+        return Completion(
+            choice.message.content,
+            output_tokens=response.usage.completion_tokens if response.usage else None,
+            truncated=choice.finish_reason == "length",
+        )
+
+    async def open_stream(
+        self, model, messages, max_tokens, temperature, timeout=None, response_format=None
+    ):
+        stream = await self._get_client().chat.completions.create(
+            **self._request(model, messages, max_tokens, temperature, timeout, response_format),
+            stream=True,
+        )
+        return self._texts(stream)
+
+    @staticmethod
+    async def _texts(stream) -> AsyncIterator[str]:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def __init__(
+        self,
+        api_key: str,
+        build_http_client: Callable[[], httpx.AsyncClient],
+        max_retries: int = 0,
+    ):
+        self._api_key = api_key
+        self._build_http_client = build_http_client
+        self._max_retries = max_retries
+        self._client: Optional[AsyncAnthropic] = None
+
+    def _get_client(self) -> AsyncAnthropic:
+        if self._client is None:
+            logger.info("Creating Anthropic client")
+            self._client = AsyncAnthropic(
+                api_key=self._api_key,
+                http_client=self._build_http_client(),
+                max_retries=self._max_retries,
+            )
+        return self._client
+
+    def _request(self, model, messages, max_tokens, temperature, timeout, response_format) -> dict:
+        # system prompts are a separate parameter in the Messages API
+        request = {
+            "model": model,
+            "system": "\n\n".join(
+                message["content"] for message in messages if message["role"] == "system"
+            ),
+            "messages": [message for message in messages if message["role"] != "system"],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if timeout is not None:
+            request["timeout"] = timeout
+        if response_format is not None:
+            # no JSON mode here; prefilling the answer with the opening brace
+            # keeps the model from wrapping the object in prose or fences
+            request["messages"].append({"role": "assistant", "content": JSON_PREFILL})
+        return request
+
+    async def complete(
+        self, model, messages, max_tokens, temperature, timeout=None, response_format=None
+    ) -> Completion:
+        response = await self._get_client().messages.create(
+            **self._request(model, messages, max_tokens, temperature, timeout, response_format)
+        )
+        prefill = JSON_PREFILL if response_format is not None else ""
+        return Completion(
+            prefill + "".join(block.text for block in response.content if block.type == "text"),
+            output_tokens=response.usage.output_tokens,
+            truncated=response.stop_reason == "max_tokens",
+        )
+
+    async def open_stream(
+        self, model, messages, max_tokens, temperature, timeout=None, response_format=None
+    ):
+        stream = await self._get_client().messages.create(
+            **self._request(model, messages, max_tokens, temperature, timeout, response_format),
+            stream=True,
+        )
+        return self._texts(stream, JSON_PREFILL if response_format is not None else "")
+
+    @staticmethod
+    async def _texts(stream, prefill: str = "") -> AsyncIterator[str]:
+        if prefill:
+            yield prefill
+        async for event in stream:
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -0,0 +1,182 @@
+# Retries with jittered backoff and a circuit breaker for LLM provider calls
+from typing import Awaitable, Callable, Optional, TypeVar
+from exceptions import CircuitOpenError, ServiceUnavailableError
+import anthropic
+import asyncio
+import httpx
+import logging
+import math
+import openai
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# transient provider failures: worth another attempt, and counted by the breaker
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    anthropic.APITimeoutError,
+    anthropic.APIConnectionError,
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    httpx.TransportError,
+    asyncio.TimeoutError,
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # includes Anthropic's 529 "overloaded"
+    return (
+        isinstance(error, (openai.APIStatusError, anthropic.APIStatusError))
+        and error.status_code >= 500
+    )
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive provider failures, so calls
+    fail fast with CircuitOpenError instead of each waiting out a timeout.
+    After `reset_timeout` seconds a single trial call is let through
+    (half open); its success closes the circuit, its failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # a trial that never reports back (cancelled) is replaced after reset_timeout
+        self._trial_started: Optional[float] = None
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    def check(self) -> None:
+        """Fail fast while open; a half-open circuit is left to `admit`"""
+        if self.state == self.OPEN:
+            raise self._reject()
+
+    def admit(self) -> None:
+        """Called before every provider attempt"""
+        state = self.state
+        if state == self.CLOSED:
+            return
+        now = self._clock()
+        if state == self.HALF_OPEN and (
+            self._trial_started is None or now - self._trial_started >= self.reset_timeout
+        ):
+            self._trial_started = now
+            return
+        raise self._reject()
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_started = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (
+            self._state == self.CLOSED and self._failures >= self.failure_threshold
+        ):
+            logger.warning(
+                f"Circuit {self.name} opened after {self._failures} consecutive failures"
+            )
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._trial_started = None
+            self.opened += 1
+
+    def _reject(self) -> CircuitOpenError:
+        self.rejected += 1
+        remaining = self.reset_timeout - (self._clock() - self._opened_at)
+        return CircuitOpenError(
+            retry_after=max(1, math.ceil(remaining)),
+            internal_detail=f"Circuit {self.name} is open",
+        )
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryPolicy:
+    """
+    Up to `attempts` retries of retryable errors, sleeping a random delay
+    of up to base_delay * 2^attempt (capped at max_delay) in between, so
+    clients that failed together do not retry together.
+    """
+
+    def __init__(self, attempts: int = 2, base_delay: float = 0.5, max_delay: float = 4.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.exhausted = 0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, call: Callable[[], Awaitable[T]], breaker: CircuitBreaker) -> T:
+        attempt = 0
+        while True:
+            breaker.admit()
+            try:
+                result = await call()
+            except ServiceUnavailableError:
+                # our own load shedding, the provider was never asked
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # the provider answered, it just did not like the request
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt >= self.attempts:
+                    self.exhausted += 1
+                    raise
+                delay = self.delay(attempt)
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"Retrying {breaker.name} call in {delay:.2f}s "
+                    f"(attempt {attempt} of {self.attempts}): {type(e).__name__}"
+                )
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        return {"attempts": self.attempts, "retries": self.retries, "exhausted": self.exhausted}
@@ -0,0 +1,147 @@
+# Routing across LLM providers per model tier, weighted by recent latency and errors
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    provider: str
+    model: str
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+def parse_route(route: str) -> Route:
+    """Parse a "provider:model" route, e.g. "anthropic:claude-3-5-haiku-latest" """
+    provider, _, model = route.partition(":")
+    if not provider or not model:
+        raise ValueError(f"Invalid LLM route {route!r}, expected provider:model")
+    return Route(provider, model)
+
+
+class RouteStats:
+    """Exponentially weighted latency of successful calls and error rate"""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds: float, error: bool) -> None:
+        self.calls += 1
+        self.error_rate += self.alpha * ((1.0 if error else 0.0) - self.error_rate)
+        if error:
+            self.errors += 1
+        elif self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.alpha * (seconds - self.latency)
+
+    def score(self) -> Optional[float]:
+        """Requests per second the route is worth, discounted by failures"""
+        if self.latency is None:
+            return None
+        return (1.0 - self.error_rate) ** 2 / max(self.latency, 0.001)
+
+
+class ProviderRouter:
+    """
+    Each model tier has candidate routes (provider and model). A call goes to one
+    of them at random in proportion to its score: fast, reliable routes get
+    most of the traffic, a slowing or failing one loses it within a few
+    calls. Every route keeps `min_share` of the traffic so its recovery is
+    noticed, and routes without samples yet are scored like the best one.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, List[Route]],
+        default_routes: List[Route],
+        alpha: float = 0.2,
+        min_share: float = 0.05,
+        rng: random.Random = None,
+    ):
+        self._routes = routes
+        self._default_routes = default_routes
+        self.alpha = alpha
+        self.min_share = min_share
+        self._rng = rng or random.Random()
+        self._stats: Dict[str, Dict[Route, RouteStats]] = {}
+
+    def routes(self, tier: str) -> List[Route]:
+        return self._routes.get(tier) or self._default_routes
+
+    def _route_stats(self, tier: str, route: Route) -> RouteStats:
+        tier_stats = self._stats.setdefault(tier, {})
+        if route not in tier_stats:
+            tier_stats[route] = RouteStats(self.alpha)
+        return tier_stats[route]
+
+    def weights(self, tier: str, candidates: List[Route]) -> List[float]:
+        scores = [self._route_stats(tier, route).score() for route in candidates]
+        known = [score for score in scores if score is not None]
+        best = max(known, default=1.0)
+        scores = [best if score is None else score for score in scores]
+        total = sum(scores)
+        if total <= 0:
+            return [1.0 / len(candidates)] * len(candidates)
+        shares = [max(score / total, self.min_share) for score in scores]
+        return [share / sum(shares) for share in shares]
+
+    def choose(
+        self,
+        tier: str,
+        available: Callable[[Route], bool] = lambda route: True,
+        exclude: Optional[Route] = None,
+    ) -> Route:
+        """A weighted pick among available routes (all of them if none are)"""
+        routes = self.routes(tier)
+        candidates = [route for route in routes if route != exclude and available(route)]
+        if not candidates:
+            candidates = [route for route in routes if route != exclude] or routes
+        if len(candidates) == 1:
+            return candidates[0]
+        return self._rng.choices(candidates, weights=self.weights(tier, candidates))[0]
+
+    def record(self, tier: str, route: Route, seconds: float, error: bool) -> None:
+        self._route_stats(tier, route).record(seconds, error)
+
+    def stats(self) -> dict:
+        snapshot = {}
+        for tier, tier_stats in self._stats.items():
+            routes = list(tier_stats)
+            weights = self.weights(tier, routes)
+            snapshot[tier] = {
+                str(route): {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "latency_ms": round((stats.latency or 0.0) * 1000, 1),
+                    "error_rate": round(stats.error_rate, 4),
+                    "weight": round(weight, 4),
+                }
+                for (route, stats), weight in zip(tier_stats.items(), weights)
+            }
+        return snapshot
+
+
+def build_routes(
+    tier_routes: Dict[str, List[str]], providers: List[str]
+) -> Dict[str, List[Route]]:
+    """Parse the configured routes, dropping providers that are not set up"""
+    routes = {}
+    for tier, configured in tier_routes.items():
+        parsed = [parse_route(route) for route in configured]
+        usable = [route for route in parsed if route.provider in providers]
+        skipped = [str(route) for route in parsed if route.provider not in providers]
+        if skipped:
+            logger.info(f"LLM routes for {tier} skipped, provider not configured: {skipped}")
+        if usable:
+            routes[tier] = usable
+    return routes
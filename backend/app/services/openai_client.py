@@ -1,19 +1,582 @@
-import openai
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from app.core.config import settings
 from app.models.destination_response import DestinationResponse
+from app.models.itinerary_generate_response import DailySchedule, ItineraryGenerateResponse
+from app.models.itinerary_questionnaire_response import ItineraryQuestionnaireResponse
 from app.constants import openai_constants
-from app.utils import common_utils
+from app.core.metrics import LatencyHistogram, register_metrics
+from app.services.response_cache import make_cache_key
+from app.services.single_flight import SingleFlight
+from app.services.bulkhead import Bulkhead
+from app.services.adaptive_concurrency import AdaptiveConcurrencyLimit
+from app.services.llm_resilience import CircuitBreaker, RetryPolicy
+from app.services.hedging import HedgePolicy
+from app.services import prompt_builder
+from app.services.token_budget import OutputTokenBudget, itinerary_features
+from app.services.llm_providers import AnthropicProvider, Completion, LLMProvider, OpenAIProvider
+from app.services.llm_router import ProviderRouter, Route, build_routes, parse_route
+from app.utils import common_utils, llm_utils
+from exceptions import ServiceUnavailableError
+from contextlib import nullcontext
+from collections import Counter, defaultdict
+from dataclasses import replace
+from typing import AsyncIterator, Callable, Dict, Optional, Type
+from pydantic import BaseModel
+import json
 import logging
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# identical in-flight requests per task share one provider call
+_single_flights = {
+    task: SingleFlight(task)
+    for task in (
+        "destinations",
+        "activities",
+        "itinerary",
+        "itinerary_continuation",
+        "itinerary_plan",
+        "itinerary_day",
+        "itinerary_annotations",
+    )
+}
+register_metrics(
+    "llm_coalescing",
+    lambda: {task: flight.stats() for task, flight in _single_flights.items()},
+)
 
-def get_travel_ideas(preferences: dict) -> str:
+# cap concurrent provider calls per task; excess requests queue briefly, then get 503
+_bulkheads = {
+    task: Bulkhead(
+        task,
+        max_in_flight=settings.BULKHEAD_MAX_IN_FLIGHT.get(task, 10),
+        max_queue=settings.BULKHEAD_MAX_QUEUE,
+        queue_timeout=settings.BULKHEAD_QUEUE_TIMEOUT_SECONDS,
+    )
+    for task in _single_flights
+}
+register_metrics(
+    "bulkheads",
+    lambda: {task: bulkhead.stats() for task, bulkhead in _bulkheads.items()},
+)
+
+# one adaptive limit per model, shared by every task that calls it
+_model_limits: Dict[str, AdaptiveConcurrencyLimit] = {}
+register_metrics(
+    "adaptive_concurrency",
+    lambda: {model: limit.stats() for model, limit in _model_limits.items()},
+)
+
+
+def _model_limit(model: str) -> AdaptiveConcurrencyLimit:
+    limit = _model_limits.get(model)
+    if limit is None:
+        limit = AdaptiveConcurrencyLimit(
+            model,
+            initial_limit=settings.ADAPTIVE_CONCURRENCY_INITIAL_LIMIT,
+            min_limit=settings.ADAPTIVE_CONCURRENCY_MIN_LIMIT,
+            max_limit=settings.ADAPTIVE_CONCURRENCY_MAX_LIMIT,
+            latency_tolerance=settings.ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE,
+            max_queue=settings.BULKHEAD_MAX_QUEUE,
+            queue_timeout=settings.BULKHEAD_QUEUE_TIMEOUT_SECONDS,
+        )
+        _model_limits[model] = limit
+    return limit
+
+
+def _call_limit(model: str):
+    """Slot for one provider call under the adaptive limit of the model"""
+    if not settings.ADAPTIVE_CONCURRENCY_ENABLED:
+        return nullcontext()
+    return _model_limit(model).call()
+
+
+# transient errors are retried; consecutive failures open the provider's circuit
+_retry_policy = RetryPolicy(
+    attempts=settings.LLM_RETRY_ATTEMPTS,
+    base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+    max_delay=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+)
+
+
+# optional hedging: a second call when the first is slower than usual
+_hedges = {
+    task: HedgePolicy(
+        task,
+        percentile=settings.LLM_HEDGE_PERCENTILE,
+        budget_ratio=settings.LLM_HEDGE_BUDGET_RATIO,
+    )
+    for task in _single_flights
+}
+register_metrics(
+    "llm_hedging",
+    lambda: {
+        task: hedge.stats()
+        for task, hedge in _hedges.items()
+        if task in settings.LLM_HEDGE_TASKS
+    },
+)
+
+
+def _validate_json(model) -> Callable[[str], None]:
+    return lambda text: model(**json.loads(text))
+
+
+def _validate_days(text: str) -> None:
+    days = json.loads(text)["days"]
+    if not isinstance(days, list):
+        raise ValueError("days is not a list")
+
+
+# schema checks of the output; a failure is repaired locally if possible,
+# otherwise asked again on the escalation tier
+_validators: Dict[str, Callable[[str], None]] = {
+    "destinations": _validate_json(DestinationResponse),
+    "activities": lambda text: ItineraryQuestionnaireResponse(
+        suggested_activities=json.loads(text)["suggested_activities"]
+    ),
+    "itinerary": _validate_json(ItineraryGenerateResponse),
+    "itinerary_continuation": _validate_json(ItineraryGenerateResponse),
+    "itinerary_plan": _validate_days,
+    "itinerary_day": _validate_json(DailySchedule),
+    "itinerary_annotations": _validate_days,
+}
+
+# response model per task and the fields filled in locally rather than generated
+_output_models: Dict[str, tuple] = {
+    "destinations": (DestinationResponse, ()),
+    "activities": (
+        ItineraryQuestionnaireResponse,
+        ("questionnaire_id", "destination", "ready_for_optimization"),
+    ),
+    "itinerary": (ItineraryGenerateResponse, ("summary", "daily_cost")),
+    "itinerary_continuation": (ItineraryGenerateResponse, ("summary", "daily_cost")),
+    "itinerary_day": (DailySchedule, ("daily_cost",)),
+}
+
+
+def _without_fields(schema: dict, local_fields: tuple) -> None:
+    schema["properties"] = {
+        name: field for name, field in schema["properties"].items() if name not in local_fields
+    }
+    if "required" in schema:
+        schema["required"] = [name for name in schema["required"] if name not in local_fields]
+
+
+def _output_schema(task: str, model: Type[BaseModel], local_fields: tuple) -> dict:
+    """
+    response_format asking for JSON matching `model`, without the local
+    fields on the model itself or on any nested model in $defs
+    """
+    schema = model.model_json_schema()
+    _without_fields(schema, local_fields)
+    definitions = schema.get("$defs", {})
+    for definition in definitions.values():
+        if "properties" in definition:
+            _without_fields(definition, local_fields)
+    # drop models only the removed fields referred to (e.g. the summary)
+    reachable, pending = set(), [{key: value for key, value in schema.items() if key != "$defs"}]
+    while pending:
+        for name in re.findall(r'"#/\$defs/([^"]+)"', json.dumps(pending.pop())):
+            if name not in reachable:
+                reachable.add(name)
+                pending.append(definitions[name])
+    for name in set(definitions) - reachable:
+        del definitions[name]
+    return {"type": "json_schema", "json_schema": {"name": task, "schema": schema}}
+
+
+_output_schemas = {
+    task: _output_schema(task, model, local_fields)
+    for task, (model, local_fields) in _output_models.items()
+}
+
+
+def _response_format(task: str) -> Optional[dict]:
+    if settings.LLM_OUTPUT_FORMAT == "text":
+        return None
+    if settings.LLM_OUTPUT_FORMAT == "json_schema" and task in _output_schemas:
+        return _output_schemas[task]
+    return {"type": "json_object"}
+
+
+# outcome of the schema check per task: valid as returned, repaired locally, or failed
+_output_checks: Dict[str, Counter] = defaultdict(Counter)
+register_metrics("llm_output_repair", lambda: {task: dict(counts) for task, counts in _output_checks.items()})
+
+
+def _repair_output(task: str, text: str) -> Optional[str]:
+    """
+    Local fix of output that failed the schema check: code fences and
+    surrounding prose are stripped, a truncated document keeps its complete
+    array elements, and numbers written as strings are converted. None if the
+    result still does not validate.
+    """
+    for candidate in llm_utils.repair_json(text or ""):
+        try:
+            data = json.loads(candidate)
+            if task in _output_models:
+                data = llm_utils.coerce_numbers(data, _output_models[task][0])
+            repaired = json.dumps(data)
+            _validators[task](repaired)
+            return repaired
+        except Exception:
+            continue
+    return None
+
+
+def _checked(task: str, completion: Completion) -> Optional[Completion]:
+    """The completion if it validates, repaired if needed; None if it cannot be used"""
+    try:
+        _validators[task](completion.text)
+        _output_checks[task]["valid"] += 1
+        return completion
+    except Exception as e:
+        error = e
+    repaired = _repair_output(task, completion.text)
+    if repaired is None:
+        _output_checks[task]["failed"] += 1
+        logger.warning(f"{task} output failed validation and could not be repaired: {error}")
+        return None
+    _output_checks[task]["repaired"] += 1
+    logger.info(f"{task} output repaired locally after: {error}")
+    return replace(completion, text=repaired, repaired=True)
+
+
+# latency and outcomes per model tier, to tune which tasks run on which tier
+_tier_latency: Dict[str, LatencyHistogram] = {}
+_tier_counts: Dict[str, Counter] = {}
+register_metrics(
+    "llm_tiers",
+    lambda: {
+        tier: {**_tier_counts[tier], "latency": latency.stats()}
+        for tier, latency in _tier_latency.items()
+    },
+)
+
+
+# approximate input tokens per task, see prompt_builder.count_tokens
+_prompt_tokens: Dict[str, Counter] = defaultdict(Counter)
+register_metrics(
+    "llm_prompt_tokens",
+    lambda: {
+        task: {
+            "prompts": counts["prompts"],
+            "avg_tokens": round(counts["tokens"] / counts["prompts"], 1),
+        }
+        for task, counts in _prompt_tokens.items()
+    },
+)
+
+
+def _record_prompt(task: str, messages: list) -> None:
+    tokens = prompt_builder.count_message_tokens(messages)
+    _prompt_tokens[task]["prompts"] += 1
+    _prompt_tokens[task]["tokens"] += tokens
+    logger.debug(f"{task} prompt: ~{tokens} tokens")
+
+
+def _task_tier(task: str) -> str:
+    return settings.LLM_TASK_TIERS.get(task, settings.LLM_DEFAULT_TIER)
+
+
+def _task_temperature(task: str) -> float:
+    return settings.LLM_TASK_TEMPERATURES.get(task, openai_constants.DEFAULT_TEMPERATURE)
+
+
+def _task_max_tokens(task: str) -> int:
+    return settings.LLM_TASK_MAX_TOKENS.get(task, openai_constants.TASK_MAX_TOKENS[task])
+
+
+def _record_tier(tier: str, seconds: float, outcome: str) -> None:
+    if tier not in _tier_latency:
+        _tier_latency[tier] = LatencyHistogram()
+        _tier_counts[tier] = Counter()
+    _tier_counts[tier][outcome] += 1
+    if outcome != "errors":
+        _tier_latency[tier].record(seconds)
+
+
+async def _create_completion(
+    task: str,
+    messages: list,
+    max_tokens: int,
+    timeout: httpx.Timeout = None,
+) -> Completion:
+    """
+    Completion from the task's model tier. Output that fails the task's
+    schema check and cannot be repaired locally is requested once more from
+    the escalation tier, and raises if that fails the check too or there is
+    no escalation tier.
+    """
+    _record_prompt(task, messages)
+    request = {
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": _task_temperature(task),
+        "timeout": timeout,
+        "response_format": _response_format(task),
+    }
+    tier = _task_tier(task)
+    completion = await _complete_on_tier(task, tier, request)
+    if task not in _validators:
+        return completion
+    checked = _checked(task, completion)
+    if checked is not None:
+        return checked
+    _tier_counts[tier]["schema_failures"] += 1
+    escalation_tier = settings.LLM_ESCALATION_TIERS.get(tier)
+    if escalation_tier is None:
+        raise ValueError(f"{task} output failed validation on tier {tier}")
+    logger.warning(f"{task} output of tier {tier} escalated to {escalation_tier}")
+    _tier_counts[tier]["escalations"] += 1
+    escalated = await _complete_on_tier(task, escalation_tier, request)
+    checked = _checked(task, escalated)
+    if checked is None:
+        raise ValueError(f"{task} output failed validation on tiers {tier} and {escalation_tier}")
+    return checked
+
+
+async def _complete_on_tier(task: str, tier: str, request: dict) -> Completion:
+    started = time.perf_counter()
+    try:
+        completion = await _hedged_call(task, tier, request)
+    except Exception:
+        _record_tier(tier, time.perf_counter() - started, "errors")
+        raise
+    _record_tier(tier, time.perf_counter() - started, "successes")
+    return completion
+
+
+async def _hedged_call(task: str, tier: str, request: dict) -> Completion:
+    route = _choose_route(tier)
+    if not settings.LLM_HEDGING_ENABLED or task not in settings.LLM_HEDGE_TASKS:
+        return await _call_route(tier, route, request)
+
+    hedge_route = _hedge_route(tier, route)
+    if hedge_route is None:
+        return await _call_route(tier, route, request)
+    return await _hedges[task].run(
+        lambda: _call_route(tier, route, request),
+        lambda: _call_route(tier, hedge_route, request),
+    )
+
+
+def _hedge_route(tier: str, route: Route) -> Optional[Route]:
+    """Where a hedge of a call to `route` goes, None when it cannot be sent"""
+    if not settings.LLM_HEDGE_ROUTE:
+        return _choose_route(tier, exclude=route)
+    hedge_route = parse_route(settings.LLM_HEDGE_ROUTE)
+    if hedge_route.provider not in _providers:
+        logger.debug(f"Hedge route {hedge_route} skipped, provider not configured")
+        return None
+    if _breakers[hedge_route.provider].state == CircuitBreaker.OPEN:
+        return None
+    return hedge_route
+
+
+def _choose_route(tier: str, exclude: Route = None) -> Route:
+    return _router.choose(
+        tier,
+        available=lambda route: _breakers[route.provider].state != CircuitBreaker.OPEN,
+        exclude=exclude,
+    )
+
+
+def _check_circuits(task: str) -> None:
+    """Fail fast when every provider of the task's tier has an open circuit"""
+    breakers = [_breakers[route.provider] for route in _router.routes(_task_tier(task))]
+    if all(breaker.state == CircuitBreaker.OPEN for breaker in breakers):
+        breakers[0].check()
+
+
+async def _call_route(tier: str, route: Route, request: dict) -> Completion:
+    provider = _providers[route.provider]
+
+    async def attempt():
+        async with _call_limit(route.model):
+            started = time.perf_counter()
+            try:
+                completion = await provider.complete(route.model, **request)
+            except Exception:
+                _router.record(tier, route, time.perf_counter() - started, error=True)
+                raise
+            _router.record(tier, route, time.perf_counter() - started, error=False)
+            return completion
+
+    return await _retry_policy.run(attempt, _breakers[route.provider])
+
+
+# one long-lived client per process, created at app startup and closed at shutdown
+_client: AsyncOpenAI = None
+
+
+def _build_timeout(read_timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(
+        read_timeout,
+        connect=settings.OPENAI_CONNECT_TIMEOUT,
+    )
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Pooled keep-alive HTTP client so bursts reuse warm TLS connections"""
+    return DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=_build_timeout(settings.OPENAI_READ_TIMEOUT),
+        http2=settings.OPENAI_HTTP2,
+    )
+
+
+def init_openai_client() -> AsyncOpenAI:
+    """Create the shared AsyncOpenAI client if it does not exist yet"""
+    global _client
+    if _client is None:
+        logger.info(
+            common_utils.get_logging_message(
+                init_openai_client.__name__,
+                f"Creating OpenAI client (max_connections={settings.OPENAI_MAX_CONNECTIONS}, "
+                f"keepalive={settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS}, http2={settings.OPENAI_HTTP2})",
+            )
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=_build_http_client(),
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+    return _client
+
+
+async def close_openai_client() -> None:
+    """Close the shared clients and release their pooled connections"""
+    global _client
+    if _client is not None:
+        logger.info(common_utils.get_logging_message(close_openai_client.__name__))
+        await _client.close()
+        _client = None
+    for provider in _providers.values():
+        await provider.close()
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use"""
+    if _client is None:
+        return init_openai_client()
+    return _client
+
+
+# providers with credentials; routes to any other provider are skipped
+_providers: Dict[str, LLMProvider] = {
+    "openai": OpenAIProvider(get_openai_client, settings.LLM_STRUCTURED_OUTPUT_MODELS)
+}
+if settings.ANTHROPIC_API_KEY:
+    _providers["anthropic"] = AnthropicProvider(
+        settings.ANTHROPIC_API_KEY,
+        _build_http_client,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+    )
+
+# one circuit per provider, so an outage leaves the other providers in rotation
+_breakers = {
+    name: CircuitBreaker(
+        name,
+        failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS,
+    )
+    for name in _providers
+}
+
+
+def _build_router(providers) -> ProviderRouter:
+    """Tier routes over the given providers"""
+    return ProviderRouter(
+        build_routes(settings.LLM_TIER_ROUTES, list(providers)),
+        # for tiers without a configured provider
+        default_routes=[Route("openai", openai_constants.DEFAULT_MODEL)],
+        min_share=settings.LLM_ROUTE_MIN_SHARE,
+    )
+
+
+_router = _build_router(_providers)
+register_metrics(
+    "llm_resilience",
+    lambda: {
+        "circuits": {name: breaker.stats() for name, breaker in _breakers.items()},
+        "retry": _retry_policy.stats(),
+    },
+)
+register_metrics("llm_routing", _router.stats)
+
+
+async def get_travel_ideas(preferences: dict) -> Optional[Completion]:
     logger.debug(common_utils.get_logging_message(get_travel_ideas.__name__))
+    return await _coalesce("destinations", preferences, _fetch_travel_ideas)
+
+
+async def get_itinerary_activity(activity_request: dict) -> Optional[Completion]:
+    logger.debug(common_utils.get_logging_message(get_itinerary_activity.__name__))
+    return await _coalesce("activities", activity_request, _fetch_itinerary_activity)
+
+
+async def get_optimized_itinerary(optimization_request: dict) -> str:
+    logger.debug(common_utils.get_logging_message(get_optimized_itinerary.__name__))
+    return await _coalesce(
+        "itinerary", optimization_request, _fetch_optimized_itinerary
+    )
+
+
+async def get_itinerary_continuation(continuation_request: dict) -> str:
+    """The missing days of an itinerary whose output was cut off"""
+    logger.debug(common_utils.get_logging_message(get_itinerary_continuation.__name__))
+    return await _coalesce(
+        "itinerary_continuation", continuation_request, _fetch_itinerary_continuation
+    )
+
+
+async def get_itinerary_plan(optimization_request: dict) -> str:
+    """Cheap day-level plan: a theme and the assigned activity ids per day"""
+    logger.debug(common_utils.get_logging_message(get_itinerary_plan.__name__))
+    return await _coalesce("itinerary_plan", optimization_request, _fetch_itinerary_plan)
+
+
+async def get_itinerary_day(day_request: dict) -> str:
+    """Full DailySchedule for a single day of a planned itinerary"""
+    logger.debug(common_utils.get_logging_message(get_itinerary_day.__name__))
+    return await _coalesce("itinerary_day", day_request, _fetch_itinerary_day)
+
+
+async def get_itinerary_annotations(annotation_request: dict) -> str:
+    """Themes and per-activity notes for a schedule built locally"""
+    logger.debug(common_utils.get_logging_message(get_itinerary_annotations.__name__))
+    return await _coalesce(
+        "itinerary_annotations", annotation_request, _fetch_itinerary_annotations
+    )
+
+
+async def _coalesce(task: str, payload: dict, fetch) -> str:
+    """
+    Identical concurrent requests share a single provider call, which then
+    takes a slot in the task's bulkhead. While every provider circuit is open
+    this raises CircuitOpenError without queueing.
+    """
+    _check_circuits(task)
+    bulkhead = _bulkheads[task]
+    if not settings.LLM_COALESCING_ENABLED:
+        return await bulkhead.run(lambda: fetch(payload))
+    key = make_cache_key(payload)
+    return await _single_flights[task].do(key, lambda: bulkhead.run(lambda: fetch(payload)))
+
+
+async def _fetch_travel_ideas(preferences: dict) -> Optional[Completion]:
     try:
-        openai.api_key = settings.OPENAI_API_KEY
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        completion = await _create_completion(
+            "destinations",
             messages=[
                 {
                     "role": "system",
@@ -21,30 +584,32 @@ def get_travel_ideas(preferences: dict) -> str:
                 },
                 {
                     "role": "user",
-                    "content": f"Suggest 3 to 5 destination recommendations based on the following preferences: {preferences}",
+                    "content": prompt_builder.destination_prompt(preferences),
                 },
             ],
-            max_tokens=500,
-            temperature=0.7,
+            max_tokens=_task_max_tokens("destinations"),
         )
 
         # testing purpose
         # response = None
         # raise Exception("OpenAI API is not available for testing.")
 
-        logger.info(f"OpenAI response for destination: {response}")
+        logger.info(f"LLM response for destination: {completion.text}")
+    except ServiceUnavailableError:
+        # shed by a concurrency limit or circuit open: the service answers 503 or falls back
+        raise
     except Exception as e:
         logger.error(common_utils.get_error_message(get_travel_ideas.__name__, str(e)))
         return None
 
-    return response.choices[0].message.content
+    # the flags tell the service whether the answer is complete enough to cache
+    return completion
 
 
-def get_itinerary_activity(activity_request: list) -> str:
+async def _fetch_itinerary_activity(activity_request: dict) -> Optional[Completion]:
     try:
-        openai.api_key = settings.OPENAI_API_KEY
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        completion = await _create_completion(
+            "activities",
             messages=[
                 {
                     "role": "system",
@@ -52,47 +617,94 @@ def get_itinerary_activity(activity_request: list) -> str:
                 },
                 {
                     "role": "user",
-                    "content": f"Suggest 10 activities based on the following preference: {activity_request}",
+                    "content": prompt_builder.activity_prompt(activity_request),
                 },
             ],
-            max_tokens=1000,
-            temperature=0.7,
+            max_tokens=_task_max_tokens("activities"),
         )
-        logger.info(f"OpenAI response for itinerary_activity: {response}")
+        logger.info(f"LLM response for itinerary_activity: {completion.text}")
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
-        logger.error(common_utils.get_error_message(get_travel_ideas.__name__, str(e)))
+        logger.error(
+            common_utils.get_error_message(get_itinerary_activity.__name__, str(e))
+        )
         return None
-    return response.choices[0].message.content
+    return completion
+
+
+def _itinerary_messages(optimization_request: dict) -> list:
+    return [
+        {
+            "role": "system",
+            "content": openai_constants.DEFAULT_ITINERARY_OPTIMIZING_SYSTEM_PROMPT,
+        },
+        {
+            "role": "user",
+            "content": prompt_builder.itinerary_prompt(optimization_request),
+        },
+    ]
+
+
+# max_tokens of single-call itineraries, sized to the trip
+_itinerary_budget = OutputTokenBudget(
+    "itinerary",
+    prior=settings.ITINERARY_TOKEN_PRIOR,
+    percentile=settings.ITINERARY_TOKEN_PERCENTILE,
+    min_tokens=settings.ITINERARY_MIN_TOKENS,
+    max_tokens=settings.ITINERARY_MAX_TOKENS,
+    fixed_tokens=openai_constants.ITINERARY_FIXED_TOKENS,
+)
+register_metrics("llm_token_budget", lambda: {"itinerary": _itinerary_budget.stats()})
+
 
+def _itinerary_max_tokens(optimization_request: dict) -> int:
+    if not settings.ITINERARY_TOKEN_BUDGET_ENABLED:
+        return openai_constants.ITINERARY_FIXED_TOKENS
+    return _itinerary_budget.budget(itinerary_features(optimization_request))
 
-def get_optimized_itinerary(optimization_request: dict) -> str:
+
+def _record_itinerary_usage(
+    optimization_request: dict, max_tokens: int, completion: Completion
+) -> None:
+    features = itinerary_features(optimization_request)
+    _itinerary_budget.record(features, max_tokens, completion.output_tokens, completion.truncated)
+    # read back by scripts/calibrate_token_budget.py
+    usage = {
+        "features": features,
+        "max_tokens": max_tokens,
+        "output_tokens": completion.output_tokens,
+        "truncated": completion.truncated,
+    }
+    logger.info(f"Itinerary token usage: {json.dumps(usage)}")
+
+
+async def _fetch_optimized_itinerary(optimization_request: dict) -> str:
     try:
-        openai.api_key = settings.OPENAI_API_KEY
-        
-        # Extract travel dates and calculate duration
-        travel_dates = optimization_request.get("travel_dates", {})
-        start_date = travel_dates.get("start_date")
-        end_date = travel_dates.get("end_date")
-        
-        # Create enhanced user prompt with date context
-        destination_name = optimization_request.get('destination', {}).get('name', 'the destination')
-        selected_activities = optimization_request.get('selected_activities', [])
-        
-        user_prompt = f"Create an optimized itinerary for {destination_name}. The user has selected {len(selected_activities)} activities they definitely want to include: {[a.get('name', 'Unknown') for a in selected_activities]}. Use these as foundation activities and generate additional complementary activities to create a complete, varied itinerary. Full request details: {optimization_request}"
-        
-        if start_date and end_date:
-            from datetime import datetime
-            try:
-                start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-                total_days = (end_dt - start_dt).days + 1
-                
-                user_prompt = f"Create an optimized {total_days}-day itinerary for {destination_name} from {start_date} to {end_date}. The user has selected {len(selected_activities)} foundation activities: {[a.get('name', 'Unknown') for a in selected_activities]}. You must include these activities and generate additional complementary activities to fill all {total_days} days with varied, engaging experiences. Avoid repeating the same activity multiple times. Full preferences: {optimization_request}"
-            except ValueError:
-                logger.warning(f"Invalid date format in optimization request: {start_date} to {end_date}")
-        
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        max_tokens = _itinerary_max_tokens(optimization_request)
+        completion = await _create_completion(
+            "itinerary",
+            messages=_itinerary_messages(optimization_request),
+            max_tokens=max_tokens,
+            timeout=_build_timeout(settings.OPENAI_ITINERARY_READ_TIMEOUT),
+        )
+        _record_itinerary_usage(optimization_request, max_tokens, completion)
+        response = completion.text
+        logger.info(f"LLM response for optimized itinerary: {response}")
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(
+            common_utils.get_error_message(get_optimized_itinerary.__name__, str(e))
+        )
+        return None
+    return response
+
+
+async def _fetch_itinerary_continuation(continuation_request: dict) -> str:
+    try:
+        completion = await _create_completion(
+            "itinerary_continuation",
             messages=[
                 {
                     "role": "system",
@@ -100,14 +712,134 @@ def get_optimized_itinerary(optimization_request: dict) -> str:
                 },
                 {
                     "role": "user",
-                    "content": user_prompt,
+                    "content": prompt_builder.continuation_prompt(continuation_request),
                 },
             ],
-            max_tokens=3000,  # Increased for longer itineraries
-            temperature=0.7,
+            # day_numbers and selected_activities only cover the missing days
+            max_tokens=_itinerary_max_tokens(continuation_request),
+            timeout=_build_timeout(settings.OPENAI_ITINERARY_READ_TIMEOUT),
         )
-        logger.info(f"OpenAI response for optimized itinerary: {response}")
+        response = completion.text
+        logger.info(f"LLM response for itinerary continuation: {response}")
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
-        logger.error(common_utils.get_error_message(get_travel_ideas.__name__, str(e)))
+        logger.error(
+            common_utils.get_error_message(get_itinerary_continuation.__name__, str(e))
+        )
         return None
-    return response.choices[0].message.content
+    return response
+
+
+async def _fetch_itinerary_plan(optimization_request: dict) -> str:
+    try:
+        completion = await _create_completion(
+            "itinerary_plan",
+            messages=[
+                {
+                    "role": "system",
+                    "content": openai_constants.DEFAULT_ITINERARY_PLAN_SYSTEM_PROMPT,
+                },
+                {
+                    "role": "user",
+                    "content": prompt_builder.plan_prompt(optimization_request),
+                },
+            ],
+            max_tokens=_task_max_tokens("itinerary_plan"),
+        )
+        response = completion.text
+        logger.info(f"LLM response for itinerary plan: {response}")
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(common_utils.get_error_message(get_itinerary_plan.__name__, str(e)))
+        return None
+    return response
+
+
+async def _fetch_itinerary_day(day_request: dict) -> str:
+    try:
+        completion = await _create_completion(
+            "itinerary_day",
+            messages=[
+                {
+                    "role": "system",
+                    "content": openai_constants.DEFAULT_ITINERARY_DAY_SYSTEM_PROMPT,
+                },
+                {
+                    "role": "user",
+                    "content": prompt_builder.day_prompt(day_request),
+                },
+            ],
+            max_tokens=_task_max_tokens("itinerary_day"),
+        )
+        response = completion.text
+        logger.info(f"LLM response for itinerary day: {response}")
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(common_utils.get_error_message(get_itinerary_day.__name__, str(e)))
+        return None
+    return response
+
+
+async def _fetch_itinerary_annotations(annotation_request: dict) -> str:
+    try:
+        completion = await _create_completion(
+            "itinerary_annotations",
+            messages=[
+                {
+                    "role": "system",
+                    "content": openai_constants.DEFAULT_ITINERARY_ANNOTATION_SYSTEM_PROMPT,
+                },
+                {
+                    "role": "user",
+                    "content": prompt_builder.annotation_prompt(annotation_request),
+                },
+            ],
+            max_tokens=_task_max_tokens("itinerary_annotations"),
+        )
+        response = completion.text
+        logger.info(f"LLM response for itinerary annotations: {response}")
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(
+            common_utils.get_error_message(get_itinerary_annotations.__name__, str(e))
+        )
+        return None
+    return response
+
+
+async def stream_optimized_itinerary(optimization_request: dict) -> AsyncIterator[str]:
+    """Yield the itinerary text as the provider streams it"""
+    logger.debug(common_utils.get_logging_message(stream_optimized_itinerary.__name__))
+    _check_circuits("itinerary")
+    tier = _task_tier("itinerary")
+    route = _choose_route(tier)
+    provider = _providers[route.provider]
+    messages = _itinerary_messages(optimization_request)
+    _record_prompt("itinerary", messages)
+    request = {
+        "messages": messages,
+        "max_tokens": _itinerary_max_tokens(optimization_request),
+        "temperature": _task_temperature("itinerary"),
+        "timeout": _build_timeout(settings.OPENAI_ITINERARY_READ_TIMEOUT),
+        "response_format": _response_format("itinerary"),
+    }
+    # the slots are held until the stream is fully consumed
+    async with _bulkheads["itinerary"].slot(), _call_limit(route.model):
+        started = time.perf_counter()
+        # only opening the stream is retried, nothing has been yielded yet
+        stream = await _retry_policy.run(
+            lambda: provider.open_stream(route.model, **request), _breakers[route.provider]
+        )
+        try:
+            async for text in stream:
+                yield text
+        except Exception:
+            _router.record(tier, route, time.perf_counter() - started, error=True)
+            _record_tier(tier, time.perf_counter() - started, "errors")
+            raise
+        _router.record(tier, route, time.perf_counter() - started, error=False)
+        _record_tier(tier, time.perf_counter() - started, "successes")
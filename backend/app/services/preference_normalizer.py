@@ -0,0 +1,208 @@
+# Canonicalization of user preferences ahead of the LLM calls
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.services.response_cache import make_cache_key
+import bisect
+
+
+@dataclass(frozen=True)
+class BucketingPolicy:
+    """How aggressively requests are folded together before hashing"""
+
+    name: str
+    sort_lists: bool = True
+    lowercase_text: bool = True
+    # budget min is floored and max is ceiled onto these edges; None keeps exact values
+    budget_edges: Optional[Tuple[int, ...]] = (0, 500, 1000, 2000, 3500, 5000, 7500, 10000)
+    # exact dates are replaced by season + trip length band
+    bucket_dates: bool = True
+    trip_length_edges: Tuple[int, ...] = (1, 3, 5, 8, 11, 15, 22)
+
+
+POLICIES: Dict[str, BucketingPolicy] = {
+    "exact": BucketingPolicy(
+        name="exact", sort_lists=False, lowercase_text=False, budget_edges=None, bucket_dates=False
+    ),
+    "sorted": BucketingPolicy(name="sorted", budget_edges=None, bucket_dates=False),
+    "default": BucketingPolicy(name="default"),
+    "coarse": BucketingPolicy(
+        name="coarse",
+        budget_edges=(0, 1000, 2500, 5000, 10000),
+        trip_length_edges=(1, 4, 8, 15),
+    ),
+}
+
+SEASONS = {
+    12: "winter", 1: "winter", 2: "winter",
+    3: "spring", 4: "spring", 5: "spring",
+    6: "summer", 7: "summer", 8: "summer",
+    9: "autumn", 10: "autumn", 11: "autumn",
+}
+
+
+@dataclass
+class NormalizedRequest:
+    cache_key: str
+    prompt_payload: dict
+
+
+def get_policy(name: str) -> BucketingPolicy:
+    return POLICIES.get(name, POLICIES["default"])
+
+
+def _text(value: Optional[str], policy: BucketingPolicy) -> Optional[str]:
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    return value.lower() if policy.lowercase_text else value
+
+
+def _text_list(values: Iterable[str], policy: BucketingPolicy) -> List[str]:
+    cleaned = [_text(value, policy) for value in values or []]
+    if not policy.sort_lists:
+        return cleaned
+    return sorted(set(value for value in cleaned if value))
+
+
+def _parse_date(value) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _band(value: int, edges: Tuple[int, ...]) -> str:
+    """Label of the [low, high) band holding value, open-ended past the last edge"""
+    index = bisect.bisect_right(edges, value) - 1
+    if index < 0:
+        return f"<{edges[0]}"
+    if index >= len(edges) - 1:
+        return f"{edges[-1]}+"
+    return f"{edges[index]}-{edges[index + 1] - 1}"
+
+
+def bucket_budget(minimum: int, maximum: int, currency: str, policy: BucketingPolicy) -> dict:
+    currency = (currency or "").upper()
+    if policy.budget_edges is None:
+        return {"min": minimum, "max": maximum, "currency": currency}
+    edges = policy.budget_edges
+    floor_index = max(bisect.bisect_right(edges, minimum) - 1, 0)
+    ceil_index = bisect.bisect_left(edges, maximum)
+    return {
+        "min": edges[floor_index],
+        "max": edges[ceil_index] if ceil_index < len(edges) else f"{edges[-1]}+",
+        "currency": currency,
+    }
+
+
+def bucket_dates(start_date, end_date, policy: BucketingPolicy) -> dict:
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+    if not policy.bucket_dates or start is None or end is None:
+        return {"start_date": str(start_date), "end_date": str(end_date)}
+    trip_days = (end - start).days + 1
+    return {
+        "season": SEASONS[start.month],
+        "trip_days": _band(trip_days, policy.trip_length_edges),
+    }
+
+
+def normalize_destination_preferences(
+    preferences, policy: BucketingPolicy = POLICIES["default"]
+) -> NormalizedRequest:
+    """Normalize a destination `Preferences` model (or its dict form)"""
+    prefs = jsonable_encoder(preferences)
+    budget = prefs.get("budget") or {}
+    dates = prefs.get("travel_dates") or {}
+    payload = {
+        "traveler_age_group": _text((prefs.get("traveler_info") or {}).get("age_group"), policy),
+        "budget": bucket_budget(budget.get("min", 0), budget.get("max", 0), budget.get("currency"), policy),
+        "travel_dates": bucket_dates(dates.get("start_date"), dates.get("end_date"), policy),
+        "group_size": prefs.get("group_size"),
+        "group_relationship": _text(prefs.get("group_relationship"), policy),
+        "preferred_location": _text(prefs.get("preferred_location"), policy),
+        "travel_style": _text(prefs.get("travel_style"), policy),
+        "interests": _text_list(prefs.get("interests"), policy),
+        "must_haves": _text_list(prefs.get("must_haves"), policy),
+        "deal_breakers": _text_list(prefs.get("deal_breakers"), policy),
+    }
+    return NormalizedRequest(
+        cache_key=make_cache_key({"destinations": payload}), prompt_payload=payload
+    )
+
+
+def normalize_questionnaire_request(
+    request, policy: BucketingPolicy = POLICIES["default"]
+) -> NormalizedRequest:
+    """Normalize an `ItineraryQuestionnaireRequest` (or its dict form)"""
+    data = jsonable_encoder(request)
+    destination = data.get("selected_destination") or {}
+    dates = data.get("travel_dates") or {}
+    prefs = dict(data.get("activity_preferences") or {})
+    payload = {
+        "destination": _text(destination.get("name"), policy),
+        "travel_dates": bucket_dates(dates.get("start_date"), dates.get("end_date"), policy),
+        "pace": prefs.get("pace"),
+        "daily_start_time": prefs.get("daily_start_time"),
+        "daily_end_time": prefs.get("daily_end_time"),
+        "max_activities_per_day": prefs.get("max_activities_per_day"),
+        "priority_interests": _text_list(prefs.get("priority_interests"), policy),
+        "must_see_attractions": _text_list(prefs.get("must_see_attractions"), policy),
+        "activity_types": prefs.get("activity_types"),
+        "meal_preferences": prefs.get("meal_preferences"),
+        "transportation": prefs.get("transportation"),
+        "accommodation_area": _text(prefs.get("accommodation_area"), policy),
+    }
+    return NormalizedRequest(
+        cache_key=make_cache_key({"activities": payload}), prompt_payload=payload
+    )
+
+
+def normalize_logged_request(payload: dict, policy: BucketingPolicy) -> Optional[Tuple[str, NormalizedRequest]]:
+    """Route a logged request body to its normalizer; returns (endpoint, normalized)"""
+    if "preferences" in payload and "traveler_info" in (payload.get("preferences") or {}):
+        return "destinations", normalize_destination_preferences(payload["preferences"], policy)
+    if "activity_preferences" in payload:
+        return "activities", normalize_questionnaire_request(payload, policy)
+    return None
+
+
+def simulate_hit_ratio(
+    requests: Iterable[dict], policy: BucketingPolicy, max_entries: Optional[int] = None
+) -> dict:
+    """Replay request bodies through an LRU keyed by the policy and count hits"""
+    seen: OrderedDict = OrderedDict()
+    totals: Dict[str, Dict[str, int]] = {}
+    for payload in requests:
+        routed = normalize_logged_request(payload, policy)
+        if routed is None:
+            continue
+        endpoint, normalized = routed
+        counters = totals.setdefault(endpoint, {"requests": 0, "hits": 0})
+        counters["requests"] += 1
+        if normalized.cache_key in seen:
+            counters["hits"] += 1
+            seen.move_to_end(normalized.cache_key)
+        else:
+            seen[normalized.cache_key] = True
+            if max_entries is not None and len(seen) > max_entries:
+                seen.popitem(last=False)
+
+    report = {"policy": policy.name, "endpoints": {}}
+    all_requests = all_hits = 0
+    for endpoint, counters in sorted(totals.items()):
+        all_requests += counters["requests"]
+        all_hits += counters["hits"]
+        report["endpoints"][endpoint] = {
+            **counters,
+            "hit_ratio": round(counters["hits"] / counters["requests"], 4),
+        }
+    report["requests"] = all_requests
+    report["hits"] = all_hits
+    report["hit_ratio"] = round(all_hits / all_requests, 4) if all_requests else 0.0
+    return report
@@ -0,0 +1,188 @@
+# Compact user prompts for the LLM calls, with approximate token counts
+from datetime import datetime
+from typing import Iterable, List, Optional
+import json
+import math
+import re
+
+# request field -> key used in prompts; the names stay readable for the model
+SHORT_KEYS = {
+    "traveler_age_group": "age_group",
+    "travel_dates": "dates",
+    "start_date": "from",
+    "end_date": "to",
+    "trip_days": "days",
+    "group_relationship": "group",
+    "preferred_location": "location",
+    "travel_style": "style",
+    "max_activities_per_day": "max_per_day",
+    "priority_interests": "interests",
+    "must_see_attractions": "must_see",
+    "activity_types": "types",
+    "meal_preferences": "meals",
+    "transportation": "transport",
+    "accommodation_area": "stay_area",
+    "duration_hours": "hours",
+    "category": "type",
+}
+
+# activity fields the model needs; costs and descriptions stay local
+ACTIVITY_FIELDS = ("name", "category", "duration_hours", "priority")
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate BPE token count: words are split into pieces of about four
+    letters, numbers into groups of three digits, and every symbol counts
+    once. Close enough to compare prompts, not for billing.
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def count_message_tokens(messages: Iterable[dict]) -> int:
+    # each chat message carries a few tokens of role and framing
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+def _shorten(value):
+    """Rename keys to SHORT_KEYS and drop empty values"""
+    if isinstance(value, dict):
+        shortened = {}
+        for key, item in value.items():
+            item = _shorten(item)
+            if item is None or item == [] or item == {} or item == "":
+                continue
+            shortened[SHORT_KEYS.get(key, key)] = item
+        return shortened
+    if isinstance(value, list):
+        return [_shorten(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def compact_json(payload) -> str:
+    """Deterministic JSON without whitespace, empty fields or long keys"""
+    return json.dumps(_shorten(payload), separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+def _activities(activities: List[dict], fields=ACTIVITY_FIELDS) -> List[dict]:
+    return [{field: activity.get(field) for field in fields} for activity in activities]
+
+
+def _day_window(preferences: dict) -> Optional[str]:
+    start = preferences.get("daily_start_time")
+    end = preferences.get("daily_end_time")
+    return f"{start}-{end}" if start and end else None
+
+
+def _trip_days(travel_dates: dict) -> Optional[int]:
+    try:
+        start = datetime.strptime(travel_dates["start_date"], "%Y-%m-%d")
+        end = datetime.strptime(travel_dates["end_date"], "%Y-%m-%d")
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (end - start).days + 1
+
+
+def _trip(optimization_request: dict) -> dict:
+    preferences = optimization_request.get("preferences") or {}
+    travel_dates = optimization_request.get("travel_dates") or {}
+    return {
+        "destination": (optimization_request.get("destination") or {}).get("name"),
+        "travel_dates": travel_dates,
+        "trip_days": _trip_days(travel_dates),
+        "pace": preferences.get("pace"),
+        "day_window": _day_window(preferences),
+        "max_activities_per_day": preferences.get("max_activities_per_day"),
+    }
+
+
+def destination_prompt(preferences: dict) -> str:
+    return f"Suggest 3 to 5 destinations for these preferences: {compact_json(preferences)}"
+
+
+def activity_prompt(activity_request: dict) -> str:
+    request = dict(activity_request)
+    request["day_window"] = _day_window(request)
+    request.pop("daily_start_time", None)
+    request.pop("daily_end_time", None)
+    return f"Suggest 10 activities for this trip: {compact_json(request)}"
+
+
+def itinerary_prompt(optimization_request: dict) -> str:
+    trip = _trip(optimization_request)
+    days = trip["trip_days"]
+    length = f"{days}-day " if days else ""
+    # ids are carried into the schedule, which is priced by them
+    trip["selected"] = _activities(
+        optimization_request.get("selected_activities") or [], ("id",) + ACTIVITY_FIELDS
+    )
+    return (
+        f"Create an optimized {length}itinerary. Include every selected activity and add "
+        "complementary ones so every day is full, without repeating activities. "
+        f"Trip: {compact_json(trip)}"
+    )
+
+
+def continuation_prompt(continuation_request: dict) -> str:
+    """Only the missing days of a cut-off itinerary, listed with their dates"""
+    trip = _trip(continuation_request)
+    day_numbers = continuation_request.get("day_numbers") or []
+    # the trip's full date range would read as the days to plan
+    trip["travel_dates"] = None
+    trip["trip_days"] = len(day_numbers)
+    trip["day_numbers"] = day_numbers
+    trip["day_dates"] = continuation_request.get("day_dates")
+    trip["selected"] = _activities(
+        continuation_request.get("selected_activities") or [], ("id",) + ACTIVITY_FIELDS
+    )
+    # the days already planned, by theme and activity names
+    trip["done"] = continuation_request.get("completed_days")
+    return (
+        "Continue this itinerary with only the days in day_numbers, on the matching "
+        "day_dates. The days in done are already planned: do not repeat their "
+        "activities. Include the selected activities, which are not planned yet. "
+        f"Trip: {compact_json(trip)}"
+    )
+
+
+def plan_prompt(plan_request: dict) -> str:
+    trip = _trip(plan_request)
+    trip["trip_days"] = plan_request.get("total_days") or trip["trip_days"]
+    # the plan assigns activities by id
+    trip["selected"] = _activities(
+        plan_request.get("selected_activities") or [], ("id",) + ACTIVITY_FIELDS
+    )
+    return f"Plan the days of this trip: {compact_json(trip)}"
+
+
+def day_prompt(day_request: dict) -> str:
+    preferences = day_request.get("preferences") or {}
+    day = {
+        "destination": day_request.get("destination"),
+        "date": day_request.get("date"),
+        "day_number": day_request.get("day_number"),
+        "theme": day_request.get("theme"),
+        "pace": preferences.get("pace"),
+        "day_window": _day_window(preferences),
+        "assigned": _activities(
+            day_request.get("assigned_activities") or [], ("id",) + ACTIVITY_FIELDS
+        ),
+        "other_themes": day_request.get("other_day_themes"),
+    }
+    return f"Schedule this day: {compact_json(day)}"
+
+
+def annotation_prompt(annotation_request: dict) -> str:
+    return f"Write themes and notes for this schedule: {compact_json(annotation_request)}"
@@ -0,0 +1,225 @@
+# Content-addressed cache for LLM responses
+from collections import OrderedDict
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.db.models import ResponseCacheEntry
+from app.utils import common_utils
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(payload: object) -> str:
+    """Hash a JSON-compatible payload into a stable, order-independent key"""
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Base class for response caches with TTL, LRU size bound and counters"""
+
+    backend = "none"
+
+    def __init__(self, namespace: str, ttl_seconds: int, max_entries: int):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._run(self._get, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        await self._run(self._set, key, value)
+
+    async def _run(self, operation, *args):
+        """Run a backend operation; backends doing blocking I/O move it off the event loop"""
+        return operation(*args)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": self.size(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _get(self, key: str) -> Optional[str]:
+        return None
+
+    def _set(self, key: str, value: str) -> None:
+        pass
+
+    def size(self) -> int:
+        return 0
+
+    def clear(self) -> None:
+        pass
+
+
+class InMemoryResponseCache(ResponseCache):
+    """Per-process LRU cache; lookups are a dict access"""
+
+    backend = "memory"
+
+    def __init__(self, namespace: str, ttl_seconds: int, max_entries: int):
+        super().__init__(namespace, ttl_seconds, max_entries)
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Cache stored in the app database so entries survive restarts. The LRU
+    position of an entry is refreshed at most once per
+    `access_resolution_seconds`, so most hits are a read without a commit.
+    """
+
+    backend = "sqlite"
+    access_resolution_seconds = 60.0
+
+    async def _run(self, operation, *args):
+        return await run_in_threadpool(operation, *args)
+
+    def _get(self, key: str) -> Optional[str]:
+        db: Session = next(get_db())
+        try:
+            entry = db.get(ResponseCacheEntry, (self.namespace, key))
+            if entry is None:
+                return None
+            now = time.time()
+            if entry.created_at + self.ttl_seconds <= now:
+                db.delete(entry)
+                db.commit()
+                return None
+            value = entry.value
+            if now - entry.last_access >= self.access_resolution_seconds:
+                entry.last_access = now
+                db.commit()
+            return value
+        except Exception as e:
+            logger.error(common_utils.get_error_message(self._get.__name__, str(e)))
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _set(self, key: str, value: str) -> None:
+        db: Session = next(get_db())
+        try:
+            now = time.time()
+            db.merge(
+                ResponseCacheEntry(
+                    namespace=self.namespace,
+                    cache_key=key,
+                    value=value,
+                    created_at=now,
+                    last_access=now,
+                )
+            )
+            db.flush()
+            overflow = self._count(db) - self.max_entries
+            if overflow > 0:
+                # evict the least recently used entries of this namespace
+                stale_keys = [
+                    row.cache_key
+                    for row in db.query(ResponseCacheEntry.cache_key)
+                    .filter(ResponseCacheEntry.namespace == self.namespace)
+                    .order_by(ResponseCacheEntry.last_access)
+                    .limit(overflow)
+                ]
+                db.query(ResponseCacheEntry).filter(
+                    ResponseCacheEntry.namespace == self.namespace,
+                    ResponseCacheEntry.cache_key.in_(stale_keys),
+                ).delete(synchronize_session=False)
+                self.evictions += len(stale_keys)
+            db.commit()
+        except Exception as e:
+            logger.error(common_utils.get_error_message(self._set.__name__, str(e)))
+            db.rollback()
+        finally:
+            db.close()
+
+    def _count(self, db: Session) -> int:
+        return (
+            db.query(ResponseCacheEntry)
+            .filter(ResponseCacheEntry.namespace == self.namespace)
+            .count()
+        )
+
+    def size(self) -> int:
+        db: Session = next(get_db())
+        try:
+            return self._count(db)
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        db: Session = next(get_db())
+        try:
+            db.query(ResponseCacheEntry).filter(
+                ResponseCacheEntry.namespace == self.namespace
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+def build_response_cache(
+    namespace: str, backend: str, ttl_seconds: int, max_entries: int
+) -> ResponseCache:
+    """Create the cache backend selected in settings ("memory", "sqlite" or "none")"""
+    if backend == "memory":
+        return InMemoryResponseCache(namespace, ttl_seconds, max_entries)
+    if backend == "sqlite":
+        return SQLiteResponseCache(namespace, ttl_seconds, max_entries)
+    if backend != "none":
+        logger.warning(f"Unknown cache backend '{backend}', caching disabled")
+    return ResponseCache(namespace, ttl_seconds, max_entries)
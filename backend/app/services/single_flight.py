@@ -0,0 +1,51 @@
+# Single-flight coalescing of identical in-flight calls
+from typing import Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Concurrent callers with the same key share one in-flight task.
+
+    The shared task is shielded, so a caller that disconnects does not
+    cancel the call the other callers are still waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.executed += 1
+        else:
+            self.collapsed += 1
+            logger.debug(f"{self.name}: joined in-flight call {key[:12]}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # retrieved here so an orphaned failure is not reported as unhandled
+            logger.debug(f"{self.name}: shared call failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        calls = self.executed + self.collapsed
+        return {
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._in_flight),
+            "collapse_ratio": round(self.collapsed / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,200 @@
+# Output token budgets (max_tokens) estimated from the size of the request
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Sequence
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# a truncated response needed more than it got; assume this much more
+TRUNCATED_UNDERESTIMATE = 1.25
+
+
+def itinerary_features(optimization_request: dict) -> List[float]:
+    """Trip days, activity slots (days x max per day) and selected activities"""
+    travel_dates = optimization_request.get("travel_dates") or {}
+    try:
+        start = datetime.strptime(travel_dates["start_date"], "%Y-%m-%d")
+        end = datetime.strptime(travel_dates["end_date"], "%Y-%m-%d")
+        days = max((end - start).days + 1, 1)
+    except (KeyError, TypeError, ValueError):
+        days = 1
+    if optimization_request.get("day_numbers"):
+        # a continuation generates only the missing days
+        days = len(optimization_request["day_numbers"])
+    per_day = (optimization_request.get("preferences") or {}).get("max_activities_per_day") or 4
+    selected = len(optimization_request.get("selected_activities") or [])
+    return [days, days * per_day, selected]
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> Optional[List[float]]:
+    """Gaussian elimination with partial pivoting; None if singular"""
+    size = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        total = sum(rows[r][c] * solution[c] for c in range(r + 1, size))
+        solution[r] = (rows[r][size] - total) / rows[r][r]
+    return solution
+
+
+class OutputTokenBudget:
+    """
+    Predicts the completion tokens of a request as a linear function of its
+    features, fitted over recent responses and pulled towards the `prior`
+    coefficients (intercept first) while there are only a few of them.
+
+    The budget is the prediction times the `percentile` of recent
+    actual/predicted ratios (`headroom` until `min_samples` are seen), so
+    about 100 - percentile % of responses are expected to be truncated.
+    Truncation and the budget left unused are tracked against what a fixed
+    `fixed_tokens` budget would have done on the same responses.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prior: Sequence[float],
+        percentile: float = 95,
+        headroom: float = 1.3,
+        min_tokens: int = 500,
+        max_tokens: int = 8000,
+        window: int = 200,
+        min_samples: int = 20,
+        prior_weight: float = 5.0,
+        fixed_tokens: Optional[int] = None,
+    ):
+        self.name = name
+        self.prior = list(prior)
+        self.coefficients = list(prior)
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.min_samples = min_samples
+        self.prior_weight = prior_weight
+        self.fixed_tokens = fixed_tokens
+        self._samples = deque(maxlen=window)
+        self._ratio = headroom
+        self.calls = 0
+        self.truncated = 0
+        self.unmeasured = 0
+        self.budget_tokens = 0
+        self.output_tokens = 0
+        self.wasted_tokens = 0
+        self.fixed_truncated = 0
+        self.fixed_wasted_tokens = 0
+        self.fixed_calls = 0
+
+    def predict(self, features: Sequence[float]) -> float:
+        return sum(w * x for w, x in zip(self.coefficients, [1.0, *features]))
+
+    def budget(self, features: Sequence[float]) -> int:
+        tokens = math.ceil(max(self.predict(features), 1.0) * self._ratio)
+        return min(max(tokens, self.min_tokens), self.max_tokens)
+
+    def record(
+        self,
+        features: Sequence[float],
+        budget: int,
+        output_tokens: Optional[int],
+        truncated: bool,
+    ) -> None:
+        """Account for a response that was given `budget` and used `output_tokens`"""
+        self.calls += 1
+        if output_tokens is None:
+            # the provider did not report usage
+            self.unmeasured += 1
+            return
+        self.budget_tokens += budget
+        self.output_tokens += output_tokens
+        if truncated:
+            self.truncated += 1
+            needed = max(output_tokens, budget) * TRUNCATED_UNDERESTIMATE
+        else:
+            self.wasted_tokens += budget - output_tokens
+            needed = output_tokens
+        # a response truncated below the fixed budget tells nothing about it
+        if self.fixed_tokens is not None and (not truncated or budget >= self.fixed_tokens):
+            self.fixed_calls += 1
+            if truncated or output_tokens > self.fixed_tokens:
+                self.fixed_truncated += 1
+            else:
+                self.fixed_wasted_tokens += self.fixed_tokens - output_tokens
+        self._samples.append(([1.0, *features], needed))
+        self._refit()
+
+    def _refit(self) -> None:
+        size = len(self.prior)
+        # ridge regression towards the prior: (X'X + kI) w = X'y + k prior
+        matrix = [
+            [self.prior_weight if i == j else 0.0 for j in range(size)] for i in range(size)
+        ]
+        vector = [self.prior_weight * w for w in self.prior]
+        for x, y in self._samples:
+            for i in range(size):
+                vector[i] += x[i] * y
+                for j in range(size):
+                    matrix[i][j] += x[i] * x[j]
+        coefficients = _solve(matrix, vector)
+        if coefficients is not None:
+            self.coefficients = coefficients
+        if len(self._samples) >= self.min_samples:
+            ratios = sorted(
+                y / max(sum(w * v for w, v in zip(self.coefficients, x)), 1.0)
+                for x, y in self._samples
+            )
+            index = min(int(len(ratios) * self.percentile / 100), len(ratios) - 1)
+            self._ratio = ratios[index]
+
+    def stats(self) -> dict:
+        measured = self.calls - self.unmeasured
+        snapshot = {
+            "calls": self.calls,
+            "unmeasured": self.unmeasured,
+            "truncated": self.truncated,
+            "truncation_rate": round(self.truncated / measured, 4) if measured else 0.0,
+            "avg_budget": round(self.budget_tokens / measured, 1) if measured else 0.0,
+            "avg_output_tokens": round(self.output_tokens / measured, 1) if measured else 0.0,
+            "wasted_tokens": self.wasted_tokens,
+            "waste_ratio": (
+                round(self.wasted_tokens / self.budget_tokens, 4) if self.budget_tokens else 0.0
+            ),
+            "coefficients": [round(w, 2) for w in self.coefficients],
+            "ratio": round(self._ratio, 3),
+        }
+        if self.fixed_tokens is not None:
+            fixed_budget = self.fixed_calls * self.fixed_tokens
+            snapshot["fixed"] = {
+                "max_tokens": self.fixed_tokens,
+                "truncation_rate": (
+                    round(self.fixed_truncated / self.fixed_calls, 4) if self.fixed_calls else 0.0
+                ),
+                "waste_ratio": (
+                    round(self.fixed_wasted_tokens / fixed_budget, 4) if fixed_budget else 0.0
+                ),
+            }
+        return snapshot
+
+
+def replay_usage(samples, budget: OutputTokenBudget) -> dict:
+    """
+    Replay logged (features, output_tokens, truncated) samples as if `budget`
+    had set max_tokens, and report its truncation and waste next to the
+    fixed budget. Responses truncated in the log count as needing more.
+    """
+    for features, output_tokens, truncated in samples:
+        needed = output_tokens * TRUNCATED_UNDERESTIMATE if truncated else output_tokens
+        max_tokens = budget.budget(features)
+        budget.record(features, max_tokens, min(math.ceil(needed), max_tokens), needed > max_tokens)
+    return budget.stats()
@@ -42,6 +42,6 @@ async def validate_api_key(
 
 def is_valid_api_key(api_key: str) -> bool:
     logger.debug(common_utils.get_logging_message(is_valid_api_key.__name__))
-    if api_key != settings.API_KEY:
+    if api_key != settings.API_KEY and api_key not in settings.ADDITIONAL_API_KEYS:
         return False
     return True
@@ -1 +1,196 @@
-# LLM helper functions
\ No newline at end of file
+# LLM helper functions
+from typing import List, Optional, Type, Union, get_args, get_origin
+from pydantic import BaseModel
+import json
+import re
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser that pulls complete elements out of one JSON array
+    while the document is still streaming in.
+
+    Feed it text chunks as they arrive; `feed` returns the raw text of every
+    object in the array under `key` whose closing brace was just seen.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.done = False  # the target array has been closed
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_chars: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._element: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        completed = []
+        for char in chunk:
+            if self._element is not None:
+                self._element.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string_chars)
+                else:
+                    self._string_chars.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_chars = []
+            elif char == ":":
+                self._current_key = self._last_string
+            elif char == ",":
+                self._current_key = None
+            elif char == "[":
+                if (
+                    self._array_depth is None
+                    and not self.done
+                    and self._current_key == self.key
+                ):
+                    self._array_depth = self._depth + 1
+                self._depth += 1
+                self._current_key = None
+            elif char == "{":
+                if self._array_depth is not None and self._depth == self._array_depth:
+                    self._element = ["{"]
+                self._depth += 1
+                self._current_key = None
+            elif char == "}":
+                self._depth -= 1
+                if self._element is not None and self._depth == self._array_depth:
+                    completed.append("".join(self._element))
+                    self._element = None
+            elif char == "]":
+                if self._array_depth is not None and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self.done = True
+                self._depth -= 1
+        return completed
+
+
+_FENCE_PATTERN = re.compile(r"^\s*```[\w-]*\s*\n?|\n?\s*```\s*$")
+_NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_code_fences(text: str) -> str:
+    """Drop a surrounding ```json fence and any prose before or after the JSON"""
+    text = _FENCE_PATTERN.sub("", text.strip())
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return text
+    text = text[min(starts):]
+    try:
+        _, end = json.JSONDecoder().raw_decode(text)
+        return text[:end]
+    except json.JSONDecodeError:
+        return text
+
+
+def close_truncated_json(text: str) -> List[str]:
+    """
+    Remove trailing commas and, if the document was cut off, close it after
+    the last complete element of an open array. Returns one candidate per
+    open array, innermost first, as a partial element deep inside may make
+    the enclosing one invalid too.
+    """
+    output: List[str] = []
+    stack: List[str] = []
+    # array depth -> (output length, open containers) after its last complete element
+    cut_points = {}
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            output.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char in "}]":
+            while output and output[-1].isspace():
+                output.pop()
+            if output and output[-1] == ",":
+                output.pop()
+            if stack and stack.pop() == "[":
+                cut_points.pop(len(stack) + 1, None)
+            output.append(char)
+            if stack and stack[-1] == "[":
+                cut_points[len(stack)] = (len(output), list(stack))
+            continue
+        if char == "," and stack and stack[-1] == "[":
+            cut_points[len(stack)] = (len(output), list(stack))
+        output.append(char)
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            if char == "[":
+                cut_points[len(stack)] = (len(output), list(stack))
+
+    if not stack and not in_string:
+        return ["".join(output)]
+    candidates = []
+    for depth in sorted(cut_points, reverse=True):
+        length, open_containers = cut_points[depth]
+        kept = "".join(output[:length]).rstrip()
+        if kept.endswith(","):
+            kept = kept[:-1]
+        candidates.append(kept + "".join(_CLOSERS[char] for char in reversed(open_containers)))
+    return candidates or [text]
+
+
+def repair_json(text: str) -> List[str]:
+    """
+    Best-effort local fixes of common defects in model JSON output, as
+    candidates to try in order
+    """
+    return close_truncated_json(strip_code_fences(text))
+
+
+def _number(text: str, annotation):
+    match = _NUMBER_PATTERN.search(text)
+    if match is None:
+        return text
+    value = float(match.group().replace(",", ""))
+    return round(value) if annotation is int else value
+
+
+def coerce_numbers(data, model: Type[BaseModel]):
+    """Turn strings like "$1,200" or "2 hours" into numbers where `model` expects one"""
+    if not isinstance(data, dict):
+        return data
+    coerced = dict(data)
+    for name, field in model.model_fields.items():
+        if name in coerced:
+            coerced[name] = _coerce_value(coerced[name], field.annotation)
+    return coerced
+
+
+def _coerce_value(value, annotation):
+    origin = get_origin(annotation)
+    if origin is Union:
+        for option in get_args(annotation):
+            if option is not type(None):
+                value = _coerce_value(value, option)
+        return value
+    if origin in (list, List) and isinstance(value, list):
+        (item_annotation,) = get_args(annotation) or (None,)
+        return [_coerce_value(item, item_annotation) for item in value]
+    if annotation in (int, float) and isinstance(value, str):
+        return _number(value, annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return coerce_numbers(value, annotation)
+    return value
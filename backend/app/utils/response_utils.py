@@ -1 +1,9 @@
-# API response utilities
\ No newline at end of file
+# API response utilities
+from fastapi.encoders import jsonable_encoder
+import json
+
+
+def format_sse(event: str, data: object) -> str:
+    """Serialize one Server-Sent Events message"""
+    payload = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -40,6 +40,35 @@ class InternalServerError(APIException):
         )
 
 
+class ServiceUnavailableError(APIException):
+    """Server is at capacity; the client should retry after `retry_after` seconds"""
+
+    def __init__(
+        self,
+        retry_after: int,
+        internal_detail: str = None,
+        detail: str = "Service is busy, please retry later",
+    ):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            internal_detail=internal_detail,
+        )
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    """The LLM provider keeps failing; calls fail fast until the circuit closes"""
+
+    def __init__(self, retry_after: int, internal_detail: str = None):
+        super().__init__(
+            retry_after=retry_after,
+            internal_detail=internal_detail,
+            detail="Service is temporarily unavailable, please retry later",
+        )
+
+
 class RateLimitExceededException(Exception):
     """Custom exception for rate limiting"""
 
@@ -1,9 +1,10 @@
 # FastAPI app entry point
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from exceptions import APIException, ValidationError
-from app.api.endpoints import destination_rounter, itinerary_router
+from app.api.endpoints import destination_rounter, itinerary_router, metrics_router
 from app.core.logging_config import setup_logging
 from app.core.exception_handler import (
     validation_exception_handler,
@@ -12,13 +13,28 @@ from app.core.exception_handler import (
 )
 from app.middleware.rate_limiter import RateLimiter
 from app.middleware.rate_limit_middleware import RateLimitMiddleware
+from app.services.openai_client import init_openai_client, close_openai_client
+from app.services.itinerary_job_service import itinerary_jobs
 import logging
 
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # share one pooled LLM client across all requests of this worker
+    init_openai_client()
+    await itinerary_jobs.start()
+    await rate_limiter.start()
+    yield
+    await itinerary_jobs.stop()
+    await close_openai_client()
+    await rate_limiter.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -43,6 +59,7 @@ app.add_exception_handler(Exception, general_exception_handler)
 # Include the API router
 app.include_router(destination_rounter.router)
 app.include_router(itinerary_router.router)
+app.include_router(metrics_router.router)
 
 
 # Define the root endpoint
@@ -0,0 +1,76 @@
+"""
+Fit the itinerary max_tokens model to logged token usage and compare it with the fixed budget.
+
+Accepts application logs (lines with "Itinerary token usage: {...}") or JSONL
+files with one usage record per line:
+
+    python scripts/calibrate_token_budget.py logs/app.log
+    python scripts/calibrate_token_budget.py usage.jsonl --percentile 90
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Iterator, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.constants import openai_constants
+from app.core.config import settings
+from app.services.token_budget import OutputTokenBudget, replay_usage
+
+USAGE_MARKER = "Itinerary token usage: "
+
+
+def parse_line(line: str) -> Optional[tuple]:
+    line = line.strip()
+    if USAGE_MARKER in line:
+        line = line.split(USAGE_MARKER, 1)[1]
+    try:
+        usage = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(usage, dict) or usage.get("output_tokens") is None:
+        return None
+    return usage["features"], usage["output_tokens"], bool(usage.get("truncated"))
+
+
+def read_usage(paths: list) -> Iterator[tuple]:
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                sample = parse_line(line)
+                if sample is not None:
+                    yield sample
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="log or JSONL files with token usage")
+    parser.add_argument("--percentile", type=float, default=settings.ITINERARY_TOKEN_PERCENTILE)
+    parser.add_argument("--fixed", type=int, default=openai_constants.ITINERARY_FIXED_TOKENS)
+    args = parser.parse_args()
+
+    samples = list(read_usage(args.paths))
+    print(f"Replaying {len(samples)} logged itinerary responses")
+    budget = OutputTokenBudget(
+        "itinerary",
+        prior=settings.ITINERARY_TOKEN_PRIOR,
+        percentile=args.percentile,
+        min_tokens=settings.ITINERARY_MIN_TOKENS,
+        max_tokens=settings.ITINERARY_MAX_TOKENS,
+        window=max(len(samples), 1),
+        fixed_tokens=args.fixed,
+    )
+    report = replay_usage(samples, budget)
+    print(f"{'budget':<12} {'truncated':>10} {'wasted':>10}")
+    print(
+        f"{'fixed ' + str(args.fixed):<12} {report['fixed']['truncation_rate']:>10.2%} "
+        f"{report['fixed']['waste_ratio']:>10.2%}"
+    )
+    print(f"{'estimated':<12} {report['truncation_rate']:>10.2%} {report['waste_ratio']:>10.2%}")
+    print(f"ITINERARY_TOKEN_PRIOR={json.dumps(report['coefficients'])}")
+
+
+if __name__ == "__main__":
+    main()
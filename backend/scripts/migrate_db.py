@@ -0,0 +1,69 @@
+"""
+Bring a database created by an older version of the app up to app/db/schema.sql.
+
+The app only creates missing tables on start; columns added to existing
+tables and tables that are no longer used are handled here, once, after
+upgrading:
+
+    python scripts/migrate_db.py --dry-run
+    python scripts/migrate_db.py
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db.database import engine
+
+# columns added to existing tables, in the order they were introduced
+ADDED_COLUMNS = [
+    ("itinerary_jobs", "owner", "TEXT"),
+    ("itinerary_jobs", "lease_until", "TIMESTAMP"),
+]
+
+# tables no model uses anymore: rate_limits (one row per request) was
+# replaced by rate_limit_buckets
+RETIRED_TABLES = ("rate_limits",)
+
+
+def pending_statements() -> list:
+    inspector = inspect(engine)
+    statements = []
+    for table_name, column_name, column_type in ADDED_COLUMNS:
+        if not inspector.has_table(table_name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        if column_name not in existing:
+            statements.append(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+    for table_name in RETIRED_TABLES:
+        if inspector.has_table(table_name):
+            statements.append(f"DROP TABLE {table_name}")
+    return statements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--dry-run", action="store_true", help="print the statements without running them"
+    )
+    args = parser.parse_args()
+
+    statements = pending_statements()
+    if not statements:
+        print("Database is up to date")
+        return
+    for statement in statements:
+        print(statement)
+    if args.dry_run:
+        return
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    print(f"Applied {len(statements)} statements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Replay logged requests and report the cache hit ratio of each bucketing policy.
+
+Accepts application logs (lines with "REQUEST FROM UI: {...}") or JSONL files
+with one request body per line:
+
+    python scripts/replay_cache_hit_ratio.py logs/app.log
+    python scripts/replay_cache_hit_ratio.py requests.jsonl --policies exact default --max-entries 1000
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+from typing import Iterator, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.preference_normalizer import POLICIES, simulate_hit_ratio
+
+REQUEST_MARKER = "REQUEST FROM UI: "
+
+
+def parse_line(line: str) -> Optional[dict]:
+    line = line.strip()
+    if not line:
+        return None
+    if REQUEST_MARKER in line:
+        # logged with an f-string, so the body is a Python literal rather than JSON
+        body = line.split(REQUEST_MARKER, 1)[1]
+        try:
+            return ast.literal_eval(body)
+        except (ValueError, SyntaxError):
+            return None
+    try:
+        payload = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def read_requests(paths: list) -> Iterator[dict]:
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                payload = parse_line(line)
+                if payload is not None:
+                    yield payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="log or JSONL files to replay")
+    parser.add_argument(
+        "--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES)
+    )
+    parser.add_argument(
+        "--max-entries", type=int, default=None, help="LRU bound, unbounded by default"
+    )
+    args = parser.parse_args()
+
+    requests = list(read_requests(args.paths))
+    print(f"Replaying {len(requests)} logged requests")
+    print(f"{'policy':<10} {'endpoint':<14} {'requests':>9} {'hits':>7} {'hit ratio':>10}")
+    for name in args.policies:
+        report = simulate_hit_ratio(requests, POLICIES[name], args.max_entries)
+        for endpoint, counters in report["endpoints"].items():
+            print(
+                f"{name:<10} {endpoint:<14} {counters['requests']:>9} "
+                f"{counters['hits']:>7} {counters['hit_ratio']:>10.2%}"
+            )
+        print(
+            f"{name:<10} {'all':<14} {report['requests']:>9} "
+            f"{report['hits']:>7} {report['hit_ratio']:>10.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import openai_client
+
+
+@pytest.fixture(autouse=True)
+def openai_only_routes():
+    """
+    Route every tier to OpenAI as if ANTHROPIC_API_KEY were unset, so the
+    fake OpenAI clients of the tests answer every call whatever the
+    environment configures. Tests of other providers patch their own.
+    """
+    providers = {"openai": openai_client._providers["openai"]}
+    with patch.object(openai_client, "_providers", providers), \
+         patch.object(openai_client, "_breakers", {"openai": openai_client._breakers["openai"]}), \
+         patch.object(openai_client, "_router", openai_client._build_router(providers)):
+        yield
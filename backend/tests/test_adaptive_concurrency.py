@@ -0,0 +1,159 @@
+import os
+import sys
+import asyncio
+import json
+import httpx
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app
+from app.core.config import settings
+from app.core.metrics import LatencyHistogram
+from app.services import openai_client
+from app.services.adaptive_concurrency import AdaptiveConcurrencyLimit
+from test_response_cache import PREFERENCES
+
+BASE_LATENCY = 0.01
+CLIENTS = 64
+
+
+class FakeProvider:
+    """
+    Provider with `capacity` parallel workers sharing their time: a call takes
+    BASE_LATENCY while load is within capacity and grows linearly beyond it.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self.latency = LatencyHistogram(window=200)
+
+    async def complete(self) -> str:
+        self.in_flight += 1
+        try:
+            seconds = BASE_LATENCY * max(1.0, self.in_flight / self.capacity)
+            await asyncio.sleep(seconds)
+            self.latency.record(seconds)
+        finally:
+            self.in_flight -= 1
+        return "{}"
+
+
+async def drive(provider, limiter, n_calls, limits=None):
+    """CLIENTS callers issue n_calls in total; the limit is sampled as they go"""
+    remaining = [n_calls]
+
+    async def client():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            async with limiter.call():
+                await provider.complete()
+            if limits is not None:
+                limits.append(limiter.limit)
+
+    await asyncio.gather(*[client() for _ in range(CLIENTS)])
+
+
+def make_limiter(initial_limit, min_limit=1, max_limit=200):
+    return AdaptiveConcurrencyLimit(
+        "fake-model", initial_limit=initial_limit, min_limit=min_limit, max_limit=max_limit,
+        max_queue=CLIENTS, queue_timeout=30.0,
+    )
+
+
+@pytest.mark.asyncio
+async def test_limit_converges_to_provider_capacity():
+    provider = FakeProvider(capacity=8)
+    limiter = make_limiter(initial_limit=2)
+    await drive(provider, limiter, 1500)
+
+    # the limit grows from 2 and settles around the 8 parallel workers
+    assert 4 <= limiter.limit <= 16
+    assert limiter.increases > 0 and limiter.decreases > 0
+
+
+@pytest.mark.asyncio
+async def test_limit_backs_off_when_provider_degrades():
+    provider = FakeProvider(capacity=16)
+    limiter = make_limiter(initial_limit=16)
+    await drive(provider, limiter, 800)
+    healthy_limit = limiter.limit
+
+    provider.capacity = 2
+    await drive(provider, limiter, 800)
+
+    assert limiter.limit < healthy_limit / 2
+    assert limiter.limit <= 6
+
+
+@pytest.mark.asyncio
+async def test_errors_lower_the_limit():
+    limiter = AdaptiveConcurrencyLimit("fake-model", initial_limit=20, min_limit=2)
+
+    async def failing_call():
+        with pytest.raises(RuntimeError):
+            async with limiter.call():
+                raise RuntimeError("provider overloaded")
+
+    await asyncio.gather(*[failing_call() for _ in range(20)])
+    assert limiter.limit == 15 and limiter.errors == 20
+
+
+@pytest.mark.asyncio
+async def test_shed_calls_return_503_with_retry_after():
+    async def create(**kwargs):
+        await asyncio.sleep(0.2)
+        message = SimpleNamespace(content=json.dumps({"recommendations": []}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    model = openai_client._router.routes(settings.LLM_TASK_TIERS["destinations"])[0].model
+    limiter = AdaptiveConcurrencyLimit(model, initial_limit=1, max_queue=0)
+    headers = {"x-api-key": os.getenv("API_KEY", "testkey")}
+
+    with patch.object(openai_client, "_client", client), \
+         patch.dict(openai_client._model_limits, {model: limiter}), \
+         patch.object(settings, "ADAPTIVE_CONCURRENCY_ENABLED", True), \
+         patch.object(settings, "LLM_COALESCING_ENABLED", False), \
+         patch("app.services.destination_service.destination_cache.get", return_value=None):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*[
+                http.post("/destinations/recommendations", headers=headers, json=PREFERENCES)
+                for _ in range(3)
+            ])
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 503, 503]
+    for response in responses:
+        if response.status_code == 503:
+            assert int(response.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limit_protects_tail_latency_benchmark():
+    static = FakeProvider(capacity=8)
+    await drive(static, make_limiter(CLIENTS, min_limit=CLIENTS, max_limit=CLIENTS), 1500)
+
+    adaptive = FakeProvider(capacity=8)
+    limits = []
+    await drive(adaptive, make_limiter(initial_limit=CLIENTS), 1500, limits)
+
+    print("\n--- Adaptive Concurrency Simulation ---")
+    print(f"{CLIENTS} clients, provider capacity 8, base latency {BASE_LATENCY * 1000:.0f} ms")
+    print(f"Static limit {CLIENTS}: provider p99 {static.latency.percentile(99) * 1000:.0f} ms")
+    print(f"Adaptive limit: provider p99 {adaptive.latency.percentile(99) * 1000:.0f} ms")
+    print(f"Limit every 150 calls: {limits[::150]}")
+
+    # once converged, calls reach the provider at roughly its capacity
+    assert adaptive.latency.percentile(99) < static.latency.percentile(99) / 2
+
+
+if __name__ == "__main__":
+    asyncio.run(test_adaptive_limit_protects_tail_latency_benchmark())
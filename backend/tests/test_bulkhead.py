@@ -0,0 +1,129 @@
+import os
+import sys
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app
+from app.services import openai_client
+from app.services.bulkhead import Bulkhead
+from exceptions import ServiceUnavailableError
+
+API_KEY = os.getenv("API_KEY", "testkey")
+HEADERS = {"x-api-key": API_KEY}
+
+ITINERARY_GENERATE_PAYLOAD = {
+    "questionnaire_id": "1",
+    "selected_activities": [{"id": "act_001", "priority": "high"}],
+    "preferences": {
+        "pace": "moderate",
+        "daily_start_time": "09:00",
+        "daily_end_time": "22:00",
+        "max_activities_per_day": 4
+    }
+}
+
+
+async def hold(bulkhead, release, order, name):
+    async with bulkhead.slot():
+        order.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_order():
+    bulkhead = Bulkhead("test", max_in_flight=2, max_queue=5, queue_timeout=1.0)
+    release = asyncio.Event()
+    order = []
+    tasks = [asyncio.create_task(hold(bulkhead, release, order, i)) for i in range(5)]
+    await asyncio.sleep(0.01)
+
+    assert order == [0, 1]
+    assert bulkhead.stats()["in_flight"] == 2 and bulkhead.stats()["queued"] == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == [0, 1, 2, 3, 4]
+    assert bulkhead.stats()["in_flight"] == 0 and bulkhead.admitted == 5
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_right_away():
+    bulkhead = Bulkhead("test", max_in_flight=1, max_queue=1, queue_timeout=1.0)
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(bulkhead, release, [], i)) for i in range(2)]
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ServiceUnavailableError) as error:
+        async with bulkhead.slot():
+            pass
+    assert error.value.status_code == 503
+    assert int(error.value.headers["Retry-After"]) >= 1
+    assert bulkhead.rejected_queue_full == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_queued_call_times_out():
+    bulkhead = Bulkhead("test", max_in_flight=1, max_queue=5, queue_timeout=0.05)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(bulkhead, release, [], 0))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ServiceUnavailableError):
+        await bulkhead.run(asyncio.sleep)
+    assert bulkhead.rejected_timeout == 1 and bulkhead.stats()["queued"] == 0
+
+    release.set()
+    await holder
+    assert bulkhead.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    bulkhead = Bulkhead("test", max_in_flight=1, max_queue=5, queue_timeout=1.0)
+    release = asyncio.Event()
+    order = []
+    holder = asyncio.create_task(hold(bulkhead, release, order, 0))
+    cancelled = asyncio.create_task(hold(bulkhead, release, order, 1))
+    waiting = asyncio.create_task(hold(bulkhead, release, order, 2))
+    await asyncio.sleep(0.01)
+
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holder, waiting)
+
+    assert order == [0, 2]
+    assert bulkhead.stats()["in_flight"] == 0 and bulkhead.stats()["queued"] == 0
+
+
+def test_bulkheads_are_reported_in_metrics():
+    client = TestClient(app)
+    response = client.get("/metrics", headers=HEADERS)
+
+    assert response.status_code == 200
+    bulkheads = response.json()["bulkheads"]
+    assert set(bulkheads) == set(openai_client._bulkheads)
+    assert bulkheads["itinerary"]["max_in_flight"] == 10
+
+
+@patch("app.services.itinerary_service.ItineraryService.get_itinerary")
+def test_rejected_call_returns_503_with_retry_after(mock_get_itinerary):
+    mock_get_itinerary.side_effect = ServiceUnavailableError(retry_after=7)
+    client = TestClient(app)
+    response = client.post("/itinerary/generate", headers=HEADERS, json=ITINERARY_GENERATE_PAYLOAD)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["errors"] == [
+        {"code": "503", "message": "Service is busy, please retry later"}
+    ]
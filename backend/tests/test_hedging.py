@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import random
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.core.metrics import LatencyHistogram
+from app.services import openai_client
+from app.services.hedging import HedgePolicy
+from app.services.llm_router import Route
+
+FAST = 0.01
+SLOW = 0.2
+
+
+class LongTailProvider:
+    """One call in twenty takes SLOW instead of FAST"""
+
+    def __init__(self, seed=7):
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    async def call(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(SLOW if self.random.random() < 0.05 else FAST)
+        return "ok"
+
+
+async def run_calls(policy, provider, n_calls, concurrency=50):
+    latency = LatencyHistogram(window=n_calls)
+
+    async def one():
+        started = asyncio.get_running_loop().time()
+        if policy is None:
+            await provider.call()
+        else:
+            assert await policy.run(provider.call, provider.call) == "ok"
+        latency.record(asyncio.get_running_loop().time() - started)
+
+    for _ in range(n_calls // concurrency):
+        await asyncio.gather(*[one() for _ in range(concurrency)])
+    return latency
+
+
+@pytest.mark.asyncio
+async def test_no_hedging_until_enough_samples():
+    policy = HedgePolicy("test", min_samples=20, budget_ratio=1.0)
+    provider = LongTailProvider()
+    await run_calls(policy, provider, 10)
+    assert policy.delay() is None and policy.hedges == 0
+
+
+@pytest.mark.asyncio
+async def test_hedges_stay_within_budget():
+    policy = HedgePolicy("test", percentile=50, budget_ratio=0.05, max_burst=2)
+    provider = LongTailProvider()
+    await run_calls(policy, provider, 400)
+
+    # hedging at the median would hedge half the calls without the cap
+    assert policy.hedges <= 0.05 * 400 + 2
+    assert policy.budget_denied > 0
+    assert provider.calls == 400 + policy.hedges
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_waits_for_hedge():
+    policy = HedgePolicy("test", min_samples=0, budget_ratio=1.0)
+    policy.latency.record(0.01)
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("provider error")
+
+    async def hedge():
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    assert await policy.run(failing, hedge) == "hedge"
+    assert policy.hedge_wins == 1
+
+    async def failing_hedge():
+        raise ValueError("hedge error")
+
+    with pytest.raises(RuntimeError):
+        await policy.run(failing, failing_hedge)
+
+
+@pytest.mark.asyncio
+async def test_slow_completion_is_hedged_and_cancelled():
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs["model"])
+        try:
+            await asyncio.sleep(1.0 if len(calls) == 1 else FAST)
+        except asyncio.CancelledError:
+            calls.append("cancelled")
+            raise
+        message = SimpleNamespace(content=json.dumps({"model": kwargs["model"]}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    policy = HedgePolicy("destinations", min_samples=0, budget_ratio=1.0)
+    policy.latency.record(0.05)
+    primary = openai_client._router.routes(settings.LLM_TASK_TIERS["destinations"])[0].model
+    with patch.object(openai_client, "_client", client), \
+         patch.dict(openai_client._hedges, {"destinations": policy}), \
+         patch.object(settings, "LLM_HEDGING_ENABLED", True), \
+         patch.object(settings, "LLM_HEDGE_ROUTE", "openai:secondary-model"):
+        result = await openai_client.get_travel_ideas({"hedge": 1})
+
+    assert json.loads(result.text) == {"model": "secondary-model"}
+    assert calls == [primary, "secondary-model", "cancelled"]
+    assert policy.stats()["win_rate"] == 1.0
+
+
+def test_hedge_route_of_an_unconfigured_provider_is_skipped():
+    tier = settings.LLM_TASK_TIERS["destinations"]
+    route = openai_client._router.routes(tier)[0]
+    with patch.object(settings, "LLM_HEDGE_ROUTE", "anthropic:claude-3-5-haiku-latest"):
+        assert openai_client._hedge_route(tier, route) is None
+    with patch.object(settings, "LLM_HEDGE_ROUTE", "openai:secondary-model"):
+        assert openai_client._hedge_route(tier, route) == Route("openai", "secondary-model")
+
+
+@pytest.mark.asyncio
+async def test_hedging_cuts_p99_benchmark():
+    plain = await run_calls(None, LongTailProvider(), 500)
+    policy = HedgePolicy("test", percentile=90, budget_ratio=0.1)
+    provider = LongTailProvider()
+    hedged = await run_calls(policy, provider, 500)
+
+    print("\n--- Hedged Request Simulation ---")
+    print(f"5% of calls take {SLOW * 1000:.0f} ms instead of {FAST * 1000:.0f} ms")
+    print(f"Without hedging: p50 {plain.percentile(50) * 1000:.0f} ms, p99 {plain.percentile(99) * 1000:.0f} ms")
+    print(f"With hedging:    p50 {hedged.percentile(50) * 1000:.0f} ms, p99 {hedged.percentile(99) * 1000:.0f} ms")
+    print(f"Extra calls: {policy.hedges} ({policy.hedges / 500:.0%}), hedge win rate {policy.stats()['win_rate']:.0%}")
+
+    assert hedged.percentile(99) < plain.percentile(99) / 2
+    assert policy.hedges <= 0.1 * 500 + policy.max_burst
+
+
+if __name__ == "__main__":
+    asyncio.run(test_hedging_cuts_p99_benchmark())
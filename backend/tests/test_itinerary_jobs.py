@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app
+from app.core.config import settings
+from app.db.database import get_db
+from app.db.models import ItineraryJob
+from app.models.custom_exception import CustomException
+from app.models.itinerary_generate_request import ItineraryGenerateRequest
+from app.models.itinerary_generate_response import ItineraryGenerateResponse
+from app.models.itinerary_job_response import ItineraryJobResponse
+from app.services.itinerary_job_service import ItineraryJobService
+from exceptions import ServiceUnavailableError
+
+API_KEY = os.getenv("API_KEY", "testkey")
+HEADERS = {"x-api-key": API_KEY}
+
+ITINERARY_GENERATE_PAYLOAD = {
+    "questionnaire_id": "1",
+    "selected_activities": [{"id": "act_001", "priority": "high"}],
+    "preferences": {
+        "pace": "moderate",
+        "daily_start_time": "09:00",
+        "daily_end_time": "22:00",
+        "max_activities_per_day": 4
+    }
+}
+
+GENERATED_ITINERARY = ItineraryGenerateResponse(**{
+    "itinerary": {"destination": "Test Destination", "total_days": 1, "daily_schedules": []},
+    "summary": {"total_cost": 100, "total_activities": 1, "optimization_score": 0.9}
+})
+
+
+def wait_for_job(client, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/itinerary/jobs/{job_id}", headers=HEADERS).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@patch("app.services.itinerary_service.ItineraryService.get_itinerary")
+def test_async_generate_returns_job(mock_get_itinerary):
+    mock_get_itinerary.return_value = GENERATED_ITINERARY
+    with TestClient(app) as client:
+        response = client.post(
+            "/itinerary/generate?mode=async", headers=HEADERS, json=ITINERARY_GENERATE_PAYLOAD
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.headers["location"] == f"/itinerary/jobs/{job_id}"
+
+        job = wait_for_job(client, job_id)
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["itinerary"]["destination"] == "Test Destination"
+
+
+@patch("app.services.itinerary_service.ItineraryService.get_itinerary")
+def test_failed_job_keeps_user_message(mock_get_itinerary):
+    mock_get_itinerary.side_effect = CustomException("Questionnaire not found")
+    with TestClient(app) as client:
+        response = client.post(
+            "/itinerary/generate?mode=async", headers=HEADERS, json=ITINERARY_GENERATE_PAYLOAD
+        )
+        job = wait_for_job(client, response.json()["job_id"])
+
+    assert job["status"] == "failed"
+    assert job["error"] == "Questionnaire not found"
+
+
+def test_unknown_job_is_404():
+    client = TestClient(app)
+    response = client.get("/itinerary/jobs/does-not-exist", headers=HEADERS)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_are_recovered_on_start():
+    db = next(get_db())
+    db.add(ItineraryJob(
+        id="recovered-job",
+        status="running",  # the previous worker died mid-job
+        request=json.dumps(ITINERARY_GENERATE_PAYLOAD),
+    ))
+    db.commit()
+    db.close()
+
+    jobs = ItineraryJobService(workers=1)
+    with patch(
+        "app.services.itinerary_service.ItineraryService.get_itinerary",
+        new=AsyncMock(return_value=GENERATED_ITINERARY),
+    ):
+        await jobs.start()
+        for _ in range(100):
+            if jobs.get_job("recovered-job").status == "succeeded":
+                break
+            await asyncio.sleep(0.01)
+        await jobs.stop()
+
+    assert jobs.get_job("recovered-job").status == "succeeded"
+    db = next(get_db())
+    db.query(ItineraryJob).filter(ItineraryJob.id == "recovered-job").delete()
+    db.commit()
+    db.close()
+
+
+def add_job(job_id, status, **fields):
+    db = next(get_db())
+    db.add(ItineraryJob(id=job_id, status=status, request=json.dumps(ITINERARY_GENERATE_PAYLOAD), **fields))
+    db.commit()
+    db.close()
+
+
+def delete_jobs(*job_ids):
+    db = next(get_db())
+    db.query(ItineraryJob).filter(ItineraryJob.id.in_(job_ids)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def test_job_is_claimed_by_one_worker():
+    add_job("claimed-job", "queued")
+    first, second = ItineraryJobService(workers=1), ItineraryJobService(workers=1)
+    try:
+        assert first._claim_job("claimed-job") is not None
+        assert second._claim_job("claimed-job") is None
+        # only the owner can finish it
+        assert not second._finish_job("claimed-job", status="succeeded")
+        assert first._finish_job("claimed-job", status="succeeded")
+        assert first.get_job("claimed-job").status == "succeeded"
+    finally:
+        delete_jobs("claimed-job")
+
+
+def test_only_expired_leases_are_recovered():
+    now = datetime.now(timezone.utc)
+    add_job("live-job", "running", owner="other-worker", lease_until=now + timedelta(minutes=5))
+    add_job("dead-job", "running", owner="dead-worker", lease_until=now - timedelta(minutes=5))
+    try:
+        recovered = ItineraryJobService(workers=1)._recover_pending_jobs()
+        assert "dead-job" in recovered and "live-job" not in recovered
+        jobs = ItineraryJobService(workers=1)
+        assert jobs.get_job("live-job").status == "running"
+        assert jobs.get_job("dead-job").status == "queued"
+    finally:
+        delete_jobs("live-job", "dead-job")
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_new_jobs():
+    jobs = ItineraryJobService(workers=1, queue_size=1)
+    jobs._queue = asyncio.Queue(maxsize=1)
+    jobs._queue.put_nowait("waiting-job")
+    with pytest.raises(ServiceUnavailableError) as error:
+        jobs.submit(ItineraryGenerateRequest(**ITINERARY_GENERATE_PAYLOAD))
+    assert error.value.status_code == 503
+    assert int(error.value.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("callback_url", [
+    "http://127.0.0.1:8000/hook",
+    "http://localhost/hook",
+    "http://10.0.0.5/hook",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/hook",
+    "ftp://example.com/hook",
+])
+async def test_webhooks_to_internal_addresses_are_skipped(callback_url):
+    jobs = ItineraryJobService(workers=1)
+    with patch("httpx.AsyncClient.post", new=AsyncMock()) as post:
+        await jobs._notify(callback_url, ItineraryJobResponse(job_id="webhook-job", status="succeeded"))
+    post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_webhook_allowlist():
+    jobs = ItineraryJobService(workers=1)
+    with patch.object(settings, "ITINERARY_JOB_WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com"]):
+        assert await jobs._webhook_target("https://hooks.example.com/done") is not None
+        assert await jobs._webhook_target("https://other.example.com/done") is None
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_sent_to_the_checked_address():
+    jobs = ItineraryJobService(workers=1)
+    resolved = [(2, 1, 6, "", ("93.184.216.34", 443))]
+    with patch("asyncio.BaseEventLoop.getaddrinfo", new=AsyncMock(return_value=resolved)), \
+            patch("httpx.AsyncClient.post", new=AsyncMock()) as post:
+        await jobs._notify("https://hooks.example.com/done", ItineraryJobResponse(job_id="webhook-job", status="succeeded"))
+
+    url = post.call_args.args[0]
+    assert url.host == "93.184.216.34" and url.path == "/done"
+    assert post.call_args.kwargs["headers"]["Host"] == "hooks.example.com"
+    assert post.call_args.kwargs["extensions"]["sni_hostname"] == "hooks.example.com"
+
+
+@pytest.mark.asyncio
+async def test_stop_releases_running_jobs():
+    jobs = ItineraryJobService(workers=1)
+    add_job("interrupted-job", "running", owner=jobs.owner, lease_until=datetime.now(timezone.utc) + timedelta(minutes=5))
+    add_job("other-job", "running", owner="other-worker", lease_until=datetime.now(timezone.utc) + timedelta(minutes=5))
+    try:
+        await jobs.start()
+        await jobs.stop()
+        assert jobs.get_job("interrupted-job").status == "queued"
+        assert jobs.get_job("other-job").status == "running"
+    finally:
+        delete_jobs("interrupted-job", "other-job")
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_swept_while_running():
+    jobs = ItineraryJobService(workers=1, lease_seconds=0.05)
+    with patch(
+        "app.services.itinerary_service.ItineraryService.get_itinerary",
+        new=AsyncMock(return_value=GENERATED_ITINERARY),
+    ):
+        await jobs.start()
+        # another process died holding this job after we started
+        add_job("orphaned-job", "running", owner="dead-worker", lease_until=datetime.now(timezone.utc))
+        try:
+            for _ in range(100):
+                if jobs.get_job("orphaned-job").status == "succeeded":
+                    break
+                await asyncio.sleep(0.01)
+            assert jobs.get_job("orphaned-job").status == "succeeded"
+        finally:
+            await jobs.stop()
+            delete_jobs("orphaned-job")
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.custom_exception import CustomException
+from app.services.itinerary_service import ItineraryService
+
+DAY_LATENCY = 0.1
+
+SELECTED_ACTIVITIES = [
+    {"id": f"act_{i:03d}", "name": f"Activity {i}", "description": "", "category": "cultural",
+     "duration_hours": 2.0, "cost": 20.0, "priority": "high" if i < 3 else "medium"}
+    for i in range(1, 7)
+]
+
+
+def optimization_request(start_date="2024-07-01", end_date="2024-07-14"):
+    return {
+        "questionnaire_id": 1,
+        "destination": {"id": 1, "name": "Barcelona, Spain"},
+        "travel_dates": {"start_date": start_date, "end_date": end_date},
+        "selected_activities": SELECTED_ACTIVITIES,
+        "preferences": {
+            "pace": "moderate", "daily_start_time": "09:00",
+            "daily_end_time": "22:00", "max_activities_per_day": 4,
+        },
+    }
+
+
+async def fake_plan(request):
+    days = [
+        {"day_number": number, "theme": f"Theme {number}", "activity_ids": []}
+        for number in range(1, request["total_days"] + 1)
+    ]
+    days[0]["activity_ids"] = ["act_001", "act_002", "unknown"]
+    return json.dumps({"days": days})
+
+
+async def fake_day(day_request):
+    await asyncio.sleep(DAY_LATENCY)
+    return json.dumps({
+        "date": "1999-01-01",  # overwritten by the plan's calendar
+        "day_number": 0,
+        "theme": day_request["theme"],
+        "activities": [
+            {"start_time": "09:00", "end_time": "11:00",
+             "activity": {"name": activity["name"], "type": "cultural", "notes": ""}}
+            for activity in day_request["assigned_activities"]
+        ],
+        "daily_cost": 20.0 * len(day_request["assigned_activities"]),
+        "walking_distance": "2 km",
+    })
+
+
+@pytest.mark.asyncio
+async def test_days_are_generated_concurrently():
+    service = ItineraryService()
+    with patch("app.services.itinerary_service.get_itinerary_plan", new=fake_plan), \
+         patch("app.services.itinerary_service.get_itinerary_day", new=fake_day):
+        start_time = time.perf_counter()
+        response = await service._generate_days_in_parallel(optimization_request())
+        duration = time.perf_counter() - start_time
+
+    schedules = response.itinerary.daily_schedules
+    print(f"\n14-day itinerary generated in {duration:.3f} sec "
+          f"(serial estimate {14 * DAY_LATENCY:.2f} sec)")
+    assert duration < 14 * DAY_LATENCY / 2
+    assert [schedule.day_number for schedule in schedules] == list(range(1, 15))
+    assert schedules[0].date == "2024-07-01" and schedules[13].date == "2024-07-14"
+    # unassigned activities are spread over the lightest days
+    assert response.summary.total_activities == len(SELECTED_ACTIVITIES)
+    assert response.summary.total_cost == 20.0 * len(SELECTED_ACTIVITIES)
+    assert response.summary.optimization_score == 1.0
+
+
+@pytest.mark.asyncio
+async def test_unusable_plan_falls_back_to_round_robin():
+    async def broken_plan(request):
+        return None
+
+    service = ItineraryService()
+    with patch("app.services.itinerary_service.get_itinerary_plan", new=broken_plan):
+        days = await service._plan_days(optimization_request(end_date="2024-07-03"), 3)
+
+    assert [len(day["activity_ids"]) for day in days] == [2, 2, 2]
+    assert days[0]["theme"] == "Day 1"
+
+
+@pytest.mark.asyncio
+async def test_failed_day_cancels_the_other_days():
+    cancelled = []
+
+    async def failing_day(day_request):
+        if day_request["day_number"] == 1:
+            return None
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(day_request["day_number"])
+            raise
+
+    service = ItineraryService()
+    with patch("app.services.itinerary_service.get_itinerary_plan", new=fake_plan), \
+         patch("app.services.itinerary_service.get_itinerary_day", new=failing_day), \
+         patch("app.services.itinerary_service.settings.ITINERARY_DAY_CONCURRENCY", 14):
+        with pytest.raises(CustomException):
+            await asyncio.wait_for(service._generate_days_in_parallel(optimization_request()), 5)
+
+    assert sorted(cancelled) == list(range(2, 15))
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import pytest
+from datetime import date, timedelta
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.itinerary_generate_request import ItineraryGenerateRequest
+from app.services import prompt_builder
+from app.services.itinerary_service import ItineraryService, salvage_counts
+from app.services.token_budget import itinerary_features
+from test_itinerary_parallel import optimization_request
+
+REQUEST = ItineraryGenerateRequest(
+    questionnaire_id="1",
+    selected_activities=[{"id": "act_001", "priority": "high"}],
+    preferences={"pace": "moderate", "daily_start_time": "09:00",
+                 "daily_end_time": "22:00", "max_activities_per_day": 4},
+)
+# output speed of the itinerary model, for the latency estimates
+SECONDS_TO_FIRST_TOKEN = 0.6
+TOKENS_PER_SECOND = 60
+
+
+def daily_schedule(day_number):
+    activities = ([f"Activity {day_number}"] if day_number <= 6 else []) + [
+        f"Lunch in quarter {day_number}", f"Evening walk {day_number}", f"Tapas bar {day_number}"
+    ]
+    return {
+        "date": (date(2024, 7, 1) + timedelta(days=day_number - 1)).isoformat(),
+        "day_number": day_number,
+        "theme": f"Neighbourhood {day_number}",
+        "activities": [
+            {"start_time": f"{10 + 3 * i}:00", "end_time": f"{12 + 3 * i}:00",
+             "activity": {"name": name, "type": "cultural", "notes": "Book tickets a day ahead"}}
+            for i, name in enumerate(activities)
+        ],
+        "walking_distance": "3.5 km",
+    }
+
+
+def itinerary_document(day_numbers, total_days=14):
+    return json.dumps({
+        "errors": None,
+        "itinerary": {
+            "destination": "Barcelona, Spain",
+            "total_days": total_days,
+            "daily_schedules": [daily_schedule(number) for number in day_numbers],
+        },
+    }, indent=2)
+
+
+def cut_off(document, fraction):
+    return document[: int(len(document) * fraction)]
+
+
+class FakeContinuation:
+    """Answers continuation requests with the asked-for days"""
+
+    def __init__(self, answer=None):
+        self.requests = []
+        self.answer = answer
+
+    async def __call__(self, continuation_request):
+        self.requests.append(continuation_request)
+        if self.answer is not None:
+            return self.answer
+        return itinerary_document(continuation_request["day_numbers"])
+
+
+async def generate(response_text, continuation):
+    with patch.object(ItineraryService, "_build_optimization_request", return_value=optimization_request()), \
+         patch("app.services.itinerary_service.get_optimized_itinerary", return_value=response_text), \
+         patch("app.services.itinerary_service.get_itinerary_continuation", new=continuation):
+        return await ItineraryService().get_itinerary(REQUEST)
+
+
+@pytest.mark.asyncio
+async def test_cut_off_itinerary_is_continued():
+    continuation = FakeContinuation()
+    document = itinerary_document(range(1, 15))
+    truncated = document[: document.index('"day_number": 10')]
+    response = await generate(truncated, continuation)
+
+    schedules = response.itinerary.daily_schedules
+    assert [schedule.day_number for schedule in schedules] == list(range(1, 15))
+    assert schedules[13].date == "2024-07-14"
+    (request,) = continuation.requests
+    assert request["day_numbers"] == [10, 11, 12, 13, 14]
+    assert request["day_dates"] == ["2024-07-10", "2024-07-11", "2024-07-12", "2024-07-13", "2024-07-14"]
+    # activities of the complete days are not asked for again
+    assert request["selected_activities"] == []
+    assert [day["day_number"] for day in request["completed_days"]] == list(range(1, 10))
+    assert response.summary.total_cost == 20.0 * 6
+
+
+@pytest.mark.asyncio
+async def test_repaired_itinerary_with_missing_days_is_continued():
+    continuation = FakeContinuation()
+    response = await generate(itinerary_document(range(1, 4)), continuation)
+
+    assert len(response.itinerary.daily_schedules) == 14
+    assert [a["name"] for a in continuation.requests[0]["selected_activities"]] == [
+        "Activity 4", "Activity 5", "Activity 6"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_short_continuation_is_asked_again():
+    calls = FakeContinuation()
+
+    async def first_days_only(continuation_request):
+        await calls(continuation_request)
+        return itinerary_document(continuation_request["day_numbers"][:2])
+
+    response = await generate(itinerary_document(range(1, 11)), first_days_only)
+
+    assert [request["day_numbers"] for request in calls.requests] == [[11, 12, 13, 14], [13, 14]]
+    assert len(response.itinerary.daily_schedules) == 14
+
+
+@pytest.mark.asyncio
+async def test_failed_continuation_keeps_salvaged_days():
+    incomplete = salvage_counts["incomplete"]
+    document = itinerary_document(range(1, 15))
+    response = await generate(cut_off(document, 0.5), FakeContinuation(answer="null"))
+
+    assert 0 < len(response.itinerary.daily_schedules) < 14
+    assert salvage_counts["incomplete"] == incomplete + 1
+
+
+@pytest.mark.asyncio
+async def test_cut_off_stream_is_continued():
+    document = itinerary_document(range(1, 15))
+
+    async def truncated_stream(optimization_request):
+        yield document[: document.index('"day_number": 12')]
+
+    continuation = FakeContinuation()
+    with patch("app.services.itinerary_service.stream_optimized_itinerary", new=truncated_stream), \
+         patch("app.services.itinerary_service.get_itinerary_continuation", new=continuation):
+        events = [event async for event in ItineraryService()._stream_daily_schedules(optimization_request())]
+
+    days = [data.day_number for event, data in events if event == "day"]
+    assert days == list(range(1, 15))
+    assert [event for event, _ in events[-2:]] == ["summary", "done"]
+    assert events[-2][1]["total_days"] == 14
+    assert continuation.requests[0]["day_numbers"] == [12, 13, 14]
+
+
+def test_continuation_prompt_covers_only_missing_days():
+    request = {
+        **optimization_request(),
+        "day_numbers": [3, 9, 14],
+        "day_dates": ["2024-07-03", "2024-07-09", "2024-07-14"],
+        "completed_days": [{"day_number": 1, "theme": "Old town", "activities": ["Activity 1"]}],
+    }
+    trip = json.loads(prompt_builder.continuation_prompt(request).split("Trip: ", 1)[1])
+    assert trip["days"] == 3 and trip["day_numbers"] == [3, 9, 14]
+    assert trip["day_dates"] == ["2024-07-03", "2024-07-09", "2024-07-14"]
+    assert "dates" not in trip
+    assert trip["done"][0]["activities"] == ["Activity 1"]
+    # the output budget is sized for the missing days, not the span between them
+    assert itinerary_features(request)[0] == 3
+
+
+@pytest.mark.asyncio
+async def test_salvage_benchmark():
+    """Continuing cut-off itineraries vs. regenerating them in full"""
+    full_document = itinerary_document(range(1, 15))
+    full_prompt = prompt_builder.itinerary_prompt(optimization_request())
+    full_tokens = prompt_builder.count_tokens(full_prompt), prompt_builder.count_tokens(full_document)
+
+    def seconds(output_tokens):
+        return SECONDS_TO_FIRST_TOKEN + output_tokens / TOKENS_PER_SECOND
+
+    print("\n--- Truncated Itinerary Benchmark (14 days, extra cost after the cut-off call) ---")
+    print(f"{'cut at':>7} {'kept':>5} {'retry in/out':>14} {'cont. in/out':>14} {'retry s':>8} {'cont. s':>8}")
+    totals = {"retry_tokens": 0, "continue_tokens": 0, "retry_seconds": 0.0, "continue_seconds": 0.0}
+    for fraction in (0.3, 0.5, 0.7, 0.85, 0.95):
+        continuation = FakeContinuation()
+        response = await generate(cut_off(full_document, fraction), continuation)
+        assert len(response.itinerary.daily_schedules) == 14
+
+        (request,) = continuation.requests
+        prompt_tokens = prompt_builder.count_tokens(prompt_builder.continuation_prompt(request))
+        output_tokens = prompt_builder.count_tokens(itinerary_document(request["day_numbers"]))
+        kept = 14 - len(request["day_numbers"])
+        totals["retry_tokens"] += sum(full_tokens)
+        totals["continue_tokens"] += prompt_tokens + output_tokens
+        totals["retry_seconds"] += seconds(full_tokens[1])
+        totals["continue_seconds"] += seconds(output_tokens)
+        print(
+            f"{fraction:>7.0%} {kept:>5} {full_tokens[0]:>6}/{full_tokens[1]:<7} "
+            f"{prompt_tokens:>6}/{output_tokens:<7} {seconds(full_tokens[1]):>8.1f} {seconds(output_tokens):>8.1f}"
+        )
+
+    token_saving = 1 - totals["continue_tokens"] / totals["retry_tokens"]
+    time_saving = 1 - totals["continue_seconds"] / totals["retry_seconds"]
+    print(f"Continuation saves {token_saving:.0%} of the tokens and {time_saving:.0%} of the time of a full retry")
+    assert token_saving > 0.3 and time_saving > 0.3
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(test_salvage_benchmark())
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import pytest
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.itinerary_scheduler import build_schedule
+from app.services.itinerary_service import ItineraryService
+
+CATEGORIES = ["cultural", "food", "outdoor", "nightlife"]
+
+
+def activity(number, priority="medium", duration_hours=2.0, category=None, cost=20.0):
+    return {
+        "id": f"act_{number:03d}",
+        "name": f"Activity {number}",
+        "description": f"Description {number}",
+        "category": category or CATEGORIES[number % len(CATEGORIES)],
+        "duration_hours": duration_hours,
+        "cost": cost,
+        "priority": priority,
+    }
+
+
+def optimization_request(activities, end_date="2024-07-03", pace="moderate", max_per_day=3,
+                         start_time="09:00", end_time="18:00"):
+    return {
+        "questionnaire_id": 1,
+        "destination": {"id": 1, "name": "Barcelona, Spain"},
+        "travel_dates": {"start_date": "2024-07-01", "end_date": end_date},
+        "selected_activities": activities,
+        "preferences": {
+            "pace": pace, "daily_start_time": start_time,
+            "daily_end_time": end_time, "max_activities_per_day": max_per_day,
+        },
+    }
+
+
+def minutes(clock):
+    hours, mins = clock.split(":")
+    return int(hours) * 60 + int(mins)
+
+
+def test_schedule_respects_window_and_daily_limit():
+    activities = [activity(i, duration_hours=1.5 + (i % 3)) for i in range(1, 9)]
+    result = build_schedule(optimization_request(activities))
+
+    assert [day.date for day in result.daily_schedules] == ["2024-07-01", "2024-07-02", "2024-07-03"]
+    for day in result.daily_schedules:
+        assert len(day.activities) <= 3
+        times = [(minutes(item.start_time), minutes(item.end_time)) for item in day.activities]
+        assert all(minutes("09:00") <= start < end <= minutes("18:00") for start, end in times)
+        # no overlaps
+        assert all(times[i][1] <= times[i + 1][0] for i in range(len(times) - 1))
+
+    scheduled = sum(len(day.activities) for day in result.daily_schedules)
+    assert scheduled + len(result.unscheduled) == len(activities)
+
+
+def test_rounded_start_times_stay_within_the_window():
+    # 23 + 15 buffer + 22 fills the hour exactly, but the second start rounds up to 09:40
+    activities = [activity(1, duration_hours=23 / 60), activity(2, duration_hours=22 / 60)]
+    result = build_schedule(optimization_request(
+        activities, end_date="2024-07-01", pace="fast", start_time="09:00", end_time="10:00"
+    ))
+
+    scheduled = result.daily_schedules[0].activities
+    assert len(scheduled) == 1 and len(result.unscheduled) == 1
+    assert minutes(scheduled[0].end_time) - minutes(scheduled[0].start_time) == 23
+
+
+def test_high_priority_wins_when_capacity_is_short():
+    activities = [activity(i, priority="low", duration_hours=3.0) for i in range(1, 5)]
+    activities += [activity(i, priority="high", duration_hours=3.0) for i in range(5, 7)]
+    result = build_schedule(optimization_request(activities, end_date="2024-07-01", max_per_day=2))
+
+    names = {item.activity.name for item in result.daily_schedules[0].activities}
+    assert names == {"Activity 5", "Activity 6"}
+    assert len(result.unscheduled) == 4
+    assert result.coverage == 0.6
+
+
+def test_relaxed_pace_books_less_of_the_day():
+    activities = [activity(i, duration_hours=2.0) for i in range(1, 5)]
+    fast = build_schedule(optimization_request(activities, end_date="2024-07-01", pace="fast", max_per_day=4))
+    relaxed = build_schedule(optimization_request(activities, end_date="2024-07-01", pace="relaxed", max_per_day=4))
+    assert len(fast.daily_schedules[0].activities) > len(relaxed.daily_schedules[0].activities)
+
+
+def test_local_search_spreads_categories_and_load():
+    activities = [activity(i, category="cultural" if i <= 2 else "food") for i in range(1, 5)]
+    result = build_schedule(optimization_request(activities, end_date="2024-07-02"))
+
+    for day in result.daily_schedules:
+        assert sorted(item.activity.type for item in day.activities) == ["cultural", "food"]
+        assert day.daily_cost == 40.0
+
+
+def test_schedule_is_deterministic():
+    activities = [activity(i, priority=["low", "medium", "high"][i % 3], duration_hours=1 + i % 4)
+                  for i in range(1, 13)]
+    request = optimization_request(activities, end_date="2024-07-04", end_time="22:00", max_per_day=4)
+    first = build_schedule(request)
+    second = build_schedule(request)
+    assert [day.model_dump() for day in first.daily_schedules] == \
+        [day.model_dump() for day in second.daily_schedules]
+
+
+def test_scheduler_benchmark():
+    activities = [activity(i, priority=["low", "medium", "high"][i % 3], duration_hours=1 + i % 4)
+                  for i in range(1, 21)]
+    request = optimization_request(activities, end_date="2024-07-21", end_time="22:00", max_per_day=4)
+
+    start_time = time.perf_counter()
+    build_schedule(request)
+    duration = time.perf_counter() - start_time
+
+    print(f"\n21-day schedule for 20 activities built in {duration * 1000:.1f} ms")
+    assert duration < 1.0
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_makes_no_llm_call():
+    service = ItineraryService()
+    activities = [activity(i) for i in range(1, 5)]
+    with patch("app.services.itinerary_service.get_itinerary_annotations") as mock_annotations:
+        response = await service._generate_scheduled(
+            optimization_request(activities, end_date="2024-07-02"), annotate=False
+        )
+
+    mock_annotations.assert_not_called()
+    assert response.itinerary.total_days == 2
+    assert response.summary.total_activities == 4
+    assert response.summary.optimization_score == 1.0
+
+
+@pytest.mark.asyncio
+async def test_scheduled_mode_only_asks_for_themes_and_notes():
+    async def fake_annotations(annotation_request):
+        return json.dumps({"days": [
+            {"day_number": day["day_number"], "theme": f"Theme {day['day_number']}",
+             "notes": {name: f"Tip for {name}" for name in day["activities"]}}
+            for day in annotation_request["days"]
+        ]})
+
+    service = ItineraryService()
+    activities = [activity(i) for i in range(1, 5)]
+    request = optimization_request(activities, end_date="2024-07-02")
+    with patch("app.services.itinerary_service.get_itinerary_annotations", new=fake_annotations):
+        response = await service._generate_scheduled(request, annotate=True)
+
+    local = build_schedule(request).daily_schedules
+    for day, local_day in zip(response.itinerary.daily_schedules, local):
+        assert day.theme == f"Theme {day.day_number}"
+        # slots come from the local scheduler, untouched by the annotations
+        assert [(item.start_time, item.activity.name) for item in day.activities] == \
+            [(item.start_time, item.activity.name) for item in local_day.activities]
+        assert all(item.activity.notes == f"Tip for {item.activity.name}" for item in day.activities)
+
+
+@pytest.mark.asyncio
+async def test_failed_annotations_keep_local_themes():
+    async def broken_annotations(annotation_request):
+        return None
+
+    service = ItineraryService()
+    with patch("app.services.itinerary_service.get_itinerary_annotations", new=broken_annotations):
+        response = await service._generate_scheduled(
+            optimization_request([activity(1)], end_date="2024-07-02"), annotate=True
+        )
+
+    themes = [day.theme for day in response.itinerary.daily_schedules]
+    assert themes == ["Food", "Free day to explore"]
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import app
+from app.models.custom_exception import CustomException
+from app.utils.llm_utils import JsonArrayStreamParser
+
+client = TestClient(app)
+API_KEY = os.getenv("API_KEY", "testkey")
+HEADERS = {"x-api-key": API_KEY}
+
+ITINERARY_GENERATE_PAYLOAD = {
+    "questionnaire_id": "1",
+    "selected_activities": [{"id": "act_001", "priority": "high"}],
+    "preferences": {
+        "pace": "moderate",
+        "daily_start_time": "09:00",
+        "daily_end_time": "22:00",
+        "max_activities_per_day": 4
+    }
+}
+
+
+def daily_schedule(day_number):
+    return {
+        "date": f"2024-07-{14 + day_number}",
+        "day_number": day_number,
+        "theme": "Gothic {Quarter} [walk] \"old\" town",
+        "activities": [{
+            "start_time": "09:00",
+            "end_time": "11:00",
+            "activity": {"name": "Sagrada Familia", "type": "cultural", "notes": "Book ahead"}
+        }],
+        "daily_cost": 40.0,
+        "walking_distance": "3 km"
+    }
+
+
+ITINERARY_DOCUMENT = json.dumps({
+    "errors": None,
+    "itinerary": {
+        "destination": "Barcelona, Spain",
+        "total_days": 3,
+        "daily_schedules": [daily_schedule(1), daily_schedule(2), daily_schedule(3)]
+    },
+    "summary": {"total_cost": 120.0, "total_activities": 3, "optimization_score": 0.9}
+})
+
+
+def chunks_of(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_parser_emits_each_day_when_it_closes():
+    parser = JsonArrayStreamParser("daily_schedules")
+    emitted = []
+    for chunk in chunks_of(ITINERARY_DOCUMENT, 7):
+        emitted.extend(parser.feed(chunk))
+
+    assert [json.loads(day)["day_number"] for day in emitted] == [1, 2, 3]
+    assert json.loads(emitted[0])["theme"] == daily_schedule(1)["theme"]
+    assert parser.done
+
+
+def test_parser_holds_back_unfinished_day():
+    parser = JsonArrayStreamParser("daily_schedules")
+    truncated = ITINERARY_DOCUMENT[: ITINERARY_DOCUMENT.index('"day_number": 3')]
+    emitted = parser.feed(truncated)
+    assert len(emitted) == 2
+    assert not parser.done
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def fake_stream(optimization_request):
+    for chunk in chunks_of(ITINERARY_DOCUMENT, 16):
+        yield chunk
+
+
+@patch("app.services.itinerary_service.stream_optimized_itinerary", new=fake_stream)
+@patch("app.services.itinerary_service.ItineraryService._build_optimization_request")
+def test_stream_endpoint_sends_days_then_summary(mock_build):
+    mock_build.return_value = {}
+    response = client.post("/itinerary/generate/stream", headers=HEADERS, json=ITINERARY_GENERATE_PAYLOAD)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["day", "day", "day", "summary", "done"]
+    assert events[0][1]["day_number"] == 1
+    assert events[3][1]["summary"]["total_activities"] == 3
+
+
+async def truncated_stream(optimization_request):
+    yield ITINERARY_DOCUMENT[: ITINERARY_DOCUMENT.index('"day_number": 2')]
+
+
+@patch("app.services.itinerary_service.stream_optimized_itinerary", new=truncated_stream)
+@patch("app.services.itinerary_service.ItineraryService._build_optimization_request")
+def test_truncated_stream_keeps_sent_days(mock_build):
+    mock_build.return_value = {}
+    response = client.post("/itinerary/generate/stream", headers=HEADERS, json=ITINERARY_GENERATE_PAYLOAD)
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["day", "error"]
+
+
+@pytest.mark.parametrize("error, expected_status", [
+    (CustomException("Questionnaire not found", status_code=404), 404),
+    (CustomException("Trip length must be at least 1 day. Please check your travel dates.", status_code=400), 400),
+    (CustomException("Failed to save activities to database."), 500),
+])
+@patch("app.services.itinerary_service.ItineraryService._build_optimization_request")
+def test_stream_rejects_invalid_request_before_streaming(mock_build, error, expected_status):
+    mock_build.side_effect = error
+    response = client.post("/itinerary/generate/stream", headers=HEADERS, json=ITINERARY_GENERATE_PAYLOAD)
+
+    assert response.status_code == expected_status
+    assert not response.headers["content-type"].startswith("text/event-stream")
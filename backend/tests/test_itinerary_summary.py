@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import pytest
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.itinerary_generate_request import ItineraryGenerateRequest
+from app.models.itinerary_generate_response import DailySchedule
+from app.services.itinerary_service import ItineraryService
+from app.services.itinerary_summary import summarize_schedules
+
+SELECTED_ACTIVITIES = [
+    {"id": "act_001", "name": "Sagrada Familia", "category": "cultural",
+     "duration_hours": 2.0, "cost": 26.0, "priority": "high"},
+    {"id": "act_002", "name": "Park Guell", "category": "outdoor",
+     "duration_hours": 2.0, "cost": 10.0, "priority": "medium"},
+    {"id": "act_003", "name": "Picasso Museum", "category": "cultural",
+     "duration_hours": 1.5, "cost": 12.0, "priority": "low"},
+]
+
+
+def slot(start_time, end_time, name, type="cultural", id=None):
+    return {"start_time": start_time, "end_time": end_time,
+            "activity": {"id": id, "name": name, "type": type, "notes": ""}}
+
+
+def daily_schedule(day_number, activities, daily_cost=999.0):
+    return {
+        "date": f"2024-07-{14 + day_number}",
+        "day_number": day_number,
+        "theme": "Theme",
+        "activities": activities,
+        "daily_cost": daily_cost,  # made up by the model, replaced locally
+        "walking_distance": "3 km",
+    }
+
+
+def test_costs_come_from_stored_activities():
+    schedules = [
+        DailySchedule(**daily_schedule(1, [
+            slot("09:00", "11:00", "Sagrada Familia"),
+            slot("12:00", "13:00", "Lunch at La Boqueria", "dining"),
+        ])),
+        DailySchedule(**daily_schedule(2, [slot("10:00", "12:00", "park guell")])),
+    ]
+    summary = summarize_schedules(schedules, SELECTED_ACTIVITIES)
+
+    # complementary activities have no stored cost; names are matched case-insensitively
+    assert [schedule.daily_cost for schedule in schedules] == [26.0, 10.0]
+    assert summary.total_cost == 36.0
+    assert summary.total_activities == 3
+
+
+def test_activities_are_matched_by_id_before_name(caplog):
+    schedules = [DailySchedule(**daily_schedule(1, [
+        # renamed by the model, still the selected activity
+        slot("09:00", "11:00", "Basilica of the Sagrada Familia", id="act_001"),
+        slot("12:00", "13:00", "Lunch near Park Guell", "dining"),
+        slot("14:00", "15:30", "Picasso Museum"),
+    ]))]
+    with caplog.at_level("INFO", logger="app.services.itinerary_summary"):
+        summary = summarize_schedules(schedules, SELECTED_ACTIVITIES)
+
+    assert schedules[0].daily_cost == 26.0 + 12.0
+    assert summary.optimization_score == round(0.8 * 4 / 6 + 0.2, 2)
+    # the Picasso Museum had no id and was priced by name
+    assert "1 scheduled activities priced by name" in caplog.text
+
+
+def test_score_weights_priority_and_duration_fit():
+    full = [DailySchedule(**daily_schedule(1, [
+        slot("09:00", "11:00", "Sagrada Familia"),
+        slot("11:30", "13:30", "Park Guell"),
+        slot("14:00", "15:30", "Picasso Museum"),
+    ]))]
+    assert summarize_schedules(full, SELECTED_ACTIVITIES).optimization_score == 1.0
+
+    # the low priority activity is missing: coverage 5/6
+    partial = [DailySchedule(**daily_schedule(1, [
+        slot("09:00", "11:00", "Sagrada Familia"),
+        slot("11:30", "13:30", "Park Guell"),
+    ]))]
+    assert summarize_schedules(partial, SELECTED_ACTIVITIES).optimization_score == 0.87
+
+    # everything scheduled, but in half the expected time
+    rushed = [DailySchedule(**daily_schedule(1, [
+        slot("09:00", "10:00", "Sagrada Familia"),
+        slot("10:00", "11:00", "Park Guell"),
+        slot("11:00", "11:45", "Picasso Museum"),
+    ]))]
+    assert summarize_schedules(rushed, SELECTED_ACTIVITIES).optimization_score == 0.9
+
+
+@pytest.mark.asyncio
+async def test_single_mode_no_longer_needs_generated_summary():
+    response_text = json.dumps({
+        "errors": None,
+        "itinerary": {
+            "destination": "Barcelona, Spain",
+            "total_days": 1,
+            "daily_schedules": [{
+                "date": "2024-07-15", "day_number": 1, "theme": "Gaudi",
+                "activities": [slot("09:00", "11:00", "Sagrada Familia"),
+                               slot("11:30", "13:30", "Park Guell")],
+                "walking_distance": "3 km",
+            }],
+        },
+    })
+    request = ItineraryGenerateRequest(
+        questionnaire_id="1",
+        selected_activities=[{"id": "act_001", "priority": "high"}],
+        preferences={"pace": "moderate", "daily_start_time": "09:00",
+                     "daily_end_time": "22:00", "max_activities_per_day": 4},
+    )
+
+    service = ItineraryService()
+    with patch.object(ItineraryService, "_build_optimization_request",
+                      return_value={"selected_activities": SELECTED_ACTIVITIES}), \
+         patch("app.services.itinerary_service.get_optimized_itinerary", return_value=response_text):
+        response = await service.get_itinerary(request)
+
+    assert response.itinerary.daily_schedules[0].daily_cost == 36.0
+    assert response.summary.total_cost == 36.0
+    assert response.summary.total_activities == 2
+
+
+def test_summary_benchmark():
+    activities = [
+        {"id": f"act_{i:03d}", "name": f"Activity {i}", "duration_hours": 2.0,
+         "cost": 10.0, "priority": "medium"}
+        for i in range(30)
+    ]
+    schedules = [
+        DailySchedule(**daily_schedule(day, [
+            slot("09:00", "11:00", f"Activity {(day * 4 + i) % 30}") for i in range(4)
+        ]))
+        for day in range(1, 22)
+    ]
+
+    start_time = time.perf_counter()
+    for _ in range(100):
+        summarize_schedules(schedules, activities)
+    duration = (time.perf_counter() - start_time) / 100
+
+    print(f"\nSummary for a 21-day itinerary computed in {duration * 1000:.3f} ms")
+    assert duration < 0.05
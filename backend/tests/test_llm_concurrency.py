@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import openai_client
+
+FAKE_LATENCY = 0.2
+CONCURRENT_REQUESTS = 30
+
+
+class FakeCompletions:
+    """Stand-in for AsyncOpenAI.chat.completions that sleeps like a slow provider"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        message = SimpleNamespace(content='{"recommendations": []}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+
+def fake_client(latency: float = FAKE_LATENCY):
+    completions = FakeCompletions(latency)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+async def run_concurrent(n_requests: int) -> float:
+    start_time = time.perf_counter()
+    results = await asyncio.gather(
+        *[openai_client.get_travel_ideas({"request": i}) for i in range(n_requests)]
+    )
+    assert all(result is not None for result in results)
+    return time.perf_counter() - start_time
+
+
+def test_llm_calls_overlap():
+    client, completions = fake_client()
+    with patch.object(openai_client, "_client", client):
+        duration = asyncio.run(run_concurrent(CONCURRENT_REQUESTS))
+
+    print("\n--- LLM Concurrency Benchmark ---")
+    print(f"Requests: {CONCURRENT_REQUESTS}, provider latency: {FAKE_LATENCY:.2f} sec")
+    print(f"Serial estimate: {CONCURRENT_REQUESTS * FAKE_LATENCY:.2f} sec")
+    print(f"Concurrent: {duration:.4f} sec, max in flight: {completions.max_in_flight}")
+
+    # calls overlap up to the bulkhead limit, so the wall clock stays close to a single call
+    bulkhead_limit = openai_client._bulkheads["destinations"].max_in_flight
+    assert completions.max_in_flight == min(CONCURRENT_REQUESTS, bulkhead_limit)
+    assert duration < FAKE_LATENCY * 3
+
+
+@pytest.mark.asyncio
+async def test_event_loop_free_during_llm_call():
+    client, completions = fake_client(latency=0.5)
+    with patch.object(openai_client, "_client", client):
+        pending = asyncio.create_task(openai_client.get_travel_ideas({}))
+        await asyncio.sleep(0)
+
+        # other coroutines keep running while the LLM call is in flight
+        start_time = time.perf_counter()
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - start_time < 0.1
+        assert completions.in_flight == 1
+
+        assert await pending is not None
+
+
+def test_identical_requests_are_coalesced():
+    client, completions = fake_client()
+    flight = openai_client._single_flights["destinations"]
+    collapsed_before = flight.collapsed
+
+    async def burst():
+        return await asyncio.gather(
+            *[openai_client.get_travel_ideas({"budget": "500-2000"}) for _ in range(20)],
+            openai_client.get_travel_ideas({"budget": "2000-3499"}),
+        )
+
+    with patch.object(openai_client, "_client", client):
+        results = asyncio.run(burst())
+
+    assert completions.calls == 2
+    assert len({result.text for result in results}) == 1
+    assert flight.collapsed - collapsed_before == 19
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_call_survives_leader_cancellation():
+    from app.services.single_flight import SingleFlight
+
+    flight = SingleFlight("test")
+
+    async def slow_call():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", slow_call))
+    follower = asyncio.create_task(flight.do("key", slow_call))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"
+    assert flight.stats() == {
+        "executed": 1, "collapsed": 1, "in_flight": 0, "collapse_ratio": 0.5
+    }
+
+
+def test_shared_client_lifecycle():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # the pooled client lives exactly as long as the app
+    with TestClient(app):
+        client = openai_client._client
+        assert client is not None
+        assert openai_client.get_openai_client() is client
+    assert openai_client._client is None
+
+
+if __name__ == "__main__":
+    test_llm_calls_overlap()
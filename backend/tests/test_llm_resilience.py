@@ -0,0 +1,198 @@
+import os
+import sys
+import time
+import httpx
+import openai
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.custom_exception import CustomException
+from app.models.destination_request import DestinationRequest
+from app.models.itinerary_generate_request import ItineraryGenerateRequest
+from app.services import destination_service, openai_client
+from app.services.destination_service import DestinationService
+from app.services.itinerary_service import ItineraryService
+from app.services.llm_resilience import CircuitBreaker, RetryPolicy
+from app.services.response_cache import InMemoryResponseCache
+from exceptions import CircuitOpenError
+from test_response_cache import PREFERENCES
+from test_itinerary_parallel import optimization_request
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def connection_error():
+    return openai.APIConnectionError(request=REQUEST)
+
+
+def bad_request():
+    return openai.BadRequestError(
+        "bad request", response=httpx.Response(400, request=REQUEST), body=None
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyCompletions:
+    """Fails with the given errors first, then answers"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        message = SimpleNamespace(content='{"recommendations": []}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+
+def patched_client(completions, breaker, retry_policy):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return (
+        patch.object(openai_client, "_client", client),
+        patch.dict(openai_client._breakers, {"openai": breaker}),
+        patch.object(openai_client, "_retry_policy", retry_policy),
+    )
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    completions = FlakyCompletions(connection_error(), connection_error())
+    breaker = CircuitBreaker("test", failure_threshold=5)
+    retry_policy = RetryPolicy(attempts=2, base_delay=0)
+    client, breaker_patch, retry_patch = patched_client(completions, breaker, retry_policy)
+    with client, breaker_patch, retry_patch:
+        result = await openai_client.get_travel_ideas({"retry": 1})
+
+    assert result.text == '{"recommendations": []}'
+    assert completions.calls == 3 and retry_policy.retries == 2
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_bad_requests_are_not_retried():
+    completions = FlakyCompletions(bad_request())
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    retry_policy = RetryPolicy(attempts=2, base_delay=0)
+    client, breaker_patch, retry_patch = patched_client(completions, breaker, retry_policy)
+    with client, breaker_patch, retry_patch:
+        assert await openai_client.get_travel_ideas({"retry": 2}) is None
+
+    assert completions.calls == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    completions = FlakyCompletions(*[connection_error() for _ in range(3)])
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    retry_policy = RetryPolicy(attempts=2, base_delay=0)
+    client, breaker_patch, retry_patch = patched_client(completions, breaker, retry_policy)
+    with client, breaker_patch, retry_patch:
+        assert await openai_client.get_travel_ideas({"retry": 3}) is None
+        assert breaker.state == CircuitBreaker.OPEN
+
+        start_time = time.perf_counter()
+        with pytest.raises(CircuitOpenError) as error:
+            await openai_client.get_travel_ideas({"retry": 4})
+        assert time.perf_counter() - start_time < 0.05
+
+    assert completions.calls == 3
+    assert error.value.status_code == 503
+    assert 1 <= int(error.value.headers["Retry-After"]) <= 30
+
+
+def test_half_open_circuit_lets_one_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.admit()
+
+    clock.now += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.admit()
+    with pytest.raises(CircuitOpenError):
+        breaker.admit()  # only one trial at a time
+
+    # a failed trial reopens the circuit for another reset_timeout
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 10
+    breaker.admit()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["opened"] == 2
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    retry_policy = RetryPolicy(attempts=5, base_delay=0.5, max_delay=2.0)
+    delays = [retry_policy.delay(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= delay <= 2.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+async def test_recommendations_fall_back_while_circuit_is_open():
+    request = DestinationRequest(**PREFERENCES)
+    cache = InMemoryResponseCache("destinations", ttl_seconds=60, max_entries=10)
+    with patch.object(destination_service, "destination_cache", cache), patch(
+        "app.services.destination_service.get_travel_ideas",
+        new=AsyncMock(side_effect=CircuitOpenError(retry_after=30)),
+    ):
+        response = await DestinationService().get_recommendations(request)
+
+    assert [recommendation.id for recommendation in response.recommendations] == [
+        "dest_001", "dest_002", "dest_003"
+    ]
+    # clients can tell the fallback from personal recommendations
+    assert [error.code for error in response.errors] == ["503"]
+    # fallback picks must not shadow real answers once the provider is back
+    assert cache.size() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_recommendations_are_not_replaced_by_the_fallback():
+    request = DestinationRequest(**PREFERENCES)
+    cache = InMemoryResponseCache("destinations", ttl_seconds=60, max_entries=10)
+    with patch.object(destination_service, "destination_cache", cache), patch(
+        "app.services.destination_service.get_travel_ideas",
+        new=AsyncMock(return_value=None),
+    ):
+        with pytest.raises(CustomException):
+            await DestinationService().get_recommendations(request)
+
+
+@pytest.mark.asyncio
+async def test_itinerary_falls_back_to_local_schedule():
+    request = ItineraryGenerateRequest(
+        questionnaire_id="1",
+        selected_activities=[{"id": "act_001", "priority": "high"}],
+        preferences=optimization_request()["preferences"],
+    )
+    with patch.object(
+        ItineraryService, "_build_optimization_request",
+        return_value=optimization_request("2024-07-01", "2024-07-03"),
+    ), patch(
+        "app.services.itinerary_service.get_optimized_itinerary",
+        new=AsyncMock(side_effect=CircuitOpenError(retry_after=30)),
+    ):
+        response = await ItineraryService().get_itinerary(request)
+
+    assert response.itinerary.total_days == 3
+    assert response.summary.total_activities == 6
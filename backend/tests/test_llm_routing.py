@@ -0,0 +1,133 @@
+import os
+import sys
+import random
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import openai_client
+from app.services.llm_providers import AnthropicProvider, Completion, LLMProvider
+from app.services.llm_resilience import CircuitBreaker
+from app.services.llm_router import ProviderRouter, Route, build_routes, parse_route
+
+FAST = Route("fast", "model-a")
+SLOW = Route("slow", "model-b")
+
+
+def router(min_share=0.05):
+    return ProviderRouter({"small": [FAST, SLOW]}, [FAST], min_share=min_share, rng=random.Random(1))
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name, latency):
+        self.name = name
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, model, messages, max_tokens, temperature, timeout=None, response_format=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return Completion('{"recommendations": []}')
+
+
+def test_parse_route():
+    assert parse_route("anthropic:claude-3-5-haiku-latest") == Route("anthropic", "claude-3-5-haiku-latest")
+    assert str(parse_route("openai:gpt-3.5-turbo")) == "openai:gpt-3.5-turbo"
+    with pytest.raises(ValueError):
+        parse_route("gpt-3.5-turbo")
+
+
+def test_unconfigured_providers_are_dropped():
+    routes = build_routes({"activities": ["openai:gpt-3.5-turbo", "anthropic:claude-3-5-haiku-latest"]}, ["openai"])
+    assert routes == {"activities": [Route("openai", "gpt-3.5-turbo")]}
+
+
+def test_weights_follow_latency_and_errors():
+    llm_router = router()
+    # unmeasured routes are tried like the best one
+    assert llm_router.weights("small", [FAST, SLOW]) == [0.5, 0.5]
+
+    for _ in range(10):
+        llm_router.record("small", FAST, 0.5, error=False)
+        llm_router.record("small", SLOW, 2.0, error=False)
+    fast, slow = llm_router.weights("small", [FAST, SLOW])
+    assert fast == pytest.approx(0.8)
+
+    for _ in range(10):
+        llm_router.record("small", FAST, 0.5, error=True)
+    fast, slow = llm_router.weights("small", [FAST, SLOW])
+    assert slow > 0.9 and fast >= 0.05 / 1.05
+
+
+def test_unavailable_routes_are_skipped():
+    llm_router = router()
+    for _ in range(20):
+        assert llm_router.choose("small", available=lambda route: route != FAST) == SLOW
+        assert llm_router.choose("small", exclude=SLOW) == FAST
+    # an unknown tier uses the default routes
+    assert llm_router.choose("large") == FAST
+
+
+@pytest.mark.asyncio
+async def test_anthropic_messages_are_converted():
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text='{"ok": true}')],
+            usage=SimpleNamespace(output_tokens=5),
+            stop_reason="end_turn",
+        )
+
+    provider = AnthropicProvider("key", lambda: None)
+    provider._client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    messages = [
+        {"role": "system", "content": "You are a travel expert."},
+        {"role": "user", "content": "Plan a trip"},
+    ]
+    completion = await provider.complete("claude-3-5-haiku-latest", messages, 100, 0.7)
+    assert completion == Completion('{"ok": true}', output_tokens=5, truncated=False)
+    assert requests[0]["system"] == "You are a travel expert."
+    assert requests[0]["messages"] == [{"role": "user", "content": "Plan a trip"}]
+    assert requests[0]["max_tokens"] == 100
+
+
+@pytest.mark.asyncio
+async def test_traffic_moves_to_faster_provider():
+    providers = {"fast": FakeProvider("fast", 0.01), "slow": FakeProvider("slow", 0.1)}
+    breakers = {name: CircuitBreaker(name) for name in providers}
+    llm_router = router()
+    with patch.dict(openai_client._providers, providers), \
+         patch.dict(openai_client._breakers, breakers), \
+         patch.object(openai_client, "_router", llm_router):
+        for i in range(100):
+            await openai_client.get_travel_ideas({"routing": i})
+
+    print(f"\nCalls per provider: fast {providers['fast'].calls}, slow {providers['slow'].calls}")
+    print(f"Routing stats: {llm_router.stats()['small']}")
+    assert providers["slow"].calls < 25
+    assert providers["fast"].calls + providers["slow"].calls == 100
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_routes_around_provider():
+    providers = {"fast": FakeProvider("fast", 0.0), "slow": FakeProvider("slow", 0.0)}
+    breakers = {name: CircuitBreaker(name, failure_threshold=1) for name in providers}
+    breakers["fast"].record_failure()
+    with patch.dict(openai_client._providers, providers), \
+         patch.dict(openai_client._breakers, breakers), \
+         patch.object(openai_client, "_router", router()):
+        for i in range(10):
+            await openai_client.get_travel_ideas({"circuit": i})
+    assert providers["fast"].calls == 0 and providers["slow"].calls == 10
+
+
+if __name__ == "__main__":
+    asyncio.run(test_traffic_moves_to_faster_provider())
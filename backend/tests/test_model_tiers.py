@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.services import openai_client
+
+ACTIVITY = {
+    "id": "act_001",
+    "name": "Sagrada Familia Tour",
+    "category": "culture",
+    "duration_hours": 2,
+    "cost": 35.0,
+    "priority": "high",
+    "description": "Guided tour",
+}
+
+
+class ModelCompletions:
+    """Answers by model, recording the requests it was sent"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content=self.answers[kwargs["model"]])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+
+def tier_model(tier):
+    return openai_client._router.routes(tier)[0].model
+
+
+def patched_client(completions):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return patch.object(openai_client, "_client", client)
+
+
+def test_tasks_use_configured_tiers():
+    assert openai_client._task_tier("activities") == "small"
+    assert openai_client._task_tier("itinerary") == "large"
+    assert openai_client._task_tier("unknown") == settings.LLM_DEFAULT_TIER
+    assert tier_model("small") != tier_model("large")
+
+
+@pytest.mark.asyncio
+async def test_valid_output_stays_on_small_tier():
+    valid = json.dumps({"suggested_activities": [ACTIVITY]})
+    completions = ModelCompletions({tier_model("small"): valid})
+    with patched_client(completions), \
+         patch.dict(settings.LLM_TASK_TEMPERATURES, {"activities": 0.2}), \
+         patch.dict(settings.LLM_TASK_MAX_TOKENS, {"activities": 1200}):
+        result = await openai_client.get_itinerary_activity({"tiers": "valid"})
+
+    assert result.text == valid and not result.repaired
+    assert [request["model"] for request in completions.requests] == [tier_model("small")]
+    assert completions.requests[0]["temperature"] == 0.2
+    assert completions.requests[0]["max_tokens"] == 1200
+
+
+@pytest.mark.asyncio
+async def test_invalid_output_escalates_to_large_tier():
+    valid = json.dumps({"suggested_activities": [ACTIVITY]})
+    completions = ModelCompletions({
+        tier_model("small"): json.dumps({"suggested_activities": [{"name": "No fields"}]}),
+        tier_model("large"): valid,
+    })
+    escalations = openai_client._tier_counts.get("small", {}).get("escalations", 0)
+    with patched_client(completions):
+        result = await openai_client.get_itinerary_activity({"tiers": "invalid"})
+
+    assert result.text == valid
+    assert [request["model"] for request in completions.requests] == [tier_model("small"), tier_model("large")]
+    assert openai_client._tier_counts["small"]["escalations"] == escalations + 1
+
+    tiers = openai_client._tier_latency
+    assert tiers["small"].count > 0 and tiers["large"].count > 0
+
+
+@pytest.mark.asyncio
+async def test_no_escalation_without_escalation_tier():
+    completions = ModelCompletions({tier_model("small"): "not json"})
+    with patched_client(completions), patch.dict(settings.LLM_ESCALATION_TIERS, clear=True):
+        result = await openai_client.get_itinerary_activity({"tiers": "unescalated"})
+
+    # the malformed answer is not passed on to be cached
+    assert result is None
+    assert len(completions.requests) == 1
@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import random
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.itinerary_questionnaire_response import ItineraryQuestionnaireResponse
+from app.services import openai_client
+from app.services.llm_providers import AnthropicProvider, Completion, OpenAIProvider
+from app.utils.llm_utils import coerce_numbers, repair_json
+from test_model_tiers import ACTIVITY, ModelCompletions, patched_client, tier_model
+
+
+def activities_text(count=3):
+    return json.dumps({"suggested_activities": [dict(ACTIVITY, id=f"act_{i:03}") for i in range(count)]})
+
+
+def test_repair_strips_fences_and_prose():
+    text = '{"a": [1, 2]}'
+    assert repair_json(f"```json\n{text}\n```") == [text]
+    assert repair_json(f"Here is your plan:\n{text}\nEnjoy!") == [text]
+    assert repair_json('{"a": [1, 2,],}') == [text]
+
+
+def test_repair_closes_truncated_output():
+    truncated = '{"days": [{"day": 1, "theme": "Old town"}, {"day": 2, "theme": "Bea'
+    assert [json.loads(c) for c in repair_json(truncated)] == [{"days": [{"day": 1, "theme": "Old town"}]}]
+    assert [json.loads(c) for c in repair_json('{"days": [')] == [{"days": []}]
+    # brackets inside strings are not structure
+    assert json.loads(repair_json('{"note": "a [b] {c", "days": [1, 2')[0]) == {"note": "a [b] {c", "days": [1]}
+
+
+def test_repair_falls_back_to_outer_arrays():
+    truncated = '{"days": [{"day": 1, "stops": ["a"]}, {"day": 2, "stops": ["b", "c'
+    candidates = [json.loads(c) for c in repair_json(truncated)]
+    assert candidates == [
+        {"days": [{"day": 1, "stops": ["a"]}, {"day": 2, "stops": ["b"]}]},
+        {"days": [{"day": 1, "stops": ["a"]}]},
+    ]
+
+
+def test_coerce_numbers_follows_the_model():
+    data = {"suggested_activities": [dict(ACTIVITY, cost="€1,200.50", duration_hours="2 hours", name="42nd Street")]}
+    activity = coerce_numbers(data, ItineraryQuestionnaireResponse)["suggested_activities"][0]
+    assert activity["cost"] == 1200.5 and activity["duration_hours"] == 2
+    # only fields typed as numbers are touched
+    assert activity["name"] == "42nd Street"
+
+
+def test_response_format_from_models():
+    day = openai_client._response_format("itinerary_day")
+    assert day["type"] == "json_schema"
+    assert "daily_cost" not in day["json_schema"]["schema"]["properties"]
+    itinerary = openai_client._response_format("itinerary")["json_schema"]["schema"]
+    assert "summary" not in itinerary["properties"] and "ItinerarySummary" not in itinerary["$defs"]
+    # local fields of nested models are left out too
+    assert "daily_cost" not in itinerary["$defs"]["DailySchedule"]["properties"]
+    assert "ScheduledActivity" in itinerary["$defs"]
+    assert openai_client._response_format("itinerary_plan") == {"type": "json_object"}
+    with patch.object(openai_client.settings, "LLM_OUTPUT_FORMAT", "text"):
+        assert openai_client._response_format("destinations") is None
+
+
+@pytest.mark.asyncio
+async def test_repairable_output_is_not_asked_again():
+    broken = activities_text().replace('"cost": 35.0', '"cost": "$35"')
+    completions = ModelCompletions({tier_model("small"): f"```json\n{broken}\n```"})
+    with patched_client(completions):
+        result = await openai_client.get_itinerary_activity({"repair": "fenced"})
+
+    assert [request["model"] for request in completions.requests] == [tier_model("small")]
+    assert completions.requests[0]["response_format"]["json_schema"]["name"] == "activities"
+    assert json.loads(result.text) == json.loads(activities_text())
+    assert result.repaired
+    assert openai_client._output_checks["activities"]["repaired"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_unrepairable_output_still_escalates():
+    completions = ModelCompletions({
+        tier_model("small"): "Sorry, I cannot help with that.",
+        tier_model("large"): activities_text(),
+    })
+    with patched_client(completions):
+        result = await openai_client.get_itinerary_activity({"repair": "prose"})
+
+    assert [request["model"] for request in completions.requests] == [tier_model("small"), tier_model("large")]
+    assert result.text == activities_text()
+
+
+@pytest.mark.asyncio
+async def test_output_failing_both_tiers_is_not_returned():
+    completions = ModelCompletions({
+        tier_model("small"): "Sorry, I cannot help with that.",
+        tier_model("large"): "Still cannot help.",
+    })
+    with patched_client(completions):
+        result = await openai_client.get_itinerary_activity({"repair": "refused twice"})
+
+    assert len(completions.requests) == 2
+    assert result is None
+
+
+def test_json_schema_only_for_structured_output_models():
+    provider = OpenAIProvider(lambda: None, ["gpt-4o"])
+    schema = openai_client._response_format("activities")
+    request = provider._request("gpt-4o-mini", [], 100, 0.7, None, schema)
+    assert request["response_format"] == schema
+    request = provider._request("gpt-3.5-turbo", [], 100, 0.7, None, schema)
+    assert request["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.asyncio
+async def test_anthropic_json_output_is_prefilled():
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        block = SimpleNamespace(type="text", text='"a": 1}')
+        return SimpleNamespace(content=[block], usage=SimpleNamespace(output_tokens=5), stop_reason="end_turn")
+
+    provider = AnthropicProvider("key", lambda: None)
+    provider._client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    messages = [{"role": "system", "content": "Answer in JSON"}, {"role": "user", "content": "Go"}]
+    completion = await provider.complete("claude", messages, 100, 0.7, response_format={"type": "json_object"})
+
+    assert completion.text == '{"a": 1}'
+    assert requests[0]["messages"][-1] == {"role": "assistant", "content": "{"}
+    # the caller's messages are left as they were
+    assert len(messages) == 2
+
+
+def defective_outputs(n, seed=5):
+    """Model outputs with the defect mix seen from free-form text answers"""
+    rng = random.Random(seed)
+    valid = activities_text(5)
+    defects = {
+        "fenced": lambda text: f"```json\n{text}\n```",
+        "prose": lambda text: f"Here are some ideas:\n{text}\nHave fun!",
+        "numeric_strings": lambda text: text.replace('"cost": 35.0', '"cost": "35 EUR"'),
+        "trailing_comma": lambda text: text[:-2] + ",]}",
+        "truncated": lambda text: text[: rng.randint(len(text) // 2, len(text) - 10)],
+        "refusal": lambda text: "I'm sorry, I can't do that.",
+    }
+    weights = {"valid": 0.7, "fenced": 0.08, "prose": 0.05, "numeric_strings": 0.06,
+               "trailing_comma": 0.03, "truncated": 0.05, "refusal": 0.03}
+    kinds = rng.choices(list(weights), weights=list(weights.values()), k=n)
+    return [(kind, valid if kind == "valid" else defects[kind](valid)) for kind in kinds]
+
+
+def test_local_repair_benchmark():
+    # one small-tier call, plus a large-tier call for every output that is asked again
+    small_seconds, large_seconds = 1.5, 4.0
+    outputs = defective_outputs(1000)
+
+    def is_valid(text):
+        try:
+            openai_client._validators["activities"](text)
+            return True
+        except Exception:
+            return False
+
+    before_recalls = sum(not is_valid(text) for _, text in outputs)
+    started = time.perf_counter()
+    checked = [openai_client._checked("activities", Completion(text)) for _, text in outputs]
+    repair_ms = (time.perf_counter() - started) / len(outputs) * 1000
+    after_recalls = sum(result is None for result in checked)
+
+    def avg_seconds(recalls):
+        return small_seconds + large_seconds * recalls / len(outputs)
+
+    print("\n--- Output Repair Benchmark (1000 activity answers, 30% malformed) ---")
+    print(f"Asked again without repair: {before_recalls / len(outputs):.1%}, avg {avg_seconds(before_recalls):.2f}s")
+    print(f"Asked again with repair:    {after_recalls / len(outputs):.1%}, avg {avg_seconds(after_recalls):.2f}s")
+    print(f"Validation plus repair: {repair_ms:.3f} ms per answer")
+    by_kind = {}
+    for (kind, _), result in zip(outputs, checked):
+        by_kind.setdefault(kind, [0, 0])[result is None] += 1
+    for kind, (used, failed) in sorted(by_kind.items()):
+        print(f"  {kind:<16} usable {used:>4}  asked again {failed:>4}")
+
+    assert after_recalls < before_recalls / 3
+    assert by_kind["refusal"][0] == 0
+
+
+if __name__ == "__main__":
+    test_local_repair_benchmark()
@@ -0,0 +1,102 @@
+import os
+import sys
+import copy
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.preference_normalizer import (
+    POLICIES,
+    normalize_destination_preferences,
+    normalize_questionnaire_request,
+    simulate_hit_ratio,
+)
+
+PREFERENCES = {
+    "traveler_info": {"age_group": "25-34"},
+    "budget": {"min": 600, "max": 1900, "currency": "usd"},
+    "travel_dates": {"start_date": "2024-07-15", "end_date": "2024-07-21"},
+    "group_size": 2,
+    "group_relationship": "Couple",
+    "preferred_location": "None (Open to suggestions)",
+    "interests": ["food_and_drink", "cultural_experiences", "food_and_drink"],
+    "travel_style": "balanced",
+    "must_haves": ["Walkable city", "good food scene"],
+    "deal_breakers": ["extreme weather"],
+}
+
+QUESTIONNAIRE = {
+    "selected_destination": {"id": "dest_001", "name": "Barcelona, Spain"},
+    "travel_dates": {"start_date": "2024-07-15", "end_date": "2024-07-22"},
+    "activity_preferences": {
+        "pace": "moderate",
+        "daily_start_time": "09:00",
+        "daily_end_time": "22:00",
+        "max_activities_per_day": 4,
+        "priority_interests": ["architecture", "food_experiences"],
+        "must_see_attractions": ["Sagrada Familia", "Park Güell"],
+        "activity_types": {
+            "cultural": "high", "outdoor": "medium", "food": "high", "nightlife": "low", "shopping": "low"
+        },
+        "meal_preferences": {"breakfast": "hotel", "lunch": "local_restaurant", "dinner": "local_restaurant"},
+        "transportation": "walking_and_public",
+        "accommodation_area": "city_center",
+    },
+}
+
+
+def test_destination_payload_is_canonical():
+    normalized = normalize_destination_preferences(PREFERENCES)
+    payload = normalized.prompt_payload
+    assert payload["interests"] == ["cultural_experiences", "food_and_drink"]
+    assert payload["must_haves"] == ["good food scene", "walkable city"]
+    assert payload["budget"] == {"min": 500, "max": 2000, "currency": "USD"}
+    assert payload["travel_dates"] == {"season": "summer", "trip_days": "5-7"}
+    assert payload["group_relationship"] == "couple"
+
+
+def test_equivalent_preferences_share_a_key():
+    variant = copy.deepcopy(PREFERENCES)
+    variant["interests"] = ["cultural_experiences", "food_and_drink"]
+    variant["budget"] = {"min": 700, "max": 1800, "currency": "USD"}
+    variant["travel_dates"] = {"start_date": "2024-08-01", "end_date": "2024-08-06"}
+    variant["must_haves"] = ["good food scene", "walkable  city"]
+
+    assert (
+        normalize_destination_preferences(PREFERENCES).cache_key
+        == normalize_destination_preferences(variant).cache_key
+    )
+    assert (
+        normalize_destination_preferences(PREFERENCES, POLICIES["exact"]).cache_key
+        != normalize_destination_preferences(variant, POLICIES["exact"]).cache_key
+    )
+
+
+def test_questionnaire_key_ignores_attraction_order():
+    variant = copy.deepcopy(QUESTIONNAIRE)
+    variant["activity_preferences"]["must_see_attractions"].reverse()
+    assert (
+        normalize_questionnaire_request(QUESTIONNAIRE).cache_key
+        == normalize_questionnaire_request(variant).cache_key
+    )
+
+
+def test_simulated_hit_ratio_by_policy():
+    variant = copy.deepcopy(PREFERENCES)
+    variant["must_haves"].reverse()
+    logged = [
+        {"preferences": PREFERENCES},
+        {"preferences": variant},
+        QUESTIONNAIRE,
+        QUESTIONNAIRE,
+        {"questionnaire_id": "1"},  # not a cacheable request, ignored
+    ]
+
+    exact = simulate_hit_ratio(logged, POLICIES["exact"])
+    default = simulate_hit_ratio(logged, POLICIES["default"])
+    assert exact["requests"] == 4
+    assert exact["hits"] == 1
+    assert default["hits"] == 2
+    assert default["endpoints"]["destinations"]["hit_ratio"] == 0.5
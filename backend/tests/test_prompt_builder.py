@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import prompt_builder
+from app.services.preference_normalizer import (
+    normalize_destination_preferences,
+    normalize_questionnaire_request,
+)
+from test_itinerary_parallel import optimization_request
+from test_preference_normalizer import PREFERENCES, QUESTIONNAIRE
+
+
+def full_optimization_request():
+    """The request as ItineraryService builds it, including the derived details"""
+    request = optimization_request()
+    activities = request["selected_activities"]
+    request["optimization_details"] = {
+        "total_activities": len(activities),
+        "high_priority_count": len([a for a in activities if a["priority"] == "high"]),
+        "medium_priority_count": len([a for a in activities if a["priority"] == "medium"]),
+        "low_priority_count": len([a for a in activities if a["priority"] == "low"]),
+        "categories": list(set([a["category"] for a in activities])),
+        "total_estimated_duration": sum([a["duration_hours"] for a in activities]),
+        "total_estimated_cost": sum([a["cost"] for a in activities]),
+    }
+    return request
+
+
+def previous_prompts():
+    """The user prompts as they were built before prompt_builder"""
+    destination = normalize_destination_preferences(PREFERENCES).prompt_payload
+    activity = normalize_questionnaire_request(QUESTIONNAIRE).prompt_payload
+    request = full_optimization_request()
+    names = [a.get("name", "Unknown") for a in request["selected_activities"]]
+    return {
+        "destinations": f"Suggest 3 to 5 destination recommendations based on the following preferences: {json.dumps(destination, separators=(',', ':'))}",
+        "activities": f"Suggest 10 activities based on the following preference: {json.dumps(activity, separators=(',', ':'))}",
+        "itinerary": f"Create an optimized 14-day itinerary for Barcelona, Spain from 2024-07-01 to 2024-07-14. The user has selected {len(names)} foundation activities: {names}. You must include these activities and generate additional complementary activities to fill all 14 days with varied, engaging experiences. Avoid repeating the same activity multiple times. Full preferences: {request}",
+        "itinerary_plan": f"Plan the days of this trip: {json.dumps({**request, 'total_days': 14}, separators=(',', ':'))}",
+    }
+
+
+def compact_prompts():
+    request = full_optimization_request()
+    return {
+        "destinations": prompt_builder.destination_prompt(
+            normalize_destination_preferences(PREFERENCES).prompt_payload
+        ),
+        "activities": prompt_builder.activity_prompt(
+            normalize_questionnaire_request(QUESTIONNAIRE).prompt_payload
+        ),
+        "itinerary": prompt_builder.itinerary_prompt(request),
+        "itinerary_plan": prompt_builder.plan_prompt({**request, "total_days": 14}),
+    }
+
+
+def test_count_tokens():
+    assert prompt_builder.count_tokens("") == 0
+    assert prompt_builder.count_tokens("Barcelona") == 3
+    assert prompt_builder.count_tokens('{"from":"2024-07-01"}') == 14
+    messages = [{"role": "user", "content": "Plan a trip"}]
+    assert prompt_builder.count_message_tokens(messages) == 3 + 4
+
+
+def test_compact_json_is_deterministic_and_short():
+    payload = {"travel_dates": {"start_date": "2024-07-01", "end_date": None}, "duration_hours": 2.0, "must_haves": []}
+    assert prompt_builder.compact_json(payload) == '{"dates":{"from":"2024-07-01"},"hours":2}'
+    reordered = {"must_haves": [], "duration_hours": 2.0, "travel_dates": {"end_date": None, "start_date": "2024-07-01"}}
+    assert prompt_builder.compact_json(reordered) == prompt_builder.compact_json(payload)
+
+
+def test_itinerary_prompt_has_only_what_the_model_needs():
+    prompt = prompt_builder.itinerary_prompt(full_optimization_request())
+    trip = json.loads(prompt.split("Trip: ", 1)[1])
+    assert trip["days"] == 14 and trip["max_per_day"] == 4
+    assert trip["day_window"] == "09:00-22:00"
+    assert trip["selected"][0] == {"id": "act_001", "name": "Activity 1", "type": "cultural", "hours": 2, "priority": "high"}
+    # activity names appear once, derived totals are left out
+    assert prompt.count("Activity 1") == 1
+    assert "optimization_details" not in prompt and "cost" not in prompt
+
+
+def test_day_and_plan_prompts_keep_ids_where_needed():
+    request = optimization_request()
+    plan = json.loads(prompt_builder.plan_prompt({**request, "total_days": 14}).split(": ", 1)[1])
+    assert plan["selected"][0]["id"] == "act_001"
+    day = prompt_builder.day_prompt({
+        "destination": "Barcelona, Spain", "date": "2024-07-01", "day_number": 1, "theme": "Old town",
+        "assigned_activities": request["selected_activities"][:2],
+        "preferences": request["preferences"], "other_day_themes": ["Beaches"],
+    })
+    day = json.loads(day.split(": ", 1)[1])
+    assert [a["name"] for a in day["assigned"]] == ["Activity 1", "Activity 2"]
+    assert day["other_themes"] == ["Beaches"]
+
+
+def test_prompt_token_benchmark():
+    runs = 200
+    started = time.perf_counter()
+    for _ in range(runs):
+        before = previous_prompts()
+    before_ms = (time.perf_counter() - started) / runs * 1000
+    started = time.perf_counter()
+    for _ in range(runs):
+        after = compact_prompts()
+    after_ms = (time.perf_counter() - started) / runs * 1000
+
+    print("\n--- Prompt Size Benchmark ---")
+    print(f"{'task':<16} {'before':>8} {'after':>8} {'saved':>7}")
+    total_before = total_after = 0
+    for task in before:
+        tokens_before = prompt_builder.count_tokens(before[task])
+        tokens_after = prompt_builder.count_tokens(after[task])
+        total_before += tokens_before
+        total_after += tokens_after
+        print(f"{task:<16} {tokens_before:>8} {tokens_after:>8} {1 - tokens_after / tokens_before:>7.0%}")
+        assert tokens_after < tokens_before
+    print(f"{'all':<16} {total_before:>8} {total_after:>8} {1 - total_after / total_before:>7.0%}")
+    print(f"Building all four prompts: {before_ms:.2f} ms before, {after_ms:.2f} ms after")
+
+    itinerary_saving = 1 - prompt_builder.count_tokens(after["itinerary"]) / prompt_builder.count_tokens(before["itinerary"])
+    assert itinerary_saving > 0.4
+
+
+if __name__ == "__main__":
+    test_prompt_token_benchmark()
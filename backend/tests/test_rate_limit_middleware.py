@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api.endpoints import destination_rounter, itinerary_router
+from app.core.config import settings
+from app.db.database import get_db
+from app.middleware.rate_limit_backends import InMemoryRateLimitBackend
+from app.middleware.rate_limit_middleware import RateLimitMiddleware
+from app.middleware.rate_limit_policies import RateLimitPolicy, build_rate_limit_policy
+from app.middleware.rate_limiter import RateLimiter
+from app.utils.auth_utils import is_valid_api_key
+from exceptions import RateLimitExceededException
+
+HEALTH_PATHS = ["/", "/destinations/health", "/itinerary/health"]
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The previous middleware: BaseHTTPMiddleware and a DB session per request"""
+
+    def __init__(self, app, rate_limiter):
+        super().__init__(app)
+        self.rate_limiter = rate_limiter
+
+    async def dispatch(self, request: Request, call_next):
+        db = next(get_db())
+        try:
+            await self.rate_limiter.check_rate_limit(request)
+            return await call_next(request)
+        except RateLimitExceededException:
+            raise
+        finally:
+            db.close()
+
+
+def make_app(middleware, rate_limiter, **options):
+    app = FastAPI()
+    app.add_middleware(middleware, rate_limiter=rate_limiter, **options)
+    app.include_router(destination_rounter.router)
+    app.include_router(itinerary_router.router)
+
+    @app.get("/")
+    async def root():
+        return {"message": "Health check: Traveler-Planner API is running"}
+
+    @app.get("/limited")
+    async def limited():
+        return {"status": "ok"}
+
+    @app.post("/expensive")
+    async def expensive():
+        return {"status": "ok"}
+
+    return app
+
+
+def make_limiter(requests_per_minute=10**6):
+    return RateLimiter(
+        requests_per_minute=requests_per_minute,
+        requests_per_hour=10**7,
+        backend=InMemoryRateLimitBackend(requests_per_minute, 10**7),
+    )
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_health_paths_skip_the_limiter():
+    app = make_app(RateLimitMiddleware, make_limiter(requests_per_minute=1))
+    async with client_for(app) as client:
+        for _ in range(3):
+            for path in HEALTH_PATHS:
+                assert (await client.get(path)).status_code == 200
+
+        assert (await client.get("/limited")).status_code == 200
+        response = await client.get("/limited")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
+    assert response.json() == {
+        "errors": [{"code": "429", "message": "Rate limit exceeded: 1 requests per minute"}]
+    }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_policy_charges_route_cost_and_refills():
+    clock = FakeClock()
+    policy = RateLimitPolicy(default_budget_per_minute=60, clock=clock)
+    cost = policy.cost("POST", "/itinerary/generate")
+    assert cost == 30 and policy.cost("GET", "/itinerary/jobs/abc") == 1
+
+    assert policy.charge("ip:a", 60, cost).allowed
+    assert policy.charge("ip:a", 60, cost).allowed
+    rejected = policy.charge("ip:a", 60, cost)
+    assert not rejected.allowed and rejected.retry_after == 30
+    # cheap requests are rejected too once the budget is spent, until it refills
+    clock.now += 1
+    assert policy.charge("ip:a", 60, 1).allowed
+    clock.now += 30
+    assert policy.charge("ip:a", 60, cost).remaining == 0
+
+
+def test_policy_gives_listed_api_keys_their_own_quota():
+    policy = RateLimitPolicy(api_key_quotas={"partner-key": 3000}, default_budget_per_minute=60)
+    assert policy.identify("partner-key", "10.0.0.1") == ("key:partner-key", 3000)
+    assert policy.identify("testkey", "10.0.0.1") == ("ip:10.0.0.1", 60)
+    assert policy.identify(None, "10.0.0.2") == ("ip:10.0.0.2", 60)
+
+
+def test_quota_keys_are_not_valid_api_keys():
+    with patch.object(settings, "RATE_LIMIT_API_KEY_QUOTAS", {"partner-key": 3000}):
+        assert not is_valid_api_key("partner-key")
+        with patch.object(settings, "ADDITIONAL_API_KEYS", ["partner-key"]):
+            assert is_valid_api_key("partner-key")
+
+
+@pytest.mark.asyncio
+async def test_expensive_routes_spend_the_budget_first():
+    policy = RateLimitPolicy(
+        route_costs={"POST /expensive": 30},
+        api_key_quotas={"partner-key": 100},
+        default_budget_per_minute=60,
+    )
+    app = make_app(RateLimitMiddleware, make_limiter(), policy=policy)
+    async with client_for(app) as client:
+        first = await client.post("/expensive")
+        second = await client.post("/expensive")
+        third = await client.post("/expensive")
+        cheap = await client.get("/limited")
+        partner = await client.post("/expensive", headers={"x-api-key": "partner-key"})
+
+    assert first.headers["X-RateLimit-Limit"] == "60"
+    assert [first.headers["X-RateLimit-Remaining"], second.headers["X-RateLimit-Remaining"]] == ["30", "0"]
+    assert third.status_code == 429 and int(third.headers["Retry-After"]) >= 29
+    assert cheap.status_code == 429
+    assert partner.status_code == 200 and partner.headers["X-RateLimit-Remaining"] == "70"
+
+
+@pytest.mark.asyncio
+async def test_request_rejected_by_one_check_is_not_recorded_by_the_other():
+    clock = FakeClock()
+    policy = RateLimitPolicy(route_costs={"POST /expensive": 30}, default_budget_per_minute=60, clock=clock)
+    app = make_app(RateLimitMiddleware, make_limiter(requests_per_minute=3), policy=policy)
+    async with client_for(app) as client:
+        assert (await client.post("/expensive")).status_code == 200
+        assert (await client.post("/expensive")).status_code == 200
+        # over budget: the request window keeps its third slot
+        assert (await client.post("/expensive")).status_code == 429
+        clock.now += 60
+        assert (await client.post("/expensive")).status_code == 200
+        # over the request window: the budget is refunded
+        assert (await client.post("/expensive")).status_code == 429
+
+    assert policy._buckets["ip:127.0.0.1"][0] == 30
+
+
+def test_budgets_are_off_with_a_shared_limiter_backend():
+    assert build_rate_limit_policy() is not None
+    with patch.object(settings, "RATE_LIMIT_BACKEND", "redis"):
+        assert build_rate_limit_policy() is None
+    with patch.object(settings, "RATE_LIMIT_BUDGET_PER_MINUTE", 0):
+        assert build_rate_limit_policy() is None
+
+
+async def requests_per_second(app, rounds):
+    async with client_for(app) as client:
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            for path in HEALTH_PATHS:
+                response = await client.get(path)
+                assert response.status_code == 200
+        return rounds * len(HEALTH_PATHS) / (time.perf_counter() - start_time)
+
+
+@pytest.mark.asyncio
+async def test_health_endpoint_throughput_benchmark():
+    before = await requests_per_second(make_app(LegacyRateLimitMiddleware, make_limiter()), 200)
+    after = await requests_per_second(make_app(RateLimitMiddleware, make_limiter()), 200)
+
+    print(f"\nHealth endpoints: {before:.0f} req/s with BaseHTTPMiddleware, "
+          f"{after:.0f} req/s with the ASGI middleware and allowlist")
+    assert after > before
+
+
+if __name__ == "__main__":
+    asyncio.run(test_health_endpoint_throughput_benchmark())
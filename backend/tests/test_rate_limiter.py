@@ -0,0 +1,363 @@
+import os
+import sys
+import time
+import asyncio
+import multiprocessing
+import pytest
+from sqlalchemy import inspect, text
+from starlette.requests import Request
+from starlette.responses import Response
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.middleware.rate_limit_backends import (
+    InMemoryRateLimitBackend,
+    RedisRateLimitBackend,
+    SharedMemoryRateLimitBackend,
+    SQLRateLimitBackend,
+)
+from app.db.database import engine, get_db
+from app.db.models import RateLimitBucket
+from app.middleware.rate_limit_middleware import RateLimitMiddleware
+from app.middleware.rate_limiter import RateLimiter
+from exceptions import RateLimitExceededException
+from scripts.migrate_db import pending_statements
+
+
+def bucket_rows(client_id):
+    db = next(get_db())
+    try:
+        return db.query(RateLimitBucket).filter(RateLimitBucket.ip_address == client_id).all()
+    finally:
+        db.close()
+
+
+class FakeClock:
+    def __init__(self, now=1_000_040.0):  # 20 seconds into a minute
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_request(client_ip="10.0.0.1", path="/destinations/recommendations"):
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [],
+        "query_string": b"",
+        "client": (client_ip, 1234),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_enforces_minute_limit():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(requests_per_minute=5, requests_per_hour=100, clock=clock)
+
+    results = [(await backend.hit("a")).allowed for _ in range(6)]
+    assert results == [True] * 5 + [False]
+    # other clients are counted separately
+    assert (await backend.hit("b")).allowed
+
+    decision = await backend.hit("a")
+    assert decision.limit_type == "minute" and decision.count == 5
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_slides_the_window():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(requests_per_minute=10, requests_per_hour=1000, clock=clock)
+    for _ in range(10):
+        assert (await backend.hit("a")).allowed
+
+    # 30 seconds into the next minute the previous bucket still weighs 50%
+    clock.now += 70
+    allowed = 0
+    while (await backend.hit("a")).allowed:
+        allowed += 1
+    assert allowed == 5
+
+    # two minutes later the old requests no longer count
+    clock.now += 120
+    assert sum([(await backend.hit("a")).allowed for _ in range(10)]) == 10
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_enforces_hour_limit_and_forgets_idle_clients():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(requests_per_minute=100, requests_per_hour=3, clock=clock)
+    for _ in range(3):
+        assert (await backend.hit("a")).allowed
+        clock.now += 61
+    decision = await backend.hit("a")
+    assert not decision.allowed and decision.limit_type == "hour"
+
+    clock.now += 3 * 3600
+    backend._sweep(int(clock.now // 3600))
+    assert backend.stats()["clients"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_raises_with_existing_error_details():
+    limiter = RateLimiter(
+        requests_per_minute=1,
+        requests_per_hour=10,
+        backend=InMemoryRateLimitBackend(1, 10),
+    )
+    assert await limiter.check_rate_limit(make_request())
+    with pytest.raises(RateLimitExceededException) as exc_info:
+        await limiter.check_rate_limit(make_request())
+    assert exc_info.value.limit_type == "minute"
+    assert exc_info.value.retry_after == 60
+
+
+@pytest.mark.asyncio
+async def test_sql_backend_keeps_one_row_per_client_and_minute():
+    clock = FakeClock()
+    backend = SQLRateLimitBackend(
+        requests_per_minute=5, requests_per_hour=8, cleanup_interval_hours=1, clock=clock
+    )
+    client_id = f"sql-test-{time.time_ns()}"
+
+    results = [(await backend.hit(client_id)).allowed for _ in range(6)]
+    assert results == [True] * 5 + [False]
+    assert len(bucket_rows(client_id)) == 1
+
+    # two minutes later: the 5 requests still in the hour window leave room for 3 more
+    clock.now += 120
+    results = [(await backend.hit(client_id)).allowed for _ in range(4)]
+    assert results == [True] * 3 + [False]
+    assert sorted(row.request_count for row in bucket_rows(client_id)) == [3, 5]
+    assert (await backend.hit(client_id)).limit_type == "hour"
+
+
+@pytest.mark.asyncio
+async def test_sql_backend_sweeps_expired_buckets_off_the_request_path():
+    clock = FakeClock()
+    backend = SQLRateLimitBackend(
+        requests_per_minute=5, requests_per_hour=100, cleanup_interval_hours=1,
+        sweep_interval_seconds=0.01, clock=clock,
+    )
+    client_id = f"sql-sweep-{time.time_ns()}"
+    await backend.hit(client_id)
+    clock.now += 2 * 3600
+    await backend.hit(client_id)
+    assert len(bucket_rows(client_id)) == 2
+
+    await backend.start()
+    await asyncio.sleep(0.05)
+    await backend.close()
+    assert len(bucket_rows(client_id)) == 1
+    assert backend.stats()["swept_rows"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_sql_backend_admits_the_quota_under_concurrent_hits():
+    backend = SQLRateLimitBackend(requests_per_minute=10, requests_per_hour=100, cleanup_interval_hours=1)
+    client_id = f"sql-concurrent-{time.time_ns()}"
+    decisions = await asyncio.gather(*[backend.hit(client_id) for _ in range(30)])
+
+    assert sum(decision.allowed for decision in decisions) == 10
+    # rejected hits are not counted
+    assert [row.request_count for row in bucket_rows(client_id)] == [10]
+
+
+def test_retired_rate_limits_table_is_dropped_by_the_migration_only():
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS rate_limits (id INTEGER PRIMARY KEY)"))
+    try:
+        assert "DROP TABLE rate_limits" in pending_statements()
+        # nothing is dropped behind the operator's back
+        assert inspect(engine).has_table("rate_limits")
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE rate_limits"))
+
+
+# created before the pool forks, like a backend built at import by a preloading server
+inherited_backends = {}
+
+
+def shared_worker(path, hits):
+    backend = inherited_backends[path]
+
+    async def run():
+        try:
+            return sum([(await backend.hit("203.0.113.7")).allowed for _ in range(hits)])
+        finally:
+            await backend.close()
+
+    return asyncio.run(run())
+
+
+def test_shared_backend_is_exact_across_processes(tmp_path):
+    path = str(tmp_path / "rate_limits.bin")
+    backend = SharedMemoryRateLimitBackend(
+        requests_per_minute=10000, requests_per_hour=100000, path=path, slots=1024
+    )
+    # nothing is opened until the backend is used
+    assert not os.path.exists(path)
+    # the parent's descriptor is inherited by the workers, who open their own
+    assert asyncio.run(backend.hit("203.0.113.7")).allowed
+    inherited_backends[path] = backend
+    try:
+        with multiprocessing.get_context("fork").Pool(4) as pool:
+            allowed = pool.starmap(shared_worker, [(path, 6000)] * 4)
+    finally:
+        del inherited_backends[path]
+        asyncio.run(backend.close())
+
+    # 24000 attempts from four workers, exactly the rest of the per-minute quota gets through
+    assert sum(allowed) == 9999
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_reuses_stalest_slot_when_full(tmp_path):
+    clock = FakeClock()
+    backend = SharedMemoryRateLimitBackend(
+        requests_per_minute=5, requests_per_hour=100,
+        path=str(tmp_path / "rate_limits.bin"), slots=4, clock=clock,
+    )
+    for client in ("a", "b", "c", "d"):
+        assert (await backend.hit(client)).allowed
+    clock.now += 3 * 3600
+    # table is full, the new client takes over a stale slot instead of failing
+    assert (await backend.hit("e")).allowed
+    await backend.close()
+
+
+class FakeRespServer:
+    """Local stand-in speaking enough of the Redis protocol for the limiter"""
+
+    def __init__(self):
+        self.data = {}
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/0"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode())
+                writer.write(self.reply(args))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def reply(self, args):
+        command = args[0].upper()
+        if command in ("INCR", "DECR"):
+            value = int(self.data.get(args[1], 0)) + (1 if command == "INCR" else -1)
+            self.data[args[1]] = str(value)
+            return f":{value}\r\n".encode()
+        if command == "GET":
+            value = self.data.get(args[1])
+            return b"$-1\r\n" if value is None else f"${len(value)}\r\n{value}\r\n".encode()
+        if command == "EXPIRE":
+            return b":1\r\n"
+        return f"-ERR unknown command '{command}'\r\n".encode()
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_against_local_stand_in():
+    server = FakeRespServer()
+    url = await server.start()
+    workers = [
+        RedisRateLimitBackend(requests_per_minute=10, requests_per_hour=100, url=url)
+        for _ in range(3)
+    ]
+    try:
+        results = await asyncio.gather(*[
+            worker.hit("198.51.100.1") for worker in workers for _ in range(8)
+        ])
+        assert sum(decision.allowed for decision in results) == 10
+        rejected = next(decision for decision in results if not decision.allowed)
+        assert rejected.limit_type == "minute"
+    finally:
+        for worker in workers:
+            await worker.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_fails_open():
+    backend = RedisRateLimitBackend(
+        requests_per_minute=1, requests_per_hour=1, url="redis://127.0.0.1:1/0"
+    )
+    assert (await backend.hit("a")).allowed
+    assert backend.stats()["errors"] == 1
+    await backend.close()
+
+
+async def measure_middleware(limiter, iterations):
+    async def endpoint(scope, receive, send):
+        await Response("ok")(scope, receive, send)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    middleware = RateLimitMiddleware(app=endpoint, rate_limiter=limiter)
+    scopes = [make_request(f"10.0.{i // 256 % 256}.{i % 256}").scope for i in range(iterations)]
+
+    start_time = time.perf_counter()
+    for scope in scopes:
+        await endpoint(scope, receive, send)
+    baseline = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for scope in scopes:
+        await middleware(scope, receive, send)
+    duration = time.perf_counter() - start_time
+    return (duration - baseline) / iterations
+
+
+@pytest.mark.asyncio
+async def test_middleware_overhead_benchmark(tmp_path):
+    limits = {"requests_per_minute": 10**6, "requests_per_hour": 10**7}
+    memory_overhead = await measure_middleware(
+        RateLimiter(**limits, backend=InMemoryRateLimitBackend(**limits)), 5000
+    )
+    shared_backend = SharedMemoryRateLimitBackend(
+        **limits, path=str(tmp_path / "rate_limits.bin"), slots=65536
+    )
+    shared_overhead = await measure_middleware(RateLimiter(**limits, backend=shared_backend), 5000)
+    await shared_backend.close()
+    sql_overhead = await measure_middleware(
+        RateLimiter(**limits, backend=SQLRateLimitBackend(**limits, cleanup_interval_hours=1)), 200
+    )
+
+    print(f"\nRate limit middleware overhead per request: "
+          f"memory {memory_overhead * 1e6:.1f} µs, shared {shared_overhead * 1e6:.1f} µs, "
+          f"sql {sql_overhead * 1e6:.1f} µs")
+    assert memory_overhead < sql_overhead
+    assert shared_overhead < sql_overhead
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(test_middleware_overhead_benchmark(pathlib.Path(directory)))
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.db.database import get_db
+from app.db.models import ResponseCacheEntry
+from app.models.destination_request import DestinationRequest
+from app.services import destination_service
+from app.services.destination_service import DestinationService
+from app.services.llm_providers import Completion
+from app.services.response_cache import (
+    InMemoryResponseCache,
+    SQLiteResponseCache,
+    make_cache_key,
+)
+
+PREFERENCES = {
+    "preferences": {
+        "traveler_info": {"age_group": "25-34"},
+        "budget": {"min": 500, "max": 2000, "currency": "USD"},
+        "travel_dates": {"start_date": "2024-07-15", "end_date": "2024-07-22"},
+        "group_size": 2,
+        "group_relationship": "couple",
+        "preferred_location": "None (Open to suggestions)",
+        "interests": ["cultural_experiences", "food_and_drink"],
+        "travel_style": "balanced",
+        "must_haves": ["walkable city"],
+        "deal_breakers": ["extreme weather"]
+    }
+}
+
+LLM_RESPONSE = json.dumps({
+    "recommendations": [{
+        "id": "dest_001",
+        "name": "Lisbon, Portugal",
+        "country": "Portugal",
+        "match_score": 90,
+        "estimated_cost": 1300,
+        "highlights": ["Coastal charm"],
+        "why_recommended": "Great food culture",
+        "image_url": None,
+    }]
+})
+
+
+def test_cache_key_ignores_dict_order():
+    assert make_cache_key({"a": 1, "b": [1, 2]}) == make_cache_key({"b": [1, 2], "a": 1})
+    assert make_cache_key({"a": 1}) != make_cache_key({"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_ttl():
+    cache = InMemoryResponseCache("test", ttl_seconds=60, max_entries=2)
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    assert await cache.get("a") == "1"  # "a" becomes most recently used
+    await cache.set("c", "3")
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+    expired = InMemoryResponseCache("test", ttl_seconds=0, max_entries=2)
+    await expired.set("a", "1")
+    assert await expired.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_survives_new_instance():
+    cache = SQLiteResponseCache("test_sqlite", ttl_seconds=60, max_entries=2)
+    cache.clear()
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    await cache.set("c", "3")
+
+    # a fresh instance (e.g. after a restart) sees the same rows
+    reopened = SQLiteResponseCache("test_sqlite", ttl_seconds=60, max_entries=2)
+    assert reopened.size() == 2
+    assert await reopened.get("c") == "3"
+    reopened.clear()
+
+
+def last_access(namespace, key):
+    db = next(get_db())
+    try:
+        return db.get(ResponseCacheEntry, (namespace, key)).last_access
+    finally:
+        db.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_hits_refresh_lru_position_coarsely():
+    cache = SQLiteResponseCache("test_sqlite_access", ttl_seconds=60, max_entries=2)
+    cache.clear()
+    await cache.set("a", "1")
+    written = last_access("test_sqlite_access", "a")
+
+    # a hit within the resolution is a plain read
+    assert await cache.get("a") == "1"
+    assert last_access("test_sqlite_access", "a") == written
+
+    with patch.object(cache, "access_resolution_seconds", 0):
+        assert await cache.get("a") == "1"
+    assert last_access("test_sqlite_access", "a") > written
+    cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_recommendations_served_from_cache():
+    request = DestinationRequest(**PREFERENCES)
+    cache = InMemoryResponseCache("destinations", ttl_seconds=60, max_entries=10)
+    with patch.object(destination_service, "destination_cache", cache), patch(
+        "app.services.destination_service.get_travel_ideas",
+        new=AsyncMock(return_value=Completion(text=LLM_RESPONSE)),
+    ) as mock_llm:
+        service = DestinationService()
+        first = await service.get_recommendations(request)
+
+        start_time = time.perf_counter()
+        second = await service.get_recommendations(request)
+        duration = time.perf_counter() - start_time
+
+    print(f"\nCached recommendation served in {duration * 1_000_000:.0f} µs")
+    assert mock_llm.await_count == 1
+    assert first == second
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flags", [{"repaired": True}, {"truncated": True}])
+async def test_salvaged_recommendations_are_not_cached(flags):
+    request = DestinationRequest(**PREFERENCES)
+    cache = InMemoryResponseCache("destinations", ttl_seconds=60, max_entries=10)
+    with patch.object(destination_service, "destination_cache", cache), patch(
+        "app.services.destination_service.get_travel_ideas",
+        new=AsyncMock(return_value=Completion(text=LLM_RESPONSE, **flags)),
+    ):
+        response = await DestinationService().get_recommendations(request)
+
+    assert response.recommendations[0].name == "Lisbon, Portugal"
+    assert cache.size() == 0
@@ -0,0 +1,124 @@
+import os
+import sys
+import random
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from dotenv import load_dotenv
+
+#load env with provided path
+load_dotenv(dotenv_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import openai_client
+from app.services.token_budget import OutputTokenBudget, itinerary_features, replay_usage
+from test_itinerary_parallel import optimization_request
+
+PRIOR = [200.0, 60.0, 90.0, 0.0]
+# what responses actually cost in the simulation, unknown to the budget
+TRUE_COEFFICIENTS = [150.0, 40.0, 75.0, 5.0]
+
+
+def sample_trips(n, seed=3):
+    """(features, output_tokens) of random trips of 1-14 days, +-15% noise"""
+    rng = random.Random(seed)
+    trips = []
+    for _ in range(n):
+        days = rng.randint(1, 14)
+        features = [days, days * rng.randint(2, 6), rng.randint(3, 10)]
+        tokens = sum(w * x for w, x in zip(TRUE_COEFFICIENTS, [1, *features]))
+        trips.append((features, int(tokens * rng.uniform(0.85, 1.15))))
+    return trips
+
+
+def test_itinerary_features():
+    assert itinerary_features(optimization_request()) == [14, 56, 6]
+    short = optimization_request(end_date="2024-07-02")
+    assert itinerary_features(short) == [2, 8, 6]
+    assert itinerary_features({})[0] == 1
+
+
+def test_budget_follows_prior_until_calibrated():
+    budget = OutputTokenBudget("test", PRIOR, headroom=1.3, min_tokens=500, max_tokens=8000)
+    # 200 + 2 * 60 + 8 * 90 = 1040
+    assert budget.budget([2, 8, 2]) == 1352
+    assert budget.budget([1, 1, 0]) == 500
+    assert budget.budget([30, 180, 10]) == 8000
+
+
+def test_unreported_usage_is_not_learned():
+    budget = OutputTokenBudget("test", PRIOR)
+    budget.record([2, 8, 2], 1352, None, False)
+    assert budget.coefficients == PRIOR
+    assert budget.stats()["unmeasured"] == 1
+
+
+def test_calibration_learns_response_sizes():
+    budget = OutputTokenBudget("test", PRIOR, percentile=95, max_tokens=20000)
+    for features, tokens in sample_trips(200):
+        budget.record(features, 20000, tokens, False)
+
+    for features, _ in sample_trips(20, seed=11):
+        expected = sum(w * x for w, x in zip(TRUE_COEFFICIENTS, [1, *features]))
+        assert budget.predict(features) == pytest.approx(expected, rel=0.1)
+
+
+def test_truncated_responses_raise_the_estimate():
+    budget = OutputTokenBudget("test", PRIOR, min_samples=0, max_tokens=20000)
+    before = budget.budget([5, 20, 5])
+    for _ in range(20):
+        budget.record([5, 20, 5], before, before, True)
+    assert budget.budget([5, 20, 5]) > before
+    assert budget.stats()["truncation_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_itinerary_max_tokens_scale_with_trip():
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        message = SimpleNamespace(content="{}")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=SimpleNamespace(completion_tokens=900),
+        )
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    budget = OutputTokenBudget("itinerary", PRIOR, min_tokens=800, max_tokens=8000, fixed_tokens=3000)
+    with patch.object(openai_client, "_client", client), \
+         patch.object(openai_client, "_itinerary_budget", budget):
+        await openai_client.get_optimized_itinerary(optimization_request(end_date="2024-07-02"))
+        await openai_client.get_optimized_itinerary(optimization_request())
+
+    short, long = [request["max_tokens"] for request in requests]
+    assert short < 3000 < long
+    stats = budget.stats()
+    assert stats["calls"] == 2 and stats["avg_output_tokens"] == 900
+    assert stats["fixed"]["waste_ratio"] == pytest.approx(2100 / 3000)
+
+
+def test_estimated_budget_benchmark():
+    trips = sample_trips(1000)
+    estimated = OutputTokenBudget("estimated", PRIOR, percentile=95, max_tokens=16000)
+    report = replay_usage([(f, t, False) for f, t in trips], estimated)
+    fixed_report = {
+        "truncation_rate": sum(t > 3000 for _, t in trips) / len(trips),
+        "avg_budget": 3000,
+        "waste_ratio": sum(3000 - t for _, t in trips if t <= 3000) / (3000 * len(trips)),
+    }
+
+    print("\n--- max_tokens Budget Simulation (1000 trips of 1-14 days) ---")
+    for name, stats in (("Fixed 3000", fixed_report), ("Estimated", report)):
+        print(
+            f"{name + ':':<12} truncated {stats['truncation_rate']:.1%}, "
+            f"avg budget {stats['avg_budget']:.0f}, budget unused {stats['waste_ratio']:.1%}"
+        )
+    print(f"Fitted coefficients: {report['coefficients']}, ratio {report['ratio']}")
+
+    assert report["truncation_rate"] < 0.1 < fixed_report["truncation_rate"]
+    assert report["waste_ratio"] < fixed_report["waste_ratio"]
+
+
+if __name__ == "__main__":
+    test_estimated_budget_benchmark()